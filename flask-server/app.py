@@ -1,4 +1,11 @@
-from flask import Flask, request, jsonify
+from flask import (
+    Flask,
+    Response,
+    g,
+    request,
+    jsonify,
+    stream_with_context,
+)
 from flask_jwt_extended import (
     JWTManager,
     create_access_token,
@@ -12,20 +19,48 @@ from flask_limiter.util import get_remote_address
 
 import mysql.connector
 from mysql.connector import Error
-from mysql.connector.pooling import MySQLConnectionPool
 
 from categories import normalize_category_name
-from itau_pdf import (
-    ItauPdfError,
-    extract_statement_from_bytes,
+from db import (
+    BATCH_IMPORT_CHUNK_SIZE,
+    DB_CONFIG,
+    category_error,
+    collation_key,
+    ensure_named_rows,
+    get_cursor,
+    get_pool,
+    get_streaming_cursor,
+    insert_rows_chunked,
+    lookup_user_id,
+    write_finance_entries,
+)
+from metrics import RequestMetrics, observe_request, render as render_metrics
+from recurrence import next_occurrence, normalize_rule
+from rollup import apply_rollup_deltas, local_today, rollup_deltas
+from statement_cache import StatementCache, statement_cache_hasher
+from statement_pdf import (
+    StatementPdfError,
+    extract_statement_from_file,
+    parsers_version,
     statement_to_finance_entries,
 )
-
-from contextlib import contextmanager
+from todo_series import RECURRENCE_HORIZON_DAYS, extend_user_series
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.sansio.multipart import Data, Epilogue, File, MultipartDecoder, NeedData
+
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import wraps
+import base64
 import bcrypt
+import hmac
+import itertools
+import json
 import os
 import logging
+import tempfile
 import threading
+import time
 import calendar
 from datetime import date, datetime, timedelta, timezone
 
@@ -53,14 +88,60 @@ if not app.config["JWT_SECRET_KEY"]:
 # larger than MAX_CONTENT_LENGTH before it reaches a route handler.
 MAX_PDF_UPLOAD_BYTES = 10 * 1024 * 1024
 MAX_PDF_UPLOAD_COUNT = 24
+# The upload route also counts the bytes it reads, files and everything else
+# in the body together, and gives up with a 413 as soon as the request passes
+# MAX_PDF_REQUEST_BYTES, so files thrown away for being too large still count.
+MAX_PDF_REQUEST_BYTES = 50 * 1024 * 1024
+# Uploaded statements are parsed on a pool shared by every request in the
+# worker, so at most PDF_PARSE_WORKERS pdftotext processes run per worker
+# however many uploads arrive at once. A request gives up on whatever is
+# still unparsed after PDF_PARSE_DEADLINE_SECONDS.
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", "4"))
+PDF_PARSE_DEADLINE_SECONDS = float(os.getenv("PDF_PARSE_DEADLINE_SECONDS", "90"))
+PDF_PARSE_TIMED_OUT = "Timed out waiting for the PDF to be parsed — try fewer files at once"
+# Uploads are read off the request stream PDF_UPLOAD_READ_SIZE bytes at a
+# time, one file at a time: each is spooled (in memory up to
+# PDF_UPLOAD_SPOOL_BYTES, on disk beyond) and released once parsed. A request
+# stops reading while PDF_PARSE_WORKERS of its files are still parsing.
+PDF_UPLOAD_READ_SIZE = 64 * 1024
+PDF_UPLOAD_SPOOL_BYTES = 1024 * 1024
+# Parsed statements are cached by content hash: STATEMENT_CACHE_SIZE per
+# worker in memory, plus, if STATEMENT_CACHE_DIR is set, up to
+# STATEMENT_CACHE_DISK_MAX_ENTRIES files there shared by every worker.
+STATEMENT_CACHE_SIZE = int(os.getenv("STATEMENT_CACHE_SIZE", "256"))
+STATEMENT_CACHE_DIR = os.getenv("STATEMENT_CACHE_DIR") or None
+STATEMENT_CACHE_DISK_MAX_ENTRIES = int(os.getenv("STATEMENT_CACHE_DISK_MAX_ENTRIES", "5000"))
 MAX_BULK_DELETE_IDS = 500
 MAX_GENERATE_ROWS = 1000
+# GET /entry pages through a user's history instead of dumping all of it.
+ENTRY_PAGE_SIZE = 500
+MAX_ENTRY_PAGE_SIZE = 1000
+# GET /todo pages the same way when a client asks for pages.
+TODO_PAGE_SIZE = 100
+MAX_TODO_PAGE_SIZE = 500
+# Pomodoro sessions still in_progress this long after they started were
+# abandoned (tab closed, crash). One gunicorn worker, elected through a MySQL
+# advisory lock, cancels them every POMODORO_REAPER_INTERVAL_SECONDS, at most
+# POMODORO_REAPER_BATCH_SIZE per transaction; 0 turns the reaper off.
+POMODORO_STALE_AFTER_MINUTES = int(os.getenv("POMODORO_STALE_AFTER_MINUTES", "240"))
+POMODORO_REAPER_INTERVAL_SECONDS = float(os.getenv("POMODORO_REAPER_INTERVAL_SECONDS", "60"))
+POMODORO_REAPER_BATCH_SIZE = 500
+POMODORO_REAPER_LOCK = "time_tracker.pomodoro_reaper"
+# List endpoints stream rows as newline-delimited JSON when asked to, reading
+# this many rows off the server-side cursor at a time.
+NDJSON_MIMETYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = 200
+# Username -> users.id lookups are kept per worker, USER_ID_CACHE_SIZE of
+# them, each for USER_ID_CACHE_TTL_SECONDS. A token whose user is deleted (or
+# whose username now belongs to someone else) stops working within that long.
+USER_ID_CACHE_SIZE = 1024
+USER_ID_CACHE_TTL_SECONDS = float(os.getenv("USER_ID_CACHE_TTL_SECONDS", "300"))
 app.config["MAX_CONTENT_LENGTH"] = 50 * 1024 * 1024
 
-# Rate limiting — disabled when RATELIMIT_ENABLED=false (e.g. in tests)
+# Rate limiting — disabled when RATELIMIT_ENABLED=false (e.g. in tests).
+# Attached to the app below, once the request metrics hooks are registered.
 _ratelimit_enabled = os.getenv("RATELIMIT_ENABLED", "true").lower() != "false"
 limiter = Limiter(
-    app=app,
     key_func=get_remote_address,
     default_limits=["100 per hour", "20 per minute"],
     storage_uri="memory://",
@@ -69,55 +150,107 @@ limiter = Limiter(
 
 jwt = JWTManager(app)
 
-DB_CONFIG = {
-    "host": os.getenv("DB_HOST"),
-    "port": int(os.getenv("DB_PORT", "3306")),
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-    "database": os.getenv("DB_NAME"),
-}
+# Shared secret for the /internal/* endpoints. Without it they only answer
+# requests from the loopback interface.
+INTERNAL_TOKEN = os.getenv("INTERNAL_TOKEN")
 
-missing = [k for k, v in DB_CONFIG.items() if not v]
-if missing:
-    raise RuntimeError(f"Missing required DB environment variables: {missing}")
 
-_pool = None
-_pool_lock = threading.Lock()
+def wants_ndjson():
+    """True when the client prefers newline-delimited JSON over plain JSON."""
+    best = request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
 
 
-def get_pool():
-    """Return the connection pool, creating it on first call."""
-    global _pool
-    if _pool is None:
-        with _pool_lock:
-            if _pool is None:
-                _pool = MySQLConnectionPool(
-                    pool_name="time_tracker_pool", pool_size=5, **DB_CONFIG
-                )
-    return _pool
+def stream_ndjson(query, params, transform_batch=None):
+    """
+    Run a query and stream its rows back as NDJSON, one object per line.
 
+    Rows are read STREAM_BATCH_SIZE at a time and written out straight away,
+    so worker memory stays flat however many rows match, and the first line
+    leaves before the last row has been read. `transform_batch`, if given,
+    takes each list of rows and returns the list to write.
 
-@contextmanager
-def get_cursor(dictionary=True):
+    The 200 has already gone out by the time rows are read, so a database
+    error part-way through ends the stream with an {"error": ...} line.
     """
-    Context manager that acquires a pooled connection, yields a cursor,
-    commits on success, rolls back on error, and always cleans up.
+    def generate():
+        try:
+            with get_streaming_cursor() as cursor:
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+                    if not rows:
+                        break
+                    if transform_batch is not None:
+                        rows = transform_batch(rows)
+                    yield "".join(app.json.dumps(row) + "\n" for row in rows)
+        except Error as e:
+            logger.error(f"Database error while streaming: {e}")
+            yield app.json.dumps({"error": "Stream interrupted"}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+
+_user_id_cache = OrderedDict()
+_user_id_cache_lock = threading.Lock()
+
+
+def _cached_user_id(username):
+    """users.id for `username` from a bounded, per-process LRU whose entries
+    expire after USER_ID_CACHE_TTL_SECONDS; None when missing or expired."""
+    with _user_id_cache_lock:
+        cached = _user_id_cache.get(username)
+        if cached is None:
+            return None
+        user_id, expires_at = cached
+        if expires_at <= time.monotonic():
+            del _user_id_cache[username]
+            return None
+        _user_id_cache.move_to_end(username)
+        return user_id
+
+
+def _lookup_user_id(username):
+    """Resolve a username to users.id from the database and cache it. Only
+    hits are cached, so a miss is retried on the next request."""
+    with get_cursor() as cursor:
+        user_id = lookup_user_id(cursor, username)
 
-    Usage:
-        with get_cursor() as cursor:
-            cursor.execute(...)
+    if not user_id:
+        return None
+
+    with _user_id_cache_lock:
+        _user_id_cache[username] = (user_id, time.monotonic() + USER_ID_CACHE_TTL_SECONDS)
+        _user_id_cache.move_to_end(username)
+        while len(_user_id_cache) > USER_ID_CACHE_SIZE:
+            _user_id_cache.popitem(last=False)
+    return user_id
+
+
+def current_user_id():
     """
-    connection = get_pool().get_connection()
-    cursor = connection.cursor(dictionary=dictionary)
-    try:
-        yield cursor
-        connection.commit()
-    except Exception:
-        connection.rollback()
-        raise
-    finally:
-        cursor.close()
-        connection.close()
+    users.id of the user the request's JWT was issued to, or None if there
+    is no such user.
+
+    /login signs the id into the token as the "uid" claim, and that claim is
+    what this returns. It is revalidated against the username only when the
+    username has no live cache entry holding that id, so a deleted user's
+    token stops working within USER_ID_CACHE_TTL_SECONDS, and one whose
+    name was registered again by someone else (a different id) is refused.
+    Tokens without the claim (issued before it existed) are resolved by
+    username the same way. Can raise mysql.connector.Error — call it inside
+    the route's try.
+    """
+    username = get_jwt_identity()
+    uid = get_jwt().get("uid")
+    cached = _cached_user_id(username)
+    if cached is not None and (uid is None or cached == uid):
+        return cached
+
+    user_id = _lookup_user_id(username)
+    if uid is not None and uid != user_id:
+        return None
+    return user_id
 
 
 def normalize_existing_finance_categories():
@@ -161,33 +294,113 @@ def normalize_existing_finance_categories():
         logger.error(f"Could not normalize finance category names: {e}")
 
 
-def retrieve_entry_from_username(username):
+def _encode_entry_cursor(entry):
+    """Opaque keyset cursor for the entry after which the next page starts."""
+    payload = json.dumps(
+        {"start_time": entry["start_time"].isoformat(), "id": entry["id"]}
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def _decode_entry_cursor(cursor_str):
+    """Inverse of _encode_entry_cursor. Raises ValueError on anything that
+    was not produced by it."""
     try:
-        with get_cursor() as cursor:
-            cursor.execute("SELECT id FROM users WHERE username = %s", (username,))
-            user = cursor.fetchone()
+        payload = json.loads(base64.urlsafe_b64decode(cursor_str.encode("ascii")))
+        return datetime.fromisoformat(payload["start_time"]), int(payload["id"])
+    except (TypeError, KeyError, ValueError):
+        raise ValueError("Invalid cursor")
 
-            if not user:
-                return jsonify({"error": "User not found"}), 404
 
-            cursor.execute(
-                """
-                SELECT
-                    te.id,
-                    c.name AS category,
-                    te.start_time,
-                    te.end_time,
-                    TIMESTAMPDIFF(SECOND, te.start_time, te.end_time) AS duration_seconds
-                FROM time_entries te
-                JOIN category c ON te.category_id = c.id
-                WHERE te.user_id = %s
-                ORDER BY te.start_time ASC
-                """,
-                (user["id"],),
-            )
+def _parse_query_datetime(value, name):
+    """Parse an ISO 8601 query parameter into a naive UTC datetime, the form
+    the DATETIME columns are compared in."""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"{name} must be ISO 8601 format with timezone")
+    if parsed.tzinfo is None:
+        raise ValueError(f"{name} requires timezone information (ISO 8601 with offset)")
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _entry_list_query(user_id, window_start, window_end, after, limit):
+    """Build the SELECT behind GET /entry. Every predicate is a range on the
+    (user_id, start_time, id) index, so a page costs O(limit) however long
+    the history is. With a limit, one extra row is asked for so the caller
+    can tell whether another page follows."""
+    conditions = ["te.user_id = %s"]
+    params = [user_id]
+    if window_start is not None:
+        conditions.append("te.start_time >= %s")
+        params.append(window_start)
+    if window_end is not None:
+        conditions.append("te.start_time < %s")
+        params.append(window_end)
+    if after is not None:
+        conditions.append(
+            "(te.start_time > %s OR (te.start_time = %s AND te.id > %s))"
+        )
+        params.extend([after[0], after[0], after[1]])
+
+    limit_clause = ""
+    if limit is not None:
+        limit_clause = "LIMIT %s"
+        params.append(limit + 1)
+
+    query = f"""
+        SELECT
+            te.id,
+            c.name AS category,
+            te.start_time,
+            te.end_time,
+            TIMESTAMPDIFF(SECOND, te.start_time, te.end_time) AS duration_seconds
+        FROM time_entries te
+        JOIN category c ON te.category_id = c.id
+        WHERE {" AND ".join(conditions)}
+        ORDER BY te.start_time ASC, te.id ASC
+        {limit_clause}
+    """
+    return query, params
+
+
+def retrieve_entry_from_username(
+    username, window_start=None, window_end=None, after=None, limit=None,
+    stream=False,
+):
+    """Fetch a user's time entries ordered by (start_time, id).
+
+    `window_start` / `window_end` bound start_time to [window_start,
+    window_end); `after` is a decoded (start_time, id) keyset cursor. With
+    `limit` set, `next_cursor` is included in the response; without it every
+    matching entry is returned in one go. `stream` returns them as NDJSON.
+    """
+    try:
+        user_id = current_user_id()
+        if not user_id:
+            return jsonify({"error": "User not found"}), 404
+
+        query, params = _entry_list_query(
+            user_id, window_start, window_end, after, limit
+        )
+        if stream:
+            return stream_ndjson(query, params)
+
+        with get_cursor() as cursor:
+            cursor.execute(query, params)
             entries = cursor.fetchall()
 
-        return jsonify({"username": username, "entries": entries}), 200
+        if limit is None:
+            return jsonify({"username": username, "entries": entries}), 200
+
+        next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            next_cursor = _encode_entry_cursor(entries[-1])
+
+        return jsonify(
+            {"username": username, "entries": entries, "next_cursor": next_cursor}
+        ), 200
 
     except Error as e:
         logger.error(f"Database error: {e}")
@@ -200,6 +413,103 @@ def health_check():
     return jsonify({"status": "healthy"}), 200
 
 
+def internal_only(view):
+    """
+    Restrict a route to operators: callers must send INTERNAL_TOKEN in the
+    X-Internal-Token header, or, when no token is configured, connect from
+    loopback (e.g. `docker compose exec flask curl ...`).
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if INTERNAL_TOKEN:
+            supplied = request.headers.get("X-Internal-Token", "")
+            allowed = hmac.compare_digest(supplied.encode(), INTERNAL_TOKEN.encode())
+        else:
+            allowed = request.remote_addr in ("127.0.0.1", "::1")
+        if not allowed:
+            return jsonify({"error": "Not found"}), 404
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@app.route("/internal/pool", methods=["GET"])
+@internal_only
+def pool_stats():
+    """
+    Connection pool metrics for the worker that answers: connections checked
+    out, callers waiting, acquire timeouts and rejections, an acquire-latency
+    histogram (cumulative buckets) and connection age.
+
+    Returns:
+        200: { pid, pool: {...} }
+        404: Caller is not internal
+    """
+    return jsonify({"pid": os.getpid(), "pool": get_pool().stats()}), 200
+
+
+@app.route("/metrics", methods=["GET"])
+@internal_only
+def prometheus_metrics():
+    """
+    Prometheus scrape endpoint: per-route request counts, latency and
+    response-size histograms, and per-request DB time and statement counts,
+    summed across gunicorn workers (see metrics.py).
+
+    Returns:
+        200: Prometheus text exposition format
+        404: Caller is not internal
+    """
+    body, content_type = render_metrics()
+    return Response(body, mimetype=content_type)
+
+
+@app.before_request
+def start_request_metrics():
+    g.request_metrics = RequestMetrics()
+
+
+# The limiter checks limits in a before_request hook of its own. Attaching it
+# after start_request_metrics means a request it refuses with a 429 has its
+# metrics started, and so is recorded like any other.
+limiter.init_app(app)
+
+
+def _metrics_route():
+    """The request's route label: its URL rule, not its path, to keep label
+    cardinality bounded."""
+    return request.url_rule.rule if request.url_rule else "<unmatched>"
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Record the request once its response has been fully sent, so streamed
+    bodies count their whole duration and the DB time spent producing them."""
+    request_metrics = g.get("request_metrics")
+    if request_metrics is None:
+        return response
+
+    method = request.method
+    route = _metrics_route()
+    status = response.status_code
+    size = None if response.is_streamed else response.calculate_content_length()
+    request_metrics.recorded = True
+    response.call_on_close(
+        lambda: observe_request(request_metrics, method, route, status, size)
+    )
+    return response
+
+
+@app.teardown_request
+def record_failed_request_metrics(exc):
+    """Record a request that after_request never saw, one that ended in an
+    exception before it had a response, as a 500 of unknown size."""
+    request_metrics = g.get("request_metrics")
+    if request_metrics is None or request_metrics.recorded:
+        return
+    request_metrics.recorded = True
+    observe_request(request_metrics, request.method, _metrics_route(), 500, None)
+
+
 @app.get("/protected")
 @jwt_required()
 def protected():
@@ -215,7 +525,12 @@ def refresh_expiring_jwts(response):
         now = datetime.now(timezone.utc)
         target_timestamp = datetime.timestamp(now + timedelta(hours=24))
         if target_timestamp > exp_timestamp:
-            access_token = create_access_token(identity=get_jwt_identity())
+            claims = {}
+            if get_jwt().get("uid") is not None:
+                claims["uid"] = get_jwt()["uid"]
+            access_token = create_access_token(
+                identity=get_jwt_identity(), additional_claims=claims
+            )
             set_access_cookies(response, access_token)
         return response
     except (RuntimeError, KeyError):
@@ -226,14 +541,70 @@ def refresh_expiring_jwts(response):
 @jwt_required()
 def myentries():
     """
-    Retrieves entries from a user from token username
+    Retrieves entries from a user from token username, one page at a time.
+
+    Query parameters (all optional):
+        from:   ISO 8601 datetime; only entries starting at or after it
+        to:     ISO 8601 datetime; only entries starting before it
+        cursor: `next_cursor` from the previous page
+        limit:  page size (default ENTRY_PAGE_SIZE, max MAX_ENTRY_PAGE_SIZE)
+        all:    "true" returns every matching entry unpaginated, for the CSV
+                export; `cursor` and `limit` are ignored then
+
+    With `Accept: application/x-ndjson` every matching entry is streamed back
+    one JSON object per line, as if all=true had been passed.
+
+    Returns:
+        200: { username, entries, next_cursor } (`next_cursor` is null on the
+             last page and absent when all=true)
+        400: Invalid parameter
+        404: User not found
+        500: Server error
     """
 
     username = get_jwt_identity()
     if not username:
         return jsonify({"error": "Username is required"}), 400
 
-    return retrieve_entry_from_username(username)
+    try:
+        window_start = window_end = None
+        if request.args.get("from"):
+            window_start = _parse_query_datetime(request.args["from"], "from")
+        if request.args.get("to"):
+            window_end = _parse_query_datetime(request.args["to"], "to")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if window_start and window_end and window_end <= window_start:
+        return jsonify({"error": "to must be after from"}), 400
+
+    if wants_ndjson():
+        return retrieve_entry_from_username(
+            username, window_start, window_end, stream=True
+        )
+
+    if request.args.get("all", "").lower() == "true":
+        return retrieve_entry_from_username(username, window_start, window_end)
+
+    after = None
+    if request.args.get("cursor"):
+        try:
+            after = _decode_entry_cursor(request.args["cursor"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    try:
+        limit = int(request.args.get("limit", ENTRY_PAGE_SIZE))
+        if not 1 <= limit <= MAX_ENTRY_PAGE_SIZE:
+            raise ValueError
+    except ValueError:
+        return jsonify(
+            {"error": f"limit must be an integer between 1 and {MAX_ENTRY_PAGE_SIZE}"}
+        ), 400
+
+    return retrieve_entry_from_username(
+        username, window_start, window_end, after=after, limit=limit
+    )
 
 
 @app.route("/get/categories", methods=["GET"])
@@ -361,7 +732,11 @@ def login_user():
     stored_hash = bytes(user["pwd_hash"])
 
     if bcrypt.checkpw(password.encode("utf-8"), stored_hash):
-        access_token = create_access_token(identity=username)
+        # The id rides along as a claim so authenticated routes need not look
+        # it up again (see current_user_id).
+        access_token = create_access_token(
+            identity=username, additional_claims={"uid": user["id"]}
+        )
         return jsonify(
             {
                 "message": "Login successful",
@@ -479,13 +854,11 @@ def create_time_entry():
         return jsonify({"error": "end_time must be after start_time"}), 400
 
     try:
-        with get_cursor() as cursor:
-            cursor.execute("SELECT id FROM users WHERE username = %s", (username,))
-            user = cursor.fetchone()
-
-            if not user:
-                return jsonify({"error": "User not found"}), 404
+        user_id = current_user_id()
+        if not user_id:
+            return jsonify({"error": "User not found"}), 404
 
+        with get_cursor() as cursor:
             cursor.execute("SELECT id FROM category WHERE name = %s", (category_name,))
             category = cursor.fetchone()
 
@@ -497,10 +870,14 @@ def create_time_entry():
                 INSERT INTO time_entries (user_id, category_id, start_time, end_time)
                 VALUES (%s, %s, %s, %s)
                 """,
-                (user["id"], category["id"], start_time, end_time),
+                (user_id, category["id"], start_time, end_time),
             )
             entry_id = cursor.lastrowid
 
+            apply_rollup_deltas(
+                cursor, user_id, rollup_deltas(category["id"], start_time, end_time)
+            )
+
         return jsonify(
             {
                 "message": "Time entry created successfully",
@@ -539,7 +916,6 @@ def update_time_entry(entry_id):
         404: Entry or category not found
         500: Server error
     """
-    current_user = get_jwt_identity()
     data = request.get_json()
 
     if not data:
@@ -570,15 +946,15 @@ def update_time_entry(entry_id):
         return jsonify({"error": "end_time must be after start_time"}), 400
 
     try:
+        user_id = current_user_id()
         with get_cursor() as cursor:
             # Verify entry belongs to this user
             cursor.execute(
                 """
-                SELECT te.id FROM time_entries te
-                JOIN users u ON te.user_id = u.id
-                WHERE te.id = %s AND u.username = %s
+                SELECT id, category_id, start_time, end_time FROM time_entries
+                WHERE id = %s AND user_id = %s
                 """,
-                (entry_id, current_user),
+                (entry_id, user_id),
             )
             entry = cursor.fetchone()
 
@@ -601,6 +977,13 @@ def update_time_entry(entry_id):
                 (category["id"], start_time, end_time, entry_id),
             )
 
+            apply_rollup_deltas(
+                cursor,
+                user_id,
+                rollup_deltas(entry["category_id"], entry["start_time"], entry["end_time"], -1)
+                + rollup_deltas(category["id"], start_time, end_time),
+            )
+
         return jsonify({"message": "Entry updated successfully", "id": entry_id}), 200
 
     except Error as e:
@@ -626,7 +1009,6 @@ def delete_time_entry():
         404: Entry not found
         500: Server error
     """
-    current_user = get_jwt_identity()
     data = request.get_json()
 
     if not data or "entry_id" not in data:
@@ -635,14 +1017,14 @@ def delete_time_entry():
     entry_id = data["entry_id"]
 
     try:
+        user_id = current_user_id()
         with get_cursor() as cursor:
             cursor.execute(
                 """
-                SELECT te.id FROM time_entries te
-                JOIN users u ON te.user_id = u.id
-                WHERE te.id = %s AND u.username = %s
+                SELECT id, category_id, start_time, end_time FROM time_entries
+                WHERE id = %s AND user_id = %s
                 """,
-                (entry_id, current_user),
+                (entry_id, user_id),
             )
             entry = cursor.fetchone()
 
@@ -651,6 +1033,12 @@ def delete_time_entry():
 
             cursor.execute("DELETE FROM time_entries WHERE id = %s", (entry_id,))
 
+            apply_rollup_deltas(
+                cursor,
+                user_id,
+                rollup_deltas(entry["category_id"], entry["start_time"], entry["end_time"], -1),
+            )
+
         return jsonify({"message": "Entry deleted successfully", "id": entry_id}), 200
 
     except Error as e:
@@ -681,7 +1069,6 @@ def batch_import_time_entries():
         400: Validation error
         500: Server error
     """
-    current_user = get_jwt_identity()
     data = request.get_json()
 
     if not data or "entries" not in data:
@@ -693,29 +1080,9 @@ def batch_import_time_entries():
 
     results = {"success": 0, "failed": 0, "errors": []}
 
-    try:
-        with get_cursor() as cursor:
-            cursor.execute("SELECT id FROM users WHERE username = %s", (current_user,))
-            user = cursor.fetchone()
-        if not user:
-            return jsonify({"error": "User not found"}), 404
-        user_id = user["id"]
-    except Error as e:
-        logger.error(f"Database error fetching user: {e}")
-        return jsonify({"error": "Failed to fetch user"}), 500
-
-    # First, get or create all categories
-    category_cache = {}
-    try:
-        with get_cursor() as cursor:
-            cursor.execute("SELECT id, name FROM category")
-            existing_categories = cursor.fetchall()
-            for cat in existing_categories:
-                category_cache[cat["name"]] = cat["id"]
-    except Error as e:
-        logger.error(f"Database error fetching categories: {e}")
-        return jsonify({"error": "Failed to fetch categories"}), 500
-
+    # Validate every row before touching the database, so the write below is
+    # one transaction over rows already known to be well-formed.
+    valid_rows = []
     for i, entry in enumerate(entries):
         try:
             category_name = entry.get("category", "").strip()
@@ -738,70 +1105,204 @@ def batch_import_time_entries():
             if end_time <= start_time:
                 raise ValueError("end_time must be after start_time")
 
-            # Get or create category
-            if category_name not in category_cache:
-                with get_cursor() as cursor:
-                    cursor.execute(
-                        "INSERT INTO category (name) VALUES (%s)",
-                        (category_name,)
-                    )
-                    category_cache[category_name] = cursor.lastrowid
-
-            category_id = category_cache[category_name]
-
-            with get_cursor() as cursor:
-                cursor.execute(
-                    """
-                    INSERT INTO time_entries (user_id, category_id, start_time, end_time)
-                    VALUES (%s, %s, %s, %s)
-                    """,
-                    (user_id, category_id, start_time, end_time)
-                )
-
-            results["success"] += 1
+            valid_rows.append((i, category_name, start_time, end_time))
 
         except Exception as e:
             results["failed"] += 1
             results["errors"].append({"index": i, "error": str(e)})
             logger.error(f"Failed to import entry {i}: {e}")
 
+    try:
+        user_id = current_user_id()
+        if not user_id:
+            return jsonify({"error": "User not found"}), 404
+    except Error as e:
+        logger.error(f"Database error fetching user: {e}")
+        return jsonify({"error": "Failed to fetch user"}), 500
+
+    if not valid_rows:
+        return jsonify(results), 200
+
+    try:
+        with get_cursor() as cursor:
+            # Missing categories are created in one statement, then resolved
+            # by collation_key, as the unique index on category.name matches.
+            category_ids = ensure_named_rows(
+                cursor, "category", [row[1] for row in valid_rows]
+            )
+
+            insert_rows = []
+            for i, category_name, start_time, end_time in valid_rows:
+                category_id = category_ids.get(collation_key(category_name))
+                if category_id is None:
+                    results["failed"] += 1
+                    results["errors"].append({"index": i, "error": category_error(category_name)})
+                    continue
+                insert_rows.append((i, (user_id, category_id, start_time, end_time)))
+
+            inserted, errors = insert_rows_chunked(
+                cursor,
+                """
+                INSERT INTO time_entries (user_id, category_id, start_time, end_time)
+                VALUES (%s, %s, %s, %s)
+                """,
+                insert_rows,
+                BATCH_IMPORT_CHUNK_SIZE,
+            )
+
+            failed_indexes = {error["index"] for error in errors}
+            deltas = []
+            for i, (_, category_id, start_time, end_time) in insert_rows:
+                if i not in failed_indexes:
+                    deltas.extend(rollup_deltas(category_id, start_time, end_time))
+            apply_rollup_deltas(cursor, user_id, deltas)
+
+    except Error as e:
+        logger.error(f"Database error during batch import: {e}")
+        return jsonify({"error": "Failed to import entries"}), 500
+
+    for error in errors:
+        logger.error(f"Failed to import entry {error['index']}: {error['error']}")
+    results["success"] += inserted
+    results["failed"] += len(errors)
+    results["errors"] = sorted(results["errors"] + errors, key=lambda e: e["index"])
+
     return jsonify(results), 200
 
 
-# ─── Finance Routes ────────────────────────────────────────────────────────────
+ROLLUP_PERIOD_EXPRESSIONS = {
+    "day": "r.day",
+    "week": "DATE_SUB(r.day, INTERVAL WEEKDAY(r.day) DAY)",
+    "month": "DATE_SUB(r.day, INTERVAL DAYOFMONTH(r.day) - 1 DAY)",
+}
 
 
-def retrieve_finance_entries_from_username(username):
+@app.get("/entry/summary")
+@jwt_required()
+def entry_summary():
+    """
+    Tracked time per period and category, read from the daily rollup.
+
+    Query parameters (all optional):
+        granularity: "day" (default), "week" (starting Monday) or "month"
+        from, to: YYYY-MM-DD, inclusive; default to the 30 days ending today
+
+    Days are ROLLUP_TIMEZONE days, the ones the dashboard groups entries by.
+
+    Returns:
+        200: {
+            granularity, from, to,
+            periods: [{ period: "YYYY-MM-DD", total_seconds,
+                        categories: [{ category, seconds }] }]
+        }
+        400: Validation error
+        404: User not found
+        500: Server error
+    """
+    granularity = request.args.get("granularity", "day")
+    if granularity not in ROLLUP_PERIOD_EXPRESSIONS:
+        return jsonify({"error": "granularity must be one of: day, week, month"}), 400
+
     try:
-        with get_cursor() as cursor:
-            cursor.execute("SELECT id FROM users WHERE username = %s", (username,))
-            user = cursor.fetchone()
+        to_day = (
+            datetime.strptime(request.args["to"], "%Y-%m-%d").date()
+            if request.args.get("to")
+            else local_today()
+        )
+        from_day = (
+            datetime.strptime(request.args["from"], "%Y-%m-%d").date()
+            if request.args.get("from")
+            else to_day - timedelta(days=29)
+        )
+    except ValueError:
+        return jsonify({"error": "from and to must be in YYYY-MM-DD format"}), 400
+
+    if to_day < from_day:
+        return jsonify({"error": "to must be on or after from"}), 400
 
-            if not user:
-                return jsonify({"error": "User not found"}), 404
+    period = ROLLUP_PERIOD_EXPRESSIONS[granularity]
+
+    try:
+        user_id = current_user_id()
+        if not user_id:
+            return jsonify({"error": "User not found"}), 404
 
+        with get_cursor() as cursor:
             cursor.execute(
-                """
-                SELECT
-                    fe.id,
-                    fc.name AS category,
-                    fe.product_name,
-                    fe.price,
-                    fe.purchase_date,
-                    fe.status
-                FROM finance_entries fe
-                JOIN finance_categories fc ON fe.category_id = fc.id
-                WHERE fe.user_id = %s
-                ORDER BY fe.purchase_date DESC
+                f"""
+                SELECT {period} AS period, c.name AS category, SUM(r.seconds) AS seconds
+                FROM time_entry_daily_rollup r
+                JOIN category c ON r.category_id = c.id
+                WHERE r.user_id = %s AND r.day BETWEEN %s AND %s
+                GROUP BY period, c.name
+                HAVING seconds > 0
+                ORDER BY period, c.name
                 """,
-                (user["id"],),
+                (user_id, from_day, to_day),
+            )
+            rows = cursor.fetchall()
+
+    except Error as e:
+        logger.error(f"Database error: {e}")
+        return jsonify({"error": "Failed to fetch entry summary"}), 500
+
+    periods = []
+    for row in rows:
+        key = row["period"].isoformat()
+        if not periods or periods[-1]["period"] != key:
+            periods.append({"period": key, "total_seconds": 0, "categories": []})
+        seconds = int(row["seconds"])
+        periods[-1]["total_seconds"] += seconds
+        periods[-1]["categories"].append({"category": row["category"], "seconds": seconds})
+
+    return jsonify({
+        "granularity": granularity,
+        "from": from_day.isoformat(),
+        "to": to_day.isoformat(),
+        "periods": periods,
+    }), 200
+
+
+# ─── Finance Routes ────────────────────────────────────────────────────────────
+
+
+FINANCE_LIST_QUERY = """
+    SELECT
+        fe.id,
+        fc.name AS category,
+        fe.product_name,
+        fe.price,
+        fe.purchase_date,
+        fe.status
+    FROM finance_entries fe
+    JOIN finance_categories fc ON fe.category_id = fc.id
+    WHERE fe.user_id = %s
+    ORDER BY fe.purchase_date DESC
+"""
+
+
+def _serialize_finance_entries(entries):
+    """Convert Decimal to float for JSON serialization."""
+    for entry in entries:
+        if entry["price"] is not None:
+            entry["price"] = float(entry["price"])
+    return entries
+
+
+def retrieve_finance_entries_from_username(username, stream=False):
+    try:
+        user_id = current_user_id()
+        if not user_id:
+            return jsonify({"error": "User not found"}), 404
+
+        if stream:
+            return stream_ndjson(
+                FINANCE_LIST_QUERY, (user_id,), _serialize_finance_entries
             )
-            entries = cursor.fetchall()
 
-            # Convert Decimal to float for JSON serialization
-            for entry in entries:
-                if entry["price"] is not None:
-                    entry["price"] = float(entry["price"])
+        with get_cursor() as cursor:
+            cursor.execute(FINANCE_LIST_QUERY, (user_id,))
+            entries = _serialize_finance_entries(cursor.fetchall())
 
         return jsonify({"username": username, "entries": entries}), 200
 
@@ -814,13 +1315,14 @@ def retrieve_finance_entries_from_username(username):
 @jwt_required()
 def my_finance_entries():
     """
-    Retrieves finance entries from a user from token username
+    Retrieves finance entries from a user from token username.
+    Streams them as NDJSON when asked with `Accept: application/x-ndjson`.
     """
     username = get_jwt_identity()
     if not username:
         return jsonify({"error": "Username is required"}), 400
 
-    return retrieve_finance_entries_from_username(username)
+    return retrieve_finance_entries_from_username(username, stream=wants_ndjson())
 
 
 @app.route("/finance/categories", methods=["GET"])
@@ -923,7 +1425,6 @@ def create_finance_entry():
         404: User or category not found
         500: Server error
     """
-    current_user = get_jwt_identity()
     data = request.get_json()
 
     required_fields = ["product_name", "category", "price", "purchase_date"]
@@ -966,15 +1467,11 @@ def create_finance_entry():
         return jsonify({"error": "Datetime must be ISO 8601 format with timezone"}), 400
 
     try:
-        with get_cursor() as cursor:
-            cursor.execute(
-                "SELECT id FROM users WHERE username = %s", (current_user,)
-            )
-            user = cursor.fetchone()
-
-            if not user:
-                return jsonify({"error": "User not found"}), 404
+        user_id = current_user_id()
+        if not user_id:
+            return jsonify({"error": "User not found"}), 404
 
+        with get_cursor() as cursor:
             cursor.execute(
                 "SELECT id FROM finance_categories WHERE name = %s", (category_name,)
             )
@@ -988,7 +1485,7 @@ def create_finance_entry():
                 INSERT INTO finance_entries (user_id, category_id, product_name, price, purchase_date, status)
                 VALUES (%s, %s, %s, %s, %s, %s)
                 """,
-                (user["id"], category["id"], product_name, price_value, purchase_date, status),
+                (user_id, category["id"], product_name, price_value, purchase_date, status),
             )
             entry_id = cursor.lastrowid
 
@@ -1033,7 +1530,6 @@ def update_finance_entry(entry_id):
         404: Entry or category not found
         500: Server error
     """
-    current_user = get_jwt_identity()
     data = request.get_json()
 
     if not data:
@@ -1073,15 +1569,12 @@ def update_finance_entry(entry_id):
         return jsonify({"error": "Datetime must be ISO 8601 format with timezone"}), 400
 
     try:
+        user_id = current_user_id()
         with get_cursor() as cursor:
             # Verify entry belongs to this user
             cursor.execute(
-                """
-                SELECT fe.id FROM finance_entries fe
-                JOIN users u ON fe.user_id = u.id
-                WHERE fe.id = %s AND u.username = %s
-                """,
-                (entry_id, current_user),
+                "SELECT id FROM finance_entries WHERE id = %s AND user_id = %s",
+                (entry_id, user_id),
             )
             entry = cursor.fetchone()
 
@@ -1131,7 +1624,6 @@ def delete_finance_entry():
         404: Entry not found
         500: Server error
     """
-    current_user = get_jwt_identity()
     data = request.get_json()
 
     if not data or "entry_id" not in data:
@@ -1140,14 +1632,11 @@ def delete_finance_entry():
     entry_id = data["entry_id"]
 
     try:
+        user_id = current_user_id()
         with get_cursor() as cursor:
             cursor.execute(
-                """
-                SELECT fe.id FROM finance_entries fe
-                JOIN users u ON fe.user_id = u.id
-                WHERE fe.id = %s AND u.username = %s
-                """,
-                (entry_id, current_user),
+                "SELECT id FROM finance_entries WHERE id = %s AND user_id = %s",
+                (entry_id, user_id),
             )
             entry = cursor.fetchone()
 
@@ -1183,7 +1672,6 @@ def bulk_delete_finance_entries():
         400: Validation error
         500: Server error
     """
-    current_user = get_jwt_identity()
     data = request.get_json()
 
     if not data or "entry_ids" not in data:
@@ -1207,14 +1695,11 @@ def bulk_delete_finance_entries():
     placeholders = ", ".join(["%s"] * len(ids))
 
     try:
+        user_id = current_user_id()
         with get_cursor() as cursor:
             cursor.execute(
-                f"""
-                DELETE fe FROM finance_entries fe
-                JOIN users u ON fe.user_id = u.id
-                WHERE u.username = %s AND fe.id IN ({placeholders})
-                """,
-                (current_user, *ids),
+                f"DELETE FROM finance_entries WHERE user_id = %s AND id IN ({placeholders})",
+                (user_id, *ids),
             )
             deleted = cursor.rowcount
 
@@ -1250,7 +1735,6 @@ def batch_import_finance_entries():
         400: Validation error
         500: Server error
     """
-    current_user = get_jwt_identity()
     data = request.get_json()
 
     if not data or "entries" not in data:
@@ -1262,36 +1746,7 @@ def batch_import_finance_entries():
 
     results = {"success": 0, "failed": 0, "errors": []}
 
-    # First, get or create all finance categories. The cache is keyed by
-    # casefolded name because finance_categories.name is uniquely indexed with
-    # a case-insensitive collation — looking up case-sensitively would miss an
-    # existing "Food" for an incoming "FOOD" and then fail on a duplicate key.
-    category_cache = {}
-    try:
-        with get_cursor() as cursor:
-            cursor.execute("SELECT id, name FROM finance_categories")
-            existing_categories = cursor.fetchall()
-            for cat in existing_categories:
-                category_cache[cat["name"].casefold()] = cat["id"]
-    except Error as e:
-        logger.error(f"Database error fetching categories: {e}")
-        return jsonify({"error": "Failed to fetch categories"}), 500
-
-    # Get user ID once
-    user_id = None
-    try:
-        with get_cursor() as cursor:
-            cursor.execute("SELECT id FROM users WHERE username = %s", (current_user,))
-            user = cursor.fetchone()
-            if user:
-                user_id = user["id"]
-    except Error as e:
-        logger.error(f"Database error fetching user: {e}")
-        return jsonify({"error": "Failed to fetch user"}), 500
-
-    if not user_id:
-        return jsonify({"error": "User not found"}), 404
-
+    valid_rows = []
     for i, entry in enumerate(entries):
         try:
             category_name = entry.get("category", "").strip()
@@ -1318,39 +1773,46 @@ def batch_import_finance_entries():
                 raise ValueError("Timezone information required")
             purchase_date = purchase_date.astimezone(timezone.utc)
 
-            # Get or create category. A name that is not on record yet is
-            # normalized first, so an imported "ALIMENTAÇÃO" is stored as
-            # "Alimentação"; one that already exists keeps its stored spelling.
-            category_key = category_name.casefold()
-            if category_key not in category_cache:
-                with get_cursor() as cursor:
-                    cursor.execute(
-                        "INSERT INTO finance_categories (name) VALUES (%s)",
-                        (normalize_category_name(category_name),)
-                    )
-                    category_cache[category_key] = cursor.lastrowid
-
-            category_id = category_cache[category_key]
-
-            # Insert finance entry
-            with get_cursor() as cursor:
-                cursor.execute(
-                    """
-                    INSERT INTO finance_entries (user_id, category_id, product_name, price, purchase_date, status)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    """,
-                    (user_id, category_id, product_name, price_value, purchase_date, status)
-                )
-
-            results["success"] += 1
+            valid_rows.append(
+                (i, category_name, product_name, price_value, purchase_date, status)
+            )
 
         except Exception as e:
             results["failed"] += 1
             results["errors"].append({"index": i, "error": str(e)})
             logger.error(f"Failed to import finance entry {i}: {e}")
 
-    return jsonify(results), 200
-
+    # Get user ID once
+    try:
+        user_id = current_user_id()
+    except Error as e:
+        logger.error(f"Database error fetching user: {e}")
+        return jsonify({"error": "Failed to fetch user"}), 500
+
+    if not user_id:
+        return jsonify({"error": "User not found"}), 404
+
+    if not valid_rows:
+        return jsonify(results), 200
+
+    # A category not on record yet is normalized before it is created, so an
+    # imported "ALIMENTAÇÃO" is stored as "Alimentação"; one that already
+    # exists keeps its stored spelling.
+    try:
+        with get_cursor() as cursor:
+            inserted, errors = write_finance_entries(cursor, user_id, valid_rows)
+    except Error as e:
+        logger.error(f"Database error during finance batch import: {e}")
+        return jsonify({"error": "Failed to import finance entries"}), 500
+
+    for error in errors:
+        logger.error(f"Failed to import finance entry {error['index']}: {error['error']}")
+    results["success"] += inserted
+    results["failed"] += len(errors)
+    results["errors"] = sorted(results["errors"] + errors, key=lambda e: e["index"])
+
+    return jsonify(results), 200
+
 
 # ─── Finance Bulk Generator ────────────────────────────────────────────────────
 
@@ -1424,7 +1886,6 @@ def batch_generate_finance_entries():
         400: Validation error
         500: Server error
     """
-    current_user = get_jwt_identity()
     data = request.get_json()
 
     if not data:
@@ -1529,27 +1990,8 @@ def batch_generate_finance_entries():
             ],
         }), 200
 
-    # Get or create all finance categories. The cache is keyed by casefolded
-    # name because finance_categories.name is uniquely indexed with a
-    # case-insensitive collation (see /finance/batch-import).
-    category_cache = {}
     try:
-        with get_cursor() as cursor:
-            cursor.execute("SELECT id, name FROM finance_categories")
-            existing_categories = cursor.fetchall()
-            for cat in existing_categories:
-                category_cache[cat["name"].casefold()] = cat["id"]
-    except Error as e:
-        logger.error(f"Database error fetching categories: {e}")
-        return jsonify({"error": "Failed to fetch categories"}), 500
-
-    user_id = None
-    try:
-        with get_cursor() as cursor:
-            cursor.execute("SELECT id FROM users WHERE username = %s", (current_user,))
-            user = cursor.fetchone()
-            if user:
-                user_id = user["id"]
+        user_id = current_user_id()
     except Error as e:
         logger.error(f"Database error fetching user: {e}")
         return jsonify({"error": "Failed to fetch user"}), 500
@@ -1557,46 +1999,160 @@ def batch_generate_finance_entries():
     if not user_id:
         return jsonify({"error": "User not found"}), 404
 
-    results = {"success": 0, "failed": 0, "errors": []}
+    try:
+        with get_cursor() as cursor:
+            inserted, errors = write_finance_entries(cursor, user_id, [
+                (i, row["category"], row["product_name"], row["price"], row["purchase_date"], status)
+                for i, row in enumerate(generated_rows)
+            ])
+    except Error as e:
+        logger.error(f"Database error generating finance entries: {e}")
+        return jsonify({"error": "Failed to generate finance entries"}), 500
+
+    for error in errors:
+        logger.error(f"Failed to generate finance entry {error['index']}: {error['error']}")
+    results = {
+        "success": inserted,
+        "failed": len(errors),
+        "errors": sorted(errors, key=lambda e: e["index"]),
+    }
 
-    for i, row in enumerate(generated_rows):
-        try:
-            category_key = row["category"].casefold()
-            if category_key not in category_cache:
-                with get_cursor() as cursor:
-                    cursor.execute(
-                        "INSERT INTO finance_categories (name) VALUES (%s)",
-                        (normalize_category_name(row["category"]),)
-                    )
-                    category_cache[category_key] = cursor.lastrowid
+    return jsonify(results), 200
 
-            category_id = category_cache[category_key]
 
-            with get_cursor() as cursor:
-                cursor.execute(
-                    """
-                    INSERT INTO finance_entries (user_id, category_id, product_name, price, purchase_date, status)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    """,
-                    (user_id, category_id, row["product_name"], row["price"], row["purchase_date"], status)
-                )
+_pdf_parse_pool = ThreadPoolExecutor(
+    max_workers=PDF_PARSE_WORKERS, thread_name_prefix="pdf-parse"
+)
+_statement_cache = StatementCache(
+    STATEMENT_CACHE_SIZE,
+    disk_dir=STATEMENT_CACHE_DIR,
+    disk_max_entries=STATEMENT_CACHE_DISK_MAX_ENTRIES,
+)
 
-            results["success"] += 1
 
-        except Exception as e:
-            results["failed"] += 1
-            results["errors"].append({"index": i, "error": str(e)})
-            logger.error(f"Failed to generate finance entry {i}: {e}")
+def _parse_and_cache(pdf_file, cache_key, filename):
+    """Pool task: parse a spooled upload, close it, and cache the result."""
+    try:
+        statement = extract_statement_from_file(pdf_file, filename)
+    finally:
+        pdf_file.close()
+    _statement_cache.put(cache_key, statement)
+    return statement
 
-    return jsonify(results), 200
 
+class TooManyUploads(Exception):
+    """Raised by _iter_pdf_uploads on the file part past MAX_PDF_UPLOAD_COUNT."""
 
+
+def _iter_pdf_uploads(stream, boundary):
+    """
+    Yield (filename, spool, cache_key) for each "file" part of a
+    multipart/form-data body, reading `stream` no further than the end of the
+    part being yielded.
+
+    spool is None when the file is larger than MAX_PDF_UPLOAD_BYTES: the rest
+    of it is read and thrown away as it arrives. Otherwise the caller owns the
+    spool, rewound, and must close it. Other form fields are skipped.
+    Raises ValueError on a malformed body, RequestEntityTooLarge once more
+    than MAX_PDF_REQUEST_BYTES have been read, and TooManyUploads as soon as
+    the headers of file part MAX_PDF_UPLOAD_COUNT + 1 arrive, before any of
+    its data is read.
+    """
+    decoder = MultipartDecoder(boundary)
+    salt = parsers_version()
+    filename = spool = hasher = None
+    size = 0
+    request_size = 0
+    file_parts = 0
+    reads = iter(lambda: stream.read(PDF_UPLOAD_READ_SIZE), b"")
+
+    try:
+        for chunk in itertools.chain(reads, [None]):
+            if chunk is not None:
+                request_size += len(chunk)
+                if request_size > MAX_PDF_REQUEST_BYTES:
+                    raise RequestEntityTooLarge()
+            decoder.receive_data(chunk)
+            event = decoder.next_event()
+            while not isinstance(event, (Epilogue, NeedData)):
+                if isinstance(event, File) and event.name == "file" and event.filename:
+                    file_parts += 1
+                    if file_parts > MAX_PDF_UPLOAD_COUNT:
+                        raise TooManyUploads()
+                    filename = event.filename
+                    spool = tempfile.SpooledTemporaryFile(max_size=PDF_UPLOAD_SPOOL_BYTES)
+                    hasher = statement_cache_hasher(salt)
+                    size = 0
+                elif isinstance(event, Data):
+                    if spool is not None:
+                        size += len(event.data)
+                        if size > MAX_PDF_UPLOAD_BYTES:
+                            spool.close()
+                            spool = None
+                        else:
+                            spool.write(event.data)
+                            hasher.update(event.data)
+                    if filename is not None and not event.more_data:
+                        if spool is None:
+                            yield filename, None, None
+                        else:
+                            spool.seek(0)
+                            handed_over, spool = spool, None
+                            yield filename, handed_over, hasher.hexdigest()
+                        filename = None
+                else:
+                    filename = None
+                event = decoder.next_event()
+    finally:
+        if spool is not None:
+            spool.close()
+
+
+def _start_parse(filename, spool, cache_key):
+    """
+    Start turning one spooled upload into a statement: served from the
+    statement cache, or else submitted to the shared PDF pool, whose task
+    then owns `spool`. Returns (statement, future), exactly one of them set.
+    """
+    statement = _statement_cache.get(cache_key)
+    if statement is not None:
+        spool.close()
+        statement["arquivo"] = os.path.basename(filename)
+        return statement, None
+    return None, _pdf_parse_pool.submit(_parse_and_cache, spool, cache_key, filename)
+
+
+def _parse_result(filename, future, spool):
+    """
+    (statement, None) for a submitted upload, or (None, error message) for
+    the client. Called once the request has stopped waiting: a parse that
+    has not finished by then is given up on.
+    """
+    if not future.done():
+        # Not started yet: drop it (and its spool). Already running:
+        # pdftotext's own timeout bounds it, and the task closes the spool,
+        # but this request no longer waits.
+        if future.cancel():
+            spool.close()
+        return None, PDF_PARSE_TIMED_OUT
+
+    try:
+        return future.result(), None
+    except StatementPdfError as e:
+        return None, str(e)
+    except Exception as e:
+        logger.error(f"Failed to parse Itau PDF {filename}: {e}")
+        return None, "Failed to parse the PDF"
+
+
+@app.route("/finance/parse-statement-pdf", methods=["POST"])
 @app.route("/finance/parse-itau-pdf", methods=["POST"])
 @jwt_required()
 def parse_itau_pdf():
     """
-    Parse one or more uploaded Itau credit card statement PDFs into finance
-    entries.
+    Parse one or more uploaded credit card statement PDFs into finance
+    entries. Each file's bank is recognized from its first page (see
+    statement_pdf.py); /finance/parse-itau-pdf is the route's original name.
 
     This endpoint only reads the PDFs — nothing is written to the database. The
     client previews the result and then posts the entries it wants to
@@ -1604,87 +2160,153 @@ def parse_itau_pdf():
 
     Each file is parsed independently so that one unreadable PDF does not sink
     the rest of the batch; its failure is reported in `failures` instead.
+    Files are streamed off the request, and each goes to the shared PDF pool
+    as soon as it has been read, up to PDF_PARSE_WORKERS of the request's
+    files at once. Any still unparsed PDF_PARSE_DEADLINE_SECONDS after the
+    request started are reported as timed out.
 
     Expected: multipart/form-data with one or more "file" fields holding PDFs.
 
     Returns:
         200: {
-            statements: [{ file, issued_on, due_on, cards, total, reconciled,
-                           entry_count, skipped_count }],
+            statements: [{ file, bank, issued_on, due_on, cards, total, reconciled,
+                           unreconciled_cards, reparsed_pages, entry_count,
+                           skipped_count }],
             failures: [{ file, error }],
             entries: [{ category, product_name, price, purchase_date, status,
                         card, file }],
             skipped: [{ ..., reason }]
         }
-        400: No files at all, or too many files
+        400: No files at all, too many files, or a malformed body
+        413: The request is larger than MAX_PDF_REQUEST_BYTES
         500: Server error
     """
-    uploads = [f for f in request.files.getlist("file") if f and f.filename]
-    if not uploads:
+    boundary = request.mimetype_params.get("boundary")
+    if request.mimetype != "multipart/form-data" or not boundary:
         return jsonify({"error": "At least one PDF file is required"}), 400
 
-    if len(uploads) > MAX_PDF_UPLOAD_COUNT:
-        return jsonify({
-            "error": f"Too many files (max {MAX_PDF_UPLOAD_COUNT} at a time)"
-        }), 400
-
     statements = []
     failures = []
     all_entries = []
     all_skipped = []
-    # An Itau statement is uniquely identified by its issue date, so the same
-    # statement downloaded twice under different filenames is caught here
+    # A statement is uniquely identified by its bank and issue date, so the
+    # same statement downloaded twice under different filenames is caught here
     # rather than silently importing every transaction on it twice.
     seen_issue_dates = {}
 
-    for uploaded in uploads:
-        filename = uploaded.filename
-        try:
-            pdf_bytes = uploaded.read()
-            if len(pdf_bytes) > MAX_PDF_UPLOAD_BYTES:
-                raise ItauPdfError("PDF is too large (max 10 MB)")
-
-            statement = extract_statement_from_bytes(pdf_bytes, filename)
-        except ItauPdfError as e:
-            failures.append({"file": filename, "error": str(e)})
-            continue
-        except Exception as e:
-            logger.error(f"Failed to parse Itau PDF {filename}: {e}")
-            failures.append({"file": filename, "error": "Failed to parse the PDF"})
-            continue
+    # Files are read off the request stream one at a time, and each is handed
+    # to the pool as soon as it is read. Reading stops while PDF_PARSE_WORKERS
+    # of this request's files are still parsing, so a request holds one more
+    # spooled file than that at most, however many it uploads. The shared
+    # pool caps concurrent pdftotext runs across requests. Results are taken
+    # in upload order, so the first copy of a duplicate always wins.
+    deadline = time.monotonic() + PDF_PARSE_DEADLINE_SECONDS
+    # (filename, statement, error, future, spool) per file, in upload order
+    parses = []
+    uploads = _iter_pdf_uploads(request.stream, boundary.encode("latin-1"))
+    try:
+        for filename, spool, cache_key in uploads:
+            if spool is None:
+                parses.append((filename, None, "PDF is too large (max 10 MB)", None, None))
+                continue
+
+            running = [p[3] for p in parses if p[3] is not None and not p[3].done()]
+            if len(running) >= PDF_PARSE_WORKERS:
+                wait(
+                    running,
+                    timeout=max(0, deadline - time.monotonic()),
+                    return_when=FIRST_COMPLETED,
+                )
+            if time.monotonic() >= deadline:
+                spool.close()
+                parses.append((filename, None, PDF_PARSE_TIMED_OUT, None, None))
+                continue
 
-        issued_on = statement["emissao"]
-        if issued_on in seen_issue_dates:
-            failures.append({
+            statement, future = _start_parse(filename, spool, cache_key)
+            parses.append((filename, statement, None, future, spool))
+
+        wait(
+            [p[3] for p in parses if p[3] is not None],
+            timeout=max(0, deadline - time.monotonic()),
+        )
+
+        for filename, statement, error, future, spool in parses:
+            if future is not None:
+                statement, error = _parse_result(filename, future, spool)
+            if error:
+                failures.append({"file": filename, "error": error})
+                continue
+
+            issued_on = statement["emissao"]
+            bank = statement.get("banco", "itau")
+            if (bank, issued_on) in seen_issue_dates:
+                failures.append({
+                    "file": filename,
+                    "error": (
+                        f"Same statement as {seen_issue_dates[bank, issued_on]} "
+                        f"(both issued {issued_on}) — skipped to avoid duplicates"
+                    ),
+                })
+                continue
+            seen_issue_dates[bank, issued_on] = filename
+
+            entries, skipped = statement_to_finance_entries(statement)
+            for row in entries:
+                row["file"] = filename
+            for row in skipped:
+                row["file"] = filename
+
+            all_entries.extend(entries)
+            all_skipped.extend(skipped)
+            statements.append({
                 "file": filename,
-                "error": (
-                    f"Same statement as {seen_issue_dates[issued_on]} "
-                    f"(both issued {issued_on}) — skipped to avoid duplicates"
-                ),
+                "bank": bank,
+                "issued_on": issued_on,
+                "due_on": statement["vencimento"],
+                "cards": sorted(statement["titulares"].keys()),
+                "total": statement["resumo"]["total_lancamentos"],
+                # False means the transactions we read do not add up to the totals
+                # printed on the statement, i.e. the parse likely missed something.
+                "reconciled": statement["resumo"]["conferido"],
+                # Cards whose lines do not add up to their printed subtotal:
+                # { card, computed, declared, delta, pages }.
+                "unreconciled_cards": [
+                    {
+                        "card": d["cartao_final"],
+                        "computed": d["total_calculado"],
+                        "declared": d["total_declarado"],
+                        "delta": d["diferenca"],
+                        "pages": d["paginas"],
+                    }
+                    for d in statement["reconciliacao"]["divergencias"]
+                ],
+                # Pages re-read with a different column split to reconcile.
+                "reparsed_pages": [
+                    p["pagina"] for p in statement["reconciliacao"]["paginas_reprocessadas"]
+                ],
+                "entry_count": len(entries),
+                "skipped_count": len(skipped),
             })
-            continue
-        seen_issue_dates[issued_on] = filename
-
-        entries, skipped = statement_to_finance_entries(statement)
-        for row in entries:
-            row["file"] = filename
-        for row in skipped:
-            row["file"] = filename
-
-        all_entries.extend(entries)
-        all_skipped.extend(skipped)
-        statements.append({
-            "file": filename,
-            "issued_on": issued_on,
-            "due_on": statement["vencimento"],
-            "cards": sorted(statement["titulares"].keys()),
-            "total": statement["resumo"]["total_lancamentos"],
-            # False means the transactions we read do not add up to the totals
-            # printed on the statement, i.e. the parse likely missed something.
-            "reconciled": statement["resumo"]["conferido"],
-            "entry_count": len(entries),
-            "skipped_count": len(skipped),
-        })
+    except ValueError as e:
+        logger.error(f"Malformed PDF upload: {e}")
+        return jsonify({"error": "Malformed multipart body"}), 400
+    except TooManyUploads:
+        return jsonify({
+            "error": f"Too many files (max {MAX_PDF_UPLOAD_COUNT} at a time)"
+        }), 400
+    except RequestEntityTooLarge:
+        return jsonify({
+            "error": f"Upload is too large (max {MAX_PDF_REQUEST_BYTES // (1024 * 1024)} MB in total)"
+        }), 413
+    finally:
+        uploads.close()
+        # Files still queued when the request bailed out early
+        for _, _, _, future, spool in parses:
+            if future is not None and not future.done() and future.cancel():
+                spool.close()
+
+    if not parses:
+        return jsonify({"error": "At least one PDF file is required"}), 400
 
     statements.sort(key=lambda s: s["issued_on"])
     all_entries.sort(key=lambda e: e["purchase_date"])
@@ -1716,185 +2338,590 @@ def expired_token_callback(jwt_header, jwt_payload):
 # ─── TODO Routes ──────────────────────────────────────────────────────────────
 
 
-def _next_recurrence_date(dt, rule):
-    """Compute the next occurrence of dt for a given recurrence rule."""
-    if rule == "daily":
-        return dt + timedelta(days=1)
-    if rule == "weekly":
-        return dt + timedelta(weeks=1)
-    if rule == "monthly":
-        year = dt.year + (dt.month // 12)
-        month = dt.month % 12 + 1
-        day = min(dt.day, calendar.monthrange(year, month)[1])
-        return dt.replace(year=year, month=month, day=day)
-    return dt
-
-
 def _resolve_or_create_tag_ids(cursor, tag_names):
-    """Get-or-create each tag name and return their ids."""
-    tag_ids = []
+    """
+    Get-or-create the given tag names and return their ids, in the order the
+    names were given, each once. Names that are blank or over 50 characters
+    are skipped. Takes one SELECT when every tag already exists, plus one
+    INSERT and one more SELECT for the new ones.
+    """
+    names = []
     for raw_name in tag_names:
         name = (raw_name or "").strip()
-        if not name or len(name) > 50:
-            continue
-        cursor.execute("SELECT id FROM todo_tags WHERE name = %s", (name,))
-        tag = cursor.fetchone()
-        if not tag:
-            cursor.execute("INSERT INTO todo_tags (name) VALUES (%s)", (name,))
-            tag_id = cursor.lastrowid
-        else:
-            tag_id = tag["id"]
-        tag_ids.append(tag_id)
+        if name and len(name) <= 50:
+            names.append(name)
+
+    ids = ensure_named_rows(cursor, "todo_tags", names, max_length=50)
+    tag_ids = []
+    for name in names:
+        tag_id = ids.get(collation_key(name))
+        if tag_id is not None and tag_id not in tag_ids:
+            tag_ids.append(tag_id)
     return tag_ids
 
 
+def _insert_todo_item_tags(cursor, pairs):
+    """Attach tags given as (todo_id, tag_id) pairs, in one INSERT IGNORE."""
+    if not pairs:
+        return
+    values = ", ".join(["(%s, %s)"] * len(pairs))
+    cursor.execute(
+        f"INSERT IGNORE INTO todo_item_tags (todo_id, tag_id) VALUES {values}",
+        [value for pair in pairs for value in pair],
+    )
+
+
 def _set_todo_item_tags(cursor, item_id, tag_ids):
-    """Replace the tag set for a TODO item."""
-    cursor.execute("DELETE FROM todo_item_tags WHERE todo_id = %s", (item_id,))
-    for tag_id in tag_ids:
+    """
+    Replace the tag set for a TODO item. Only the difference from the
+    current set is written: one DELETE for the tags dropped and one INSERT
+    for the tags added, either skipped when there is nothing to do.
+    """
+    cursor.execute(
+        "SELECT tag_id FROM todo_item_tags WHERE todo_id = %s", (item_id,)
+    )
+    current = {row["tag_id"] for row in cursor.fetchall()}
+    wanted = set(tag_ids)
+
+    removed = sorted(current - wanted)
+    if removed:
+        placeholders = ", ".join(["%s"] * len(removed))
         cursor.execute(
-            "INSERT IGNORE INTO todo_item_tags (todo_id, tag_id) VALUES (%s, %s)",
-            (item_id, tag_id),
+            f"DELETE FROM todo_item_tags WHERE todo_id = %s AND tag_id IN ({placeholders})",
+            [item_id, *removed],
         )
+    _insert_todo_item_tags(
+        cursor, [(item_id, tag_id) for tag_id in tag_ids if tag_id not in current]
+    )
 
 
-def _copy_todo_item_tags(cursor, from_item_id, to_item_id):
+def _copy_todo_item_tags(cursor, copies):
+    """
+    Give newly created TODO items the tags of the items they were made
+    from. `copies` maps source item id -> new item id. One SELECT reads every
+    source's tags and one INSERT attaches them all.
+    """
+    if not copies:
+        return
+    source_ids = list(copies)
+    placeholders = ", ".join(["%s"] * len(source_ids))
     cursor.execute(
-        "SELECT tag_id FROM todo_item_tags WHERE todo_id = %s", (from_item_id,)
+        f"SELECT todo_id, tag_id FROM todo_item_tags WHERE todo_id IN ({placeholders})",
+        source_ids,
+    )
+    _insert_todo_item_tags(
+        cursor,
+        [(copies[row["todo_id"]], row["tag_id"]) for row in cursor.fetchall()],
     )
-    tag_ids = [row["tag_id"] for row in cursor.fetchall()]
-    _set_todo_item_tags(cursor, to_item_id, tag_ids)
 
 
-def _spawn_next_recurrence(cursor, item):
+def _normalize_recurrence_rule(rule):
+    """A recurrence_rule from a request body as it is stored: "none", or the
+    rule as recurrence.normalize_rule() gives it. Raises ValueError with a
+    message for the client."""
+    if rule == "none":
+        return rule
+    if not isinstance(rule, str):
+        raise ValueError("recurrence_rule must be a string")
+    try:
+        return normalize_rule(rule)
+    except ValueError as e:
+        raise ValueError(
+            f"recurrence_rule must be \"none\", daily, weekly, monthly, yearly "
+            f"or FREQ=...;INTERVAL=n: {e}"
+        )
+
+
+def _spawn_next_recurrences(cursor, items):
     """
-    When a recurring TODO item is completed, insert its next occurrence.
-    `item` must contain: user_id, category_id, title, description, priority,
-    recurrence_rule, due_date, id.
-    No-op if recurrence_rule is 'none', due_date is not set, or this item has
-    already spawned an occurrence before (e.g. it was un-completed and
-    completed again) — each occurrence spawns its successor at most once.
+    When recurring TODO items are completed, insert each one's next
+    occurrence. Every item must contain: user_id, category_id, title,
+    description, priority, recurrence_rule, due_date, id.
+    Items are skipped if recurrence_rule is 'none', due_date is not set, or
+    the item has already spawned an occurrence before (e.g. it was
+    un-completed and completed again) — each occurrence spawns its successor
+    at most once.
+
+    The next due date is the series' first occurrence after the item's own,
+    counted from the series start, so a monthly item due on the 31st comes
+    back on the 31st after a short month. An item's series (see
+    todo_series) moves on to the new occurrence; a new occurrence of an item
+    that had no series starts one (todo_series.extend_user_series).
+
+    However many items there are, this takes one SELECT for earlier spawns,
+    one for the series, one INSERT for every new occurrence, one SELECT to
+    read their ids back, one UPDATE moving the series on, the bulk tag copy
+    and a series extension per user whose items had no series.
     """
-    if item["recurrence_rule"] == "none" or item["due_date"] is None:
+    recurring = {
+        item["id"]: item
+        for item in items
+        if item["recurrence_rule"] != "none" and item["due_date"] is not None
+    }
+    if not recurring:
         return
 
+    placeholders = ", ".join(["%s"] * len(recurring))
     cursor.execute(
-        "SELECT id FROM todo_items WHERE recurrence_parent_id = %s LIMIT 1",
-        (item["id"],),
+        f"SELECT DISTINCT recurrence_parent_id FROM todo_items "
+        f"WHERE recurrence_parent_id IN ({placeholders})",
+        list(recurring),
     )
-    if cursor.fetchone():
+    for row in cursor.fetchall():
+        recurring.pop(row["recurrence_parent_id"], None)
+    if not recurring:
         return
 
-    next_due = _next_recurrence_date(item["due_date"], item["recurrence_rule"])
-
+    placeholders = ", ".join(["%s"] * len(recurring))
     cursor.execute(
-        """
-        INSERT INTO todo_items
-            (user_id, category_id, title, description, priority, status,
-             due_date, recurrence_rule, recurrence_parent_id)
-        VALUES (%s, %s, %s, %s, %s, 'pending', %s, %s, %s)
-        """,
-        (
+        f"SELECT head_item_id, dtstart FROM todo_series WHERE head_item_id IN ({placeholders})",
+        list(recurring),
+    )
+    series_starts = {row["head_item_id"]: row["dtstart"] for row in cursor.fetchall()}
+
+    params = []
+    for item in recurring.values():
+        dtstart = series_starts.get(item["id"], item["due_date"])
+        params.extend((
             item["user_id"],
             item["category_id"],
             item["title"],
             item["description"],
             item["priority"],
-            next_due,
+            next_occurrence(item["recurrence_rule"], dtstart, item["due_date"]),
             item["recurrence_rule"],
             item["id"],
-        ),
+        ))
+    values = ", ".join(["(%s, %s, %s, %s, %s, 'pending', %s, %s, %s)"] * len(recurring))
+    cursor.execute(
+        f"""
+        INSERT INTO todo_items
+            (user_id, category_id, title, description, priority, status,
+             due_date, recurrence_rule, recurrence_parent_id)
+        VALUES {values}
+        """,
+        params,
+    )
+
+    # Multi-row INSERTs only report the first new id, so read them all back.
+    cursor.execute(
+        f"SELECT id, recurrence_parent_id FROM todo_items "
+        f"WHERE recurrence_parent_id IN ({placeholders})",
+        list(recurring),
     )
-    new_item_id = cursor.lastrowid
-    _copy_todo_item_tags(cursor, item["id"], new_item_id)
+    spawned = {row["recurrence_parent_id"]: row["id"] for row in cursor.fetchall()}
+
+    if series_starts:
+        heads = list(series_starts)
+        cases = " ".join(["WHEN %s THEN %s"] * len(heads))
+        head_placeholders = ", ".join(["%s"] * len(heads))
+        cursor.execute(
+            f"""
+            UPDATE todo_series
+            SET head_item_id = CASE head_item_id {cases} END
+            WHERE head_item_id IN ({head_placeholders})
+            """,
+            [value for head in heads for value in (head, spawned[head])] + heads,
+        )
+
+    _copy_todo_item_tags(cursor, spawned)
+
+    unstarted = {item["user_id"] for head, item in recurring.items() if head not in series_starts}
+    for user_id in unstarted:
+        extend_user_series(cursor, user_id)
+
+
+# Matches the priority_rank generated column: the order /todo lists in.
+TODO_PRIORITY_RANKS = {"high": 1, "medium": 2, "low": 3}
+
 
+def _encode_todo_cursor(item):
+    """Opaque keyset cursor for the TODO item after which the next page starts."""
+    due_date = item["due_date"]
+    payload = json.dumps({
+        "rank": TODO_PRIORITY_RANKS[item["priority"]],
+        "due_date": due_date.isoformat() if due_date is not None else None,
+        "id": item["id"],
+    })
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
 
-def retrieve_todo_items_from_username(username):
-    """Helper function to fetch TODO items for a user."""
+
+def _decode_todo_cursor(cursor_str):
+    """Inverse of _encode_todo_cursor: (rank, due_date or None, id). Raises
+    ValueError on anything that was not produced by it."""
     try:
-        with get_cursor() as cursor:
-            cursor.execute("SELECT id FROM users WHERE username = %s", (username,))
-            user = cursor.fetchone()
+        payload = json.loads(base64.urlsafe_b64decode(cursor_str.encode("ascii")))
+        due_date = payload["due_date"]
+        return (
+            int(payload["rank"]),
+            datetime.fromisoformat(due_date) if due_date is not None else None,
+            int(payload["id"]),
+        )
+    except (TypeError, KeyError, ValueError):
+        raise ValueError("Invalid cursor")
 
-            if not user:
-                return jsonify({"error": "User not found"}), 404
 
-            cursor.execute(
-                """
-                SELECT
-                    ti.id,
-                    fc.name AS category,
-                    ti.title,
-                    ti.description,
-                    ti.priority,
-                    ti.status,
-                    ti.due_date,
-                    ti.recurrence_rule,
-                    ti.recurrence_parent_id,
-                    ti.completed_at,
-                    ti.created_at,
-                    ti.updated_at
-                FROM todo_items ti
-                JOIN todo_categories fc ON ti.category_id = fc.id
-                WHERE ti.user_id = %s
-                ORDER BY
-                    CASE ti.priority
-                        WHEN 'high' THEN 1
-                        WHEN 'medium' THEN 2
-                        WHEN 'low' THEN 3
-                    END,
-                    ti.due_date ASC,
-                    ti.created_at DESC
-                """,
-                (user["id"],),
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+TODO_LIST_COLUMNS = (
+    "id", "category", "title", "description", "priority", "status",
+    "due_date", "recurrence_rule", "recurrence_parent_id", "completed_at",
+    "created_at", "updated_at",
+)
+TODO_LIST_ORDER = "ti.priority_rank ASC, ti.due_date ASC, ti.id DESC"
+
+
+def _todo_list_branch(items_table, tags_table, user_id, filters, after, limit):
+    """One table's share of the GET /todo query: its SELECT and params."""
+    conditions = ["ti.user_id = %s"]
+    params = [user_id]
+
+    for column, key in (("ti.status", "statuses"), ("ti.priority", "priorities")):
+        values = filters.get(key)
+        if len(values or ()) == 1:
+            conditions.append(f"{column} = %s")
+            params.extend(values)
+        elif values:
+            conditions.append(f"{column} IN ({', '.join(['%s'] * len(values))})")
+            params.extend(values)
+    if filters.get("category"):
+        conditions.append("fc.name = %s")
+        params.append(filters["category"])
+    for tag in filters.get("tags") or ():
+        conditions.append(
+            f"""EXISTS (
+                SELECT 1 FROM {tags_table} tit
+                JOIN todo_tags tt ON tit.tag_id = tt.id
+                WHERE tit.todo_id = ti.id AND tt.name = %s
+            )"""
+        )
+        params.append(tag)
+    if filters.get("due_from") is not None:
+        conditions.append("ti.due_date >= %s")
+        params.append(filters["due_from"])
+    if filters.get("due_to") is not None:
+        conditions.append("ti.due_date < %s")
+        params.append(filters["due_to"])
+    if filters.get("text"):
+        pattern = f"%{_escape_like(filters['text'])}%"
+        conditions.append("(ti.title LIKE %s OR ti.description LIKE %s)")
+        params.extend([pattern, pattern])
+
+    if after is not None:
+        rank, due_date, item_id = after
+        # NULL due dates sort first, so "later than NULL" means "has a date".
+        if due_date is None:
+            conditions.append(
+                "(ti.priority_rank > %s OR (ti.priority_rank = %s AND "
+                "(ti.due_date IS NOT NULL OR ti.id < %s)))"
             )
-            items = cursor.fetchall()
+            params.extend([rank, rank, item_id])
+        else:
+            conditions.append(
+                "(ti.priority_rank > %s OR (ti.priority_rank = %s AND "
+                "(ti.due_date > %s OR (ti.due_date = %s AND ti.id < %s))))"
+            )
+            params.extend([rank, rank, due_date, due_date, item_id])
 
-            # Attach tags per item (single grouped query, no N+1)
-            tags_by_item = {item["id"]: [] for item in items}
-            if items:
-                item_ids = list(tags_by_item.keys())
-                placeholders = ", ".join(["%s"] * len(item_ids))
-                cursor.execute(
-                    f"""
-                    SELECT tit.todo_id, tt.id, tt.name
-                    FROM todo_item_tags tit
-                    JOIN todo_tags tt ON tit.tag_id = tt.id
-                    WHERE tit.todo_id IN ({placeholders})
-                    ORDER BY tt.name
-                    """,
-                    item_ids,
-                )
-                for row in cursor.fetchall():
-                    tags_by_item[row["todo_id"]].append(
-                        {"id": row["id"], "name": row["name"]}
+    limit_clause = ""
+    if limit is not None:
+        limit_clause = "LIMIT %s"
+        params.append(limit + 1)
+
+    columns = ", ".join(
+        "fc.name AS category" if column == "category" else f"ti.{column}"
+        for column in TODO_LIST_COLUMNS
+    )
+    query = f"""
+        SELECT {columns}, ti.priority_rank
+        FROM {items_table} ti
+        JOIN todo_categories fc ON ti.category_id = fc.id
+        WHERE {" AND ".join(conditions)}
+        ORDER BY {TODO_LIST_ORDER}
+        {limit_clause}
+    """
+    return query, params
+
+
+def _todo_list_query(user_id, filters=None, after=None, limit=None, history=False):
+    """
+    Build the SELECT behind GET /todo, ordered by (priority_rank, due_date,
+    id DESC) with undated items first in each priority, as the list always
+    was. A status filter (or none) plus that order is a range on one of the
+    (user_id, [status,] priority_rank, due_date, id) indexes, so a page does
+    not grow with the number of completed items behind it.
+
+    `filters` may hold: statuses, priorities (lists), category, tags (every
+    one must be on the item), due_from / due_to ([from, to) on due_date) and
+    text (substring of title or description). `after` is a decoded keyset
+    cursor. With a limit, one extra row is asked for so the caller can tell
+    whether another page follows.
+
+    `history` adds archived items: the same SELECT runs on each table (each
+    taking at most a page from its own index) and the two are merged. A page
+    filtered on several statuses is split the same way, one SELECT per
+    status: an IN list on status would leave the index unable to supply
+    the order, and every matching item would be sorted for each page.
+    """
+    filters = filters or {}
+    tables = [("todo_items", "todo_item_tags")]
+    if history:
+        tables.append(("todo_items_archive", "todo_item_tags_archive"))
+    statuses = filters.get("statuses") or ()
+    if limit is not None and len(statuses) > 1:
+        branch_filters = [{**filters, "statuses": [status]} for status in statuses]
+    else:
+        branch_filters = [filters]
+
+    branches = [
+        _todo_list_branch(items_table, tags_table, user_id, branch_filter, after, limit)
+        for items_table, tags_table in tables
+        for branch_filter in branch_filters
+    ]
+    if len(branches) == 1:
+        return branches[0]
+
+    limit_clause = "LIMIT %s" if limit is not None else ""
+    union = " UNION ALL ".join(f"({query})" for query, _ in branches)
+    query = f"""
+        SELECT {", ".join(f"ti.{column}" for column in TODO_LIST_COLUMNS)}
+        FROM ({union}) AS ti
+        ORDER BY {TODO_LIST_ORDER}
+        {limit_clause}
+    """
+    params = [param for _, branch_params in branches for param in branch_params]
+    if limit is not None:
+        params.append(limit + 1)
+    return query, params
+
+
+def _attach_todo_tags(cursor, items, history=False):
+    """Attach each item's tags (single grouped query, no N+1) and convert
+    datetime fields to strings. Returns the same list. `history` also looks
+    up the tags of archived items."""
+    tags_by_item = {item["id"]: [] for item in items}
+    if items:
+        item_ids = list(tags_by_item.keys())
+        placeholders = ", ".join(["%s"] * len(item_ids))
+        item_tags = "todo_item_tags"
+        if history:
+            # MySQL pushes the IN below down into both halves.
+            item_tags = """(
+                SELECT todo_id, tag_id FROM todo_item_tags
+                UNION ALL
+                SELECT todo_id, tag_id FROM todo_item_tags_archive
+            )"""
+        cursor.execute(
+            f"""
+            SELECT tit.todo_id, tt.id, tt.name
+            FROM {item_tags} tit
+            JOIN todo_tags tt ON tit.tag_id = tt.id
+            WHERE tit.todo_id IN ({placeholders})
+            ORDER BY tt.name
+            """,
+            item_ids,
+        )
+        for row in cursor.fetchall():
+            tags_by_item[row["todo_id"]].append(
+                {"id": row["id"], "name": row["name"]}
+            )
+
+    for item in items:
+        item.pop("priority_rank", None)
+        for field in ["due_date", "completed_at", "created_at", "updated_at"]:
+            if item[field] is not None:
+                item[field] = item[field].isoformat()
+        item["tags"] = tags_by_item[item["id"]]
+    return items
+
+
+def stream_todo_items(user_id, filters=None, history=False):
+    """
+    Stream a user's TODO items as NDJSON, like stream_ndjson, but a keyset
+    page of STREAM_BATCH_SIZE at a time: each page is read in full and its
+    tags looked up on the same connection before the next page is asked
+    for. (An unbuffered cursor would keep the connection busy until the
+    last item, and a second pooled connection per batch lets concurrent
+    streams starve the pool of the connections they are all waiting on.)
+
+    The pages are read in one transaction, so they come from one snapshot.
+    """
+    def generate():
+        after = None
+        try:
+            with get_cursor() as cursor:
+                while True:
+                    query, params = _todo_list_query(
+                        user_id, filters, after, STREAM_BATCH_SIZE, history
                     )
+                    cursor.execute(query, params)
+                    items = cursor.fetchall()
+                    has_more = len(items) > STREAM_BATCH_SIZE
+                    items = items[:STREAM_BATCH_SIZE]
+                    if items:
+                        last = items[-1]
+                        after = (
+                            TODO_PRIORITY_RANKS[last["priority"]],
+                            last["due_date"],
+                            last["id"],
+                        )
+                        items = _attach_todo_tags(cursor, items, history)
+                        yield "".join(app.json.dumps(item) + "\n" for item in items)
+                    if not has_more:
+                        break
+        except Error as e:
+            logger.error(f"Database error while streaming: {e}")
+            yield app.json.dumps({"error": "Stream interrupted"}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+
+def retrieve_todo_items_from_username(
+    username, filters=None, after=None, limit=None, stream=False, history=False
+):
+    """Fetch a user's TODO items matching `filters` (see _todo_list_query),
+    archived ones too if `history`. With `limit` set, `next_cursor` is
+    included in the response; without it every matching item is returned in
+    one go. `stream` returns them as NDJSON."""
+    try:
+        user_id = current_user_id()
+        if not user_id:
+            return jsonify({"error": "User not found"}), 404
+
+        if stream:
+            return stream_todo_items(user_id, filters, history)
+
+        query, params = _todo_list_query(user_id, filters, after, limit, history)
+
+        with get_cursor() as cursor:
+            cursor.execute(query, params)
+            items = cursor.fetchall()
+
+            next_cursor = None
+            if limit is not None and len(items) > limit:
+                items = items[:limit]
+                next_cursor = _encode_todo_cursor(items[-1])
 
-            # Convert datetime objects to strings
-            for item in items:
-                for field in ["due_date", "completed_at", "created_at", "updated_at"]:
-                    if item[field] is not None:
-                        item[field] = item[field].isoformat()
-                item["tags"] = tags_by_item[item["id"]]
+            items = _attach_todo_tags(cursor, items, history)
 
-        return jsonify({"username": username, "items": items}), 200
+        if limit is None:
+            return jsonify({"username": username, "items": items}), 200
+
+        return jsonify(
+            {"username": username, "items": items, "next_cursor": next_cursor}
+        ), 200
 
     except Error as e:
         logger.error(f"Database error: {e}")
         return jsonify({"error": "Failed to fetch TODO items"}), 500
 
 
+def _todo_list_filters(args):
+    """Read GET /todo's filter parameters. Raises ValueError on a bad one."""
+    filters = {}
+    for key, param, valid in (
+        ("statuses", "status", ("pending", "in_progress", "completed")),
+        ("priorities", "priority", tuple(TODO_PRIORITY_RANKS)),
+    ):
+        values = args.getlist(param)
+        for value in values:
+            if value not in valid:
+                raise ValueError(f"{param} must be one of: {', '.join(valid)}")
+        if values:
+            filters[key] = sorted(set(values))
+
+    category = args.get("category", "").strip()
+    if category:
+        filters["category"] = category
+    tags = [tag.strip() for tag in args.getlist("tag") if tag.strip()]
+    if tags:
+        filters["tags"] = list(dict.fromkeys(tags))
+    text = args.get("q", "").strip()
+    if text:
+        filters["text"] = text
+
+    if args.get("due_from"):
+        filters["due_from"] = _parse_query_datetime(args["due_from"], "due_from")
+    if args.get("due_to"):
+        filters["due_to"] = _parse_query_datetime(args["due_to"], "due_to")
+    if (
+        filters.get("due_from") and filters.get("due_to")
+        and filters["due_to"] <= filters["due_from"]
+    ):
+        raise ValueError("due_to must be after due_from")
+    return filters
+
+
 @app.get("/todo")
 @jwt_required()
 def my_todo_items():
     """
-    Retrieves TODO items from a user from token username
+    Retrieves TODO items from a user from token username.
+
+    Query parameters (all optional):
+        status:   pending | in_progress | completed; repeat for several
+        priority: low | medium | high; repeat for several
+        category: category name
+        tag:      tag name; repeat to require several tags at once
+        due_from: ISO 8601 datetime; only items due at or after it
+        due_to:   ISO 8601 datetime; only items due before it
+        q:        text to look for in the title or description
+        history:  "true" includes archived items (see archive_history.py)
+        limit:    page size (max MAX_TODO_PAGE_SIZE); pages are only used
+                  when limit or cursor is given
+        cursor:   `next_cursor` from the previous page
+
+    Items come in priority order, then by due date (undated first), newest
+    first among equals. With `Accept: application/x-ndjson` every matching
+    item is streamed back one JSON object per line, unpaginated.
+
+    Returns:
+        200: { username, items } plus `next_cursor` (null on the last page)
+             when paginated
+        400: Invalid parameter
+        404: User not found
+        500: Server error
     """
     username = get_jwt_identity()
     if not username:
         return jsonify({"error": "Username is required"}), 400
 
-    return retrieve_todo_items_from_username(username)
+    try:
+        filters = _todo_list_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    history = request.args.get("history", "").lower() == "true"
+
+    if wants_ndjson():
+        return retrieve_todo_items_from_username(
+            username, filters, stream=True, history=history
+        )
+
+    if not request.args.get("limit") and not request.args.get("cursor"):
+        return retrieve_todo_items_from_username(username, filters, history=history)
+
+    after = None
+    if request.args.get("cursor"):
+        try:
+            after = _decode_todo_cursor(request.args["cursor"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    try:
+        limit = int(request.args.get("limit", TODO_PAGE_SIZE))
+        if not 1 <= limit <= MAX_TODO_PAGE_SIZE:
+            raise ValueError
+    except ValueError:
+        return jsonify(
+            {"error": f"limit must be an integer between 1 and {MAX_TODO_PAGE_SIZE}"}
+        ), 400
+
+    return retrieve_todo_items_from_username(
+        username, filters, after=after, limit=limit, history=history
+    )
 
 
 @app.route("/todo/categories", methods=["GET"])
@@ -2062,7 +3089,7 @@ def create_todo_item():
         "description": "string" (optional),
         "priority": "low" | "medium" | "high" (optional, default: "medium"),
         "due_date": "YYYY-MM-DD HH:MM:SS" (optional),
-        "recurrence_rule": "none" | "daily" | "weekly" | "monthly" (optional, default: "none"),
+        "recurrence_rule": "none" | "daily" | "weekly" | "monthly" | "yearly" | "FREQ=...;INTERVAL=n" (optional, default: "none"),
         "tags": ["string", ...] (optional)
     }
 
@@ -2072,7 +3099,6 @@ def create_todo_item():
         404: User or category not found
         500: Server error
     """
-    current_user = get_jwt_identity()
     data = request.get_json()
 
     required_fields = ["title", "category"]
@@ -2098,11 +3124,10 @@ def create_todo_item():
     if priority not in valid_priorities:
         return jsonify({"error": f"Priority must be one of: {', '.join(valid_priorities)}"}), 400
 
-    valid_recurrence_rules = ("none", "daily", "weekly", "monthly")
-    if recurrence_rule not in valid_recurrence_rules:
-        return jsonify(
-            {"error": f"recurrence_rule must be one of: {', '.join(valid_recurrence_rules)}"}
-        ), 400
+    try:
+        recurrence_rule = _normalize_recurrence_rule(recurrence_rule)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     if not isinstance(tag_names, list):
         return jsonify({"error": "tags must be an array of strings"}), 400
@@ -2120,15 +3145,11 @@ def create_todo_item():
             return jsonify({"error": "due_date must be ISO 8601 format with timezone"}), 400
 
     try:
-        with get_cursor() as cursor:
-            cursor.execute(
-                "SELECT id FROM users WHERE username = %s", (current_user,)
-            )
-            user = cursor.fetchone()
-
-            if not user:
-                return jsonify({"error": "User not found"}), 404
+        user_id = current_user_id()
+        if not user_id:
+            return jsonify({"error": "User not found"}), 404
 
+        with get_cursor() as cursor:
             cursor.execute(
                 "SELECT id FROM todo_categories WHERE name = %s", (category_name,)
             )
@@ -2144,7 +3165,7 @@ def create_todo_item():
                 VALUES (%s, %s, %s, %s, %s, %s, %s)
                 """,
                 (
-                    user["id"],
+                    user_id,
                     category["id"],
                     title,
                     description,
@@ -2155,8 +3176,12 @@ def create_todo_item():
             )
             item_id = cursor.lastrowid
 
+            # A brand-new item has no tags to diff against.
             tag_ids = _resolve_or_create_tag_ids(cursor, tag_names)
-            _set_todo_item_tags(cursor, item_id, tag_ids)
+            _insert_todo_item_tags(cursor, [(item_id, tag_id) for tag_id in tag_ids])
+
+            if recurrence_rule != "none" and due_date is not None:
+                extend_user_series(cursor, user_id)
 
             created_tags = []
             if tag_ids:
@@ -2203,7 +3228,7 @@ def update_todo_item(item_id):
         "priority": "low" | "medium" | "high" (optional),
         "status": "pending" | "in_progress" | "completed" (optional),
         "due_date": "YYYY-MM-DD HH:MM:SS" (optional),
-        "recurrence_rule": "none" | "daily" | "weekly" | "monthly" (optional),
+        "recurrence_rule": "none" | "daily" | "weekly" | "monthly" | "yearly" | "FREQ=...;INTERVAL=n" (optional),
         "tags": ["string", ...] (optional)
     }
 
@@ -2214,7 +3239,6 @@ def update_todo_item(item_id):
         404: TODO item or category not found
         500: Server error
     """
-    current_user = get_jwt_identity()
     data = request.get_json()
 
     if not data:
@@ -2237,11 +3261,11 @@ def update_todo_item(item_id):
     if status and status not in valid_statuses:
         return jsonify({"error": f"Status must be one of: {', '.join(valid_statuses)}"}), 400
 
-    valid_recurrence_rules = ("none", "daily", "weekly", "monthly")
-    if recurrence_rule and recurrence_rule not in valid_recurrence_rules:
-        return jsonify(
-            {"error": f"recurrence_rule must be one of: {', '.join(valid_recurrence_rules)}"}
-        ), 400
+    if recurrence_rule is not None:
+        try:
+            recurrence_rule = _normalize_recurrence_rule(recurrence_rule)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
     if tag_names is not None and not isinstance(tag_names, list):
         return jsonify({"error": "tags must be an array of strings"}), 400
@@ -2259,18 +3283,18 @@ def update_todo_item(item_id):
             return jsonify({"error": "due_date must be ISO 8601 format with timezone"}), 400
 
     try:
+        user_id = current_user_id()
         with get_cursor() as cursor:
             # Verify item belongs to this user, and fetch current state for
             # the recurrence-spawn decision below.
             cursor.execute(
                 """
-                SELECT ti.id, ti.user_id, ti.category_id, ti.title, ti.description,
-                       ti.priority, ti.status, ti.due_date, ti.recurrence_rule
-                FROM todo_items ti
-                JOIN users u ON ti.user_id = u.id
-                WHERE ti.id = %s AND u.username = %s
+                SELECT id, user_id, category_id, title, description,
+                       priority, status, due_date, recurrence_rule
+                FROM todo_items
+                WHERE id = %s AND user_id = %s
                 """,
-                (item_id, current_user),
+                (item_id, user_id),
             )
             item = cursor.fetchone()
 
@@ -2334,6 +3358,11 @@ def update_todo_item(item_id):
                 tag_ids = _resolve_or_create_tag_ids(cursor, tag_names)
                 _set_todo_item_tags(cursor, item_id, tag_ids)
 
+            # A new rule or due date starts the item's series over from it.
+            if recurrence_rule is not None or due_date is not None:
+                cursor.execute("DELETE FROM todo_series WHERE head_item_id = %s", (item_id,))
+                extend_user_series(cursor, user_id)
+
             # Spawn the next occurrence only on a genuine pending/in_progress
             # -> completed transition, never on re-completion.
             if status == "completed" and previous_status != "completed":
@@ -2341,9 +3370,9 @@ def update_todo_item(item_id):
                     recurrence_rule if recurrence_rule is not None else item["recurrence_rule"]
                 )
                 effective_due_date = due_date if due_date is not None else item["due_date"]
-                _spawn_next_recurrence(
+                _spawn_next_recurrences(
                     cursor,
-                    {
+                    [{
                         "id": item_id,
                         "user_id": item["user_id"],
                         "category_id": category_id or item["category_id"],
@@ -2352,7 +3381,7 @@ def update_todo_item(item_id):
                         "priority": priority or item["priority"],
                         "recurrence_rule": effective_rule,
                         "due_date": effective_due_date,
-                    },
+                    }],
                 )
 
         return jsonify({"message": "TODO item updated successfully", "id": item_id}), 200
@@ -2380,7 +3409,6 @@ def delete_todo_item():
         404: TODO item not found
         500: Server error
     """
-    current_user = get_jwt_identity()
     data = request.get_json()
 
     if not data or "item_id" not in data:
@@ -2389,14 +3417,11 @@ def delete_todo_item():
     item_id = data["item_id"]
 
     try:
+        user_id = current_user_id()
         with get_cursor() as cursor:
             cursor.execute(
-                """
-                SELECT ti.id FROM todo_items ti
-                JOIN users u ON ti.user_id = u.id
-                WHERE ti.id = %s AND u.username = %s
-                """,
-                (item_id, current_user),
+                "SELECT id FROM todo_items WHERE id = %s AND user_id = %s",
+                (item_id, user_id),
             )
             item = cursor.fetchone()
 
@@ -2418,6 +3443,16 @@ def bulk_update_todo_items():
     """
     Bulk update TODO item statuses.
 
+    The whole batch runs in one transaction and a fixed number of queries:
+    one ownership check for every item, one UPDATE per target status and
+    one batched spawn of the next occurrences of completed recurring items.
+    Items that fail validation or ownership are reported by index and the
+    rest still apply.
+
+    An item listed more than once ends up with the status it is given
+    last, and spawns its next occurrence only if that status newly
+    completes it.
+
     Expected JSON:
     {
         "updates": [
@@ -2426,12 +3461,13 @@ def bulk_update_todo_items():
         ]
     }
 
+    item_id may also be a string of digits, such as "5".
+
     Returns:
         200: { success: number, failed: number, errors: Array<{index, error}> }
         400: Validation error
         500: Server error
     """
-    current_user = get_jwt_identity()
     data = request.get_json()
 
     if not data or "updates" not in data:
@@ -2444,57 +3480,158 @@ def bulk_update_todo_items():
     results = {"success": 0, "failed": 0, "errors": []}
     valid_statuses = ("pending", "in_progress", "completed")
 
-    for i, update in enumerate(updates):
-        try:
-            item_id = update.get("item_id")
-            status = update.get("status")
+    def fail(index, message):
+        results["failed"] += 1
+        results["errors"].append({"index": index, "error": message})
+        logger.error(f"Failed to update TODO item {index}: {message}")
 
-            if not item_id or not status:
-                raise ValueError("item_id and status are required")
+    try:
+        user_id = current_user_id()
+    except Error as e:
+        logger.error(f"Database error fetching user: {e}")
+        return jsonify({"error": "Failed to fetch user"}), 500
 
-            if status not in valid_statuses:
-                raise ValueError(f"Status must be one of: {', '.join(valid_statuses)}")
+    requested = []
+    for i, update in enumerate(updates):
+        item_id = update.get("item_id") if isinstance(update, dict) else None
+        status = update.get("status") if isinstance(update, dict) else None
+
+        if isinstance(item_id, str) and item_id.strip().isdecimal():
+            item_id = int(item_id)
+
+        if not item_id or not status:
+            fail(i, "item_id and status are required")
+        elif status not in valid_statuses:
+            fail(i, f"Status must be one of: {', '.join(valid_statuses)}")
+        elif not isinstance(item_id, int) or isinstance(item_id, bool):
+            fail(i, "item_id must be an integer")
+        else:
+            requested.append((i, item_id, status))
 
+    try:
+        if requested:
             with get_cursor() as cursor:
-                # Verify item belongs to this user
+                # Verify every item belongs to this user, in one query
+                item_ids = sorted({item_id for _, item_id, _ in requested})
+                placeholders = ", ".join(["%s"] * len(item_ids))
                 cursor.execute(
-                    """
-                    SELECT ti.id, ti.user_id, ti.category_id, ti.title, ti.description,
-                           ti.priority, ti.status, ti.due_date, ti.recurrence_rule
-                    FROM todo_items ti
-                    JOIN users u ON ti.user_id = u.id
-                    WHERE ti.id = %s AND u.username = %s
+                    f"""
+                    SELECT id, user_id, category_id, title, description,
+                           priority, status, due_date, recurrence_rule
+                    FROM todo_items
+                    WHERE user_id = %s AND id IN ({placeholders})
                     """,
-                    (item_id, current_user),
+                    [user_id, *item_ids],
                 )
-                item = cursor.fetchone()
+                items = {item["id"]: item for item in cursor.fetchall()}
+
+                # An item listed twice ends up with its last status, and
+                # spawns only if that status completes it.
+                final_status = {}
+                for i, item_id, status in requested:
+                    if item_id not in items:
+                        fail(i, "TODO item not found or access denied")
+                        continue
+                    final_status[item_id] = status
+                    results["success"] += 1
+                newly_completed = [
+                    items[item_id]
+                    for item_id, status in final_status.items()
+                    if status == "completed" and items[item_id]["status"] != "completed"
+                ]
+
+                by_status = {}
+                for item_id, status in final_status.items():
+                    by_status.setdefault(status, []).append(item_id)
+                for status, status_ids in by_status.items():
+                    completed_at = datetime.now(timezone.utc) if status == "completed" else None
+                    placeholders = ", ".join(["%s"] * len(status_ids))
+                    cursor.execute(
+                        f"""
+                        UPDATE todo_items
+                        SET status = %s, completed_at = %s
+                        WHERE id IN ({placeholders})
+                        """,
+                        [status, completed_at, *status_ids],
+                    )
 
-                if not item:
-                    raise ValueError("TODO item not found or access denied")
+                _spawn_next_recurrences(cursor, newly_completed)
 
-                previous_status = item["status"]
-                completed_at = datetime.now(timezone.utc) if status == "completed" else None
+    except Error as e:
+        logger.error(f"Database error: {e}")
+        return jsonify({"error": "Failed to update TODO items"}), 500
 
-                cursor.execute(
-                    """
-                    UPDATE todo_items
-                    SET status = %s, completed_at = %s
-                    WHERE id = %s
-                    """,
-                    (status, completed_at, item_id),
-                )
+    results["errors"].sort(key=lambda error: error["index"])
+    return jsonify(results), 200
 
-                if status == "completed" and previous_status != "completed":
-                    _spawn_next_recurrence(cursor, item)
 
-            results["success"] += 1
+@app.get("/todo/occurrences")
+@jwt_required()
+def todo_occurrences():
+    """
+    Upcoming occurrences of the user's recurring TODO items, for the
+    calendar. An occurrence is a due date the series will reach after its
+    current item (`item_id`) is completed; it has no TODO item of its own
+    yet. Only reads the occurrences stored by the TODO write paths and
+    extend_recurrences.py.
 
-        except Exception as e:
-            results["failed"] += 1
-            results["errors"].append({"index": i, "error": str(e)})
-            logger.error(f"Failed to update TODO item {i}: {e}")
+    Query parameters:
+        from: ISO 8601 datetime; only occurrences due at or after it
+        to:   ISO 8601 datetime; only occurrences due before it, at most
+              RECURRENCE_HORIZON_DAYS from now
 
-    return jsonify(results), 200
+    Returns:
+        200: { occurrences: [{ series_id, item_id, title, category, priority,
+             due_date }] }, ordered by due date
+        400: Invalid parameter
+        404: User not found
+        500: Server error
+    """
+    if not request.args.get("from") or not request.args.get("to"):
+        return jsonify({"error": "from and to are required"}), 400
+    try:
+        window_start = _parse_query_datetime(request.args["from"], "from")
+        window_end = _parse_query_datetime(request.args["to"], "to")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if window_end <= window_start:
+        return jsonify({"error": "to must be after from"}), 400
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    if window_end > now + timedelta(days=RECURRENCE_HORIZON_DAYS):
+        return jsonify(
+            {"error": f"to must be within {RECURRENCE_HORIZON_DAYS} days from now"}
+        ), 400
+
+    try:
+        user_id = current_user_id()
+        if not user_id:
+            return jsonify({"error": "User not found"}), 404
+
+        with get_cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT o.series_id, s.head_item_id AS item_id, ti.title,
+                       tc.name AS category, ti.priority, o.due_date
+                FROM todo_occurrences o
+                JOIN todo_series s ON o.series_id = s.id
+                JOIN todo_items ti ON s.head_item_id = ti.id
+                JOIN todo_categories tc ON ti.category_id = tc.id
+                WHERE o.user_id = %s AND o.due_date >= %s AND o.due_date < %s
+                  AND o.due_date > ti.due_date
+                ORDER BY o.due_date, o.series_id
+                """,
+                (user_id, window_start, window_end),
+            )
+            occurrence_rows = cursor.fetchall()
+
+        for row in occurrence_rows:
+            row["due_date"] = row["due_date"].isoformat()
+        return jsonify({"occurrences": occurrence_rows}), 200
+
+    except Error as e:
+        logger.error(f"Database error: {e}")
+        return jsonify({"error": "Failed to fetch TODO occurrences"}), 500
 
 
 # ─── Pomodoro Routes ──────────────────────────────────────────────────────────
@@ -2518,7 +3655,6 @@ def start_pomodoro_session():
         404: User or TODO item not found
         500: Server error
     """
-    current_user = get_jwt_identity()
     data = request.get_json() or {}
     todo_id = data.get("todo_id")
     session_type = data.get("session_type", "pomodoro")
@@ -2530,51 +3666,48 @@ def start_pomodoro_session():
         ), 400
 
     try:
-        with get_cursor() as cursor:
-            cursor.execute(
-                "SELECT id FROM users WHERE username = %s", (current_user,)
-            )
-            user = cursor.fetchone()
-
-            if not user:
-                return jsonify({"error": "User not found"}), 404
+        user_id = current_user_id()
+        if not user_id:
+            return jsonify({"error": "User not found"}), 404
 
+        with get_cursor() as cursor:
             # Verify TODO item if provided
             if todo_id is not None:
                 cursor.execute(
-                    """
-                    SELECT ti.id FROM todo_items ti
-                    JOIN users u ON ti.user_id = u.id
-                    WHERE ti.id = %s AND u.username = %s
-                    """,
-                    (todo_id, current_user),
+                    "SELECT id FROM todo_items WHERE id = %s AND user_id = %s",
+                    (todo_id, user_id),
                 )
                 todo = cursor.fetchone()
 
                 if not todo:
                     return jsonify({"error": "TODO item not found or access denied"}), 404
 
-            # Self-heal: no scheduler exists to sweep abandoned sessions, so
-            # any session left dangling in 'in_progress' (refresh, tab close,
-            # crash) is cancelled the next time this user starts a new one.
+            # Create the session and make it the user's active one. Sessions
+            # left dangling in 'in_progress' (refresh, tab close, crash) are
+            # cancelled by the reaper, not here; one displaced from the
+            # active slot stays completable until then.
+            started_at = datetime.now(timezone.utc)
             cursor.execute(
                 """
-                UPDATE pomodoro_sessions
-                SET status = 'cancelled'
-                WHERE user_id = %s AND status = 'in_progress'
+                INSERT INTO pomodoro_sessions (user_id, todo_id, session_type, duration_seconds, status, session_date)
+                VALUES (%s, %s, %s, 0, 'in_progress', %s)
                 """,
-                (user["id"],),
+                (user_id, todo_id, session_type, started_at),
             )
+            session_id = cursor.lastrowid
 
-            # Create session record
             cursor.execute(
                 """
-                INSERT INTO pomodoro_sessions (user_id, todo_id, session_type, duration_seconds, status, session_date)
-                VALUES (%s, %s, %s, 0, 'in_progress', %s)
+                INSERT INTO active_pomodoro (user_id, session_id, todo_id, session_type, started_at)
+                VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    session_id = VALUES(session_id),
+                    todo_id = VALUES(todo_id),
+                    session_type = VALUES(session_type),
+                    started_at = VALUES(started_at)
                 """,
-                (user["id"], todo_id, session_type, datetime.now(timezone.utc)),
+                (user_id, session_id, todo_id, session_type, started_at),
             )
-            session_id = cursor.lastrowid
 
         return jsonify(
             {
@@ -2607,7 +3740,6 @@ def complete_pomodoro_session():
         404: Session not found
         500: Server error
     """
-    current_user = get_jwt_identity()
     data = request.get_json()
 
     if not data:
@@ -2627,31 +3759,29 @@ def complete_pomodoro_session():
         return jsonify({"error": "duration_seconds must be an integer"}), 400
 
     try:
+        user_id = current_user_id()
         with get_cursor() as cursor:
-            # Verify session belongs to this user and is still in progress
-            # (prevents double-completing an already-resolved session)
+            # Compare-and-swap: only a session of this user's that is still
+            # in progress changes (so an already-resolved session cannot be
+            # completed twice), then the active slot is freed if it still
+            # holds this session.
             cursor.execute(
                 """
-                SELECT ps.id FROM pomodoro_sessions ps
-                JOIN users u ON ps.user_id = u.id
-                WHERE ps.id = %s AND u.username = %s AND ps.status = 'in_progress'
+                UPDATE pomodoro_sessions
+                SET duration_seconds = %s, status = 'completed'
+                WHERE id = %s AND user_id = %s AND status = 'in_progress'
                 """,
-                (session_id, current_user),
+                (duration_seconds, session_id, user_id),
             )
-            session = cursor.fetchone()
-
-            if not session:
+            if cursor.rowcount == 0:
                 return jsonify({"error": "Session not found or access denied"}), 404
 
             cursor.execute(
-                """
-                UPDATE pomodoro_sessions
-                SET duration_seconds = %s, status = 'completed'
-                WHERE id = %s
-                """,
-                (duration_seconds, session_id),
+                "DELETE FROM active_pomodoro WHERE user_id = %s AND session_id = %s",
+                (user_id, session_id),
             )
 
+        invalidate_pomodoro_stats(user_id)
         return jsonify({"message": "Pomodoro session completed", "id": session_id}), 200
 
     except Error as e:
@@ -2677,7 +3807,6 @@ def cancel_pomodoro_session():
         404: Session not found
         500: Server error
     """
-    current_user = get_jwt_identity()
     data = request.get_json()
 
     if not data or "session_id" not in data:
@@ -2686,25 +3815,26 @@ def cancel_pomodoro_session():
     session_id = data["session_id"]
 
     try:
+        user_id = current_user_id()
         with get_cursor() as cursor:
+            # Compare-and-swap, as in /pomodoro/complete
             cursor.execute(
                 """
-                SELECT ps.id FROM pomodoro_sessions ps
-                JOIN users u ON ps.user_id = u.id
-                WHERE ps.id = %s AND u.username = %s AND ps.status = 'in_progress'
+                UPDATE pomodoro_sessions
+                SET status = 'cancelled'
+                WHERE id = %s AND user_id = %s AND status = 'in_progress'
                 """,
-                (session_id, current_user),
+                (session_id, user_id),
             )
-            session = cursor.fetchone()
-
-            if not session:
+            if cursor.rowcount == 0:
                 return jsonify({"error": "Session not found or access denied"}), 404
 
             cursor.execute(
-                "UPDATE pomodoro_sessions SET status = 'cancelled' WHERE id = %s",
-                (session_id,),
+                "DELETE FROM active_pomodoro WHERE user_id = %s AND session_id = %s",
+                (user_id, session_id),
             )
 
+        invalidate_pomodoro_stats(user_id)
         return jsonify({"message": "Pomodoro session cancelled", "id": session_id}), 200
 
     except Error as e:
@@ -2712,42 +3842,126 @@ def cancel_pomodoro_session():
         return jsonify({"error": "Failed to cancel Pomodoro session"}), 500
 
 
-def retrieve_pomodoro_sessions_from_username(username):
-    """Helper function to fetch Pomodoro sessions for a user."""
-    try:
-        with get_cursor() as cursor:
-            cursor.execute("SELECT id FROM users WHERE username = %s", (username,))
-            user = cursor.fetchone()
+@app.get("/pomodoro/active")
+@jwt_required()
+def active_pomodoro_session():
+    """
+    The user's running Pomodoro session, if any: one primary-key read of
+    their active_pomodoro slot, cheap enough for the timer to poll.
 
-            if not user:
-                return jsonify({"error": "User not found"}), 404
+    Returns:
+        200: { active: { session_id, session_type, todo_id, todo_title,
+             started_at } | null }
+        404: User not found
+        500: Server error
+    """
+    try:
+        user_id = current_user_id()
+        if not user_id:
+            return jsonify({"error": "User not found"}), 404
 
+        with get_cursor() as cursor:
             cursor.execute(
                 """
-                SELECT
-                    ps.id,
-                    ps.todo_id,
-                    ti.title AS todo_title,
-                    ps.session_type,
-                    ps.duration_seconds,
-                    ps.status,
-                    ps.session_date,
-                    ps.created_at
-                FROM pomodoro_sessions ps
-                LEFT JOIN todo_items ti ON ps.todo_id = ti.id
-                WHERE ps.user_id = %s
-                ORDER BY ps.session_date DESC
-                LIMIT 100
+                SELECT ap.session_id, ap.session_type, ap.todo_id,
+                       ti.title AS todo_title, ap.started_at
+                FROM active_pomodoro ap
+                LEFT JOIN todo_items ti ON ap.todo_id = ti.id
+                WHERE ap.user_id = %s
                 """,
-                (user["id"],),
+                (user_id,),
             )
-            sessions = cursor.fetchall()
+            active = cursor.fetchone()
+
+        if active:
+            active["started_at"] = active["started_at"].isoformat()
+        return jsonify({"active": active}), 200
+
+    except Error as e:
+        logger.error(f"Database error: {e}")
+        return jsonify({"error": "Failed to fetch the active Pomodoro session"}), 500
+
+
+POMODORO_SESSIONS_QUERY = """
+    SELECT
+        ps.id,
+        ps.todo_id,
+        ti.title AS todo_title,
+        ps.session_type,
+        ps.duration_seconds,
+        ps.status,
+        ps.session_date,
+        ps.created_at
+    FROM pomodoro_sessions ps
+    LEFT JOIN todo_items ti ON ps.todo_id = ti.id
+    WHERE ps.user_id = %s
+    ORDER BY ps.session_date DESC
+"""
+
+# Archived sessions, for history. Their TODO titles were copied in when they
+# were archived.
+POMODORO_ARCHIVE_SESSIONS_QUERY = """
+    SELECT id, todo_id, todo_title, session_type, duration_seconds, status,
+           session_date, created_at
+    FROM pomodoro_sessions_archive
+    WHERE user_id = %s
+    ORDER BY session_date DESC
+"""
+POMODORO_SESSIONS_PAGE_SIZE = 100
+
+
+def _pomodoro_sessions_query(user_id, history=False, limit=None):
+    """
+    Build the SELECT behind GET /pomodoro/sessions, newest first. `history`
+    adds archived sessions: each table is read in session_date order (taking
+    at most `limit` rows from its (user_id, session_date) index) and the two
+    are merged, as _todo_list_query does for items.
+    """
+    limit_clause = "LIMIT %s" if limit is not None else ""
+    limit_params = [limit] if limit is not None else []
+    query = f"{POMODORO_SESSIONS_QUERY} {limit_clause}"
+    params = [user_id, *limit_params]
+    if not history:
+        return query, params
+
+    query = f"""
+        SELECT id, todo_id, todo_title, session_type, duration_seconds, status,
+               session_date, created_at
+        FROM (({query}) UNION ALL ({POMODORO_ARCHIVE_SESSIONS_QUERY} {limit_clause})) AS ps
+        ORDER BY ps.session_date DESC
+        {limit_clause}
+    """
+    return query, params + [user_id, *limit_params, *limit_params]
 
-            # Convert datetime objects to strings
-            for session in sessions:
-                for field in ["session_date", "created_at"]:
-                    if session[field] is not None:
-                        session[field] = session[field].isoformat()
+
+def _serialize_pomodoro_sessions(sessions):
+    """Convert datetime objects to strings."""
+    for session in sessions:
+        for field in ["session_date", "created_at"]:
+            if session[field] is not None:
+                session[field] = session[field].isoformat()
+    return sessions
+
+
+def retrieve_pomodoro_sessions_from_username(username, stream=False, history=False):
+    """Helper function to fetch Pomodoro sessions for a user: the latest
+    POMODORO_SESSIONS_PAGE_SIZE as JSON, or the whole history when streamed.
+    `history` includes archived sessions."""
+    try:
+        user_id = current_user_id()
+        if not user_id:
+            return jsonify({"error": "User not found"}), 404
+
+        if stream:
+            query, params = _pomodoro_sessions_query(user_id, history)
+            return stream_ndjson(query, params, _serialize_pomodoro_sessions)
+
+        query, params = _pomodoro_sessions_query(
+            user_id, history, POMODORO_SESSIONS_PAGE_SIZE
+        )
+        with get_cursor() as cursor:
+            cursor.execute(query, params)
+            sessions = _serialize_pomodoro_sessions(cursor.fetchall())
 
         return jsonify({"username": username, "sessions": sessions}), 200
 
@@ -2760,13 +3974,127 @@ def retrieve_pomodoro_sessions_from_username(username):
 @jwt_required()
 def my_pomodoro_sessions():
     """
-    Retrieves Pomodoro sessions from a user from token username
+    Retrieves Pomodoro sessions from a user from token username.
+    Streams the full history as NDJSON when asked with
+    `Accept: application/x-ndjson`. `?history=true` includes archived
+    sessions.
     """
     username = get_jwt_identity()
     if not username:
         return jsonify({"error": "Username is required"}), 400
 
-    return retrieve_pomodoro_sessions_from_username(username)
+    return retrieve_pomodoro_sessions_from_username(
+        username,
+        stream=wants_ndjson(),
+        history=request.args.get("history", "").lower() == "true",
+    )
+
+
+# The Pomodoro page polls /pomodoro/stats, so each worker keeps a user's
+# last answer for a few seconds. Completing or cancelling a session drops it
+# in the worker that handled the change; other workers catch up within the
+# TTL.
+POMODORO_STATS_TTL_SECONDS = 10
+POMODORO_STATS_CACHE_SIZE = 1024
+
+_pomodoro_stats_cache = OrderedDict()
+_pomodoro_stats_cache_lock = threading.Lock()
+
+
+def _cached_pomodoro_stats(user_id):
+    with _pomodoro_stats_cache_lock:
+        cached = _pomodoro_stats_cache.get(user_id)
+        if cached is None:
+            return None
+        expires_at, stats = cached
+        if expires_at <= time.monotonic():
+            del _pomodoro_stats_cache[user_id]
+            return None
+        _pomodoro_stats_cache.move_to_end(user_id)
+        return stats
+
+
+def _store_pomodoro_stats(user_id, stats):
+    with _pomodoro_stats_cache_lock:
+        _pomodoro_stats_cache[user_id] = (
+            time.monotonic() + POMODORO_STATS_TTL_SECONDS, stats
+        )
+        _pomodoro_stats_cache.move_to_end(user_id)
+        while len(_pomodoro_stats_cache) > POMODORO_STATS_CACHE_SIZE:
+            _pomodoro_stats_cache.popitem(last=False)
+
+
+def invalidate_pomodoro_stats(user_id):
+    with _pomodoro_stats_cache_lock:
+        _pomodoro_stats_cache.pop(user_id, None)
+
+
+def _query_pomodoro_stats(user_id):
+    """
+    All of a user's Pomodoro figures in one pass over their completed
+    sessions. Each figure is a conditional aggregate over the same rows, and
+    the time windows are plain ranges on session_date, so the whole query is
+    answered from idx_pomodoro_sessions_stats without touching the table.
+
+    Focus numbers count 'pomodoro' sessions only; breaks are reported
+    separately so they do not dilute focus time. The all-time totals add
+    what has been archived, which pomodoro_archived_totals keeps per user;
+    archiving never reaches into the last week, so the other figures need
+    only the hot table.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    today_start = datetime.combine(now.date(), datetime.min.time())
+    tomorrow_start = today_start + timedelta(days=1)
+    week_start = now - timedelta(days=7)
+
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT
+                COUNT(IF(is_focus, 1, NULL)) + COALESCE(
+                    (SELECT sessions FROM pomodoro_archived_totals WHERE user_id = %s), 0
+                ) AS total_count,
+                COALESCE(SUM(IF(is_focus, duration_seconds, 0)), 0) + COALESCE(
+                    (SELECT total_seconds FROM pomodoro_archived_totals WHERE user_id = %s), 0
+                ) AS total_seconds,
+                COUNT(IF(is_focus AND is_today, 1, NULL)) AS today_count,
+                COALESCE(SUM(IF(is_focus AND is_today, duration_seconds, 0)), 0) AS today_seconds,
+                COUNT(IF(is_focus AND is_this_week, 1, NULL)) AS week_count,
+                COALESCE(SUM(IF(is_focus AND is_this_week, duration_seconds, 0)), 0) AS week_seconds,
+                COUNT(IF(NOT is_focus AND is_today, 1, NULL)) AS break_count,
+                COALESCE(SUM(IF(NOT is_focus AND is_today, duration_seconds, 0)), 0) AS break_seconds
+            FROM (
+                SELECT
+                    duration_seconds,
+                    session_type = 'pomodoro' AS is_focus,
+                    session_date >= %s AND session_date < %s AS is_today,
+                    session_date >= %s AS is_this_week
+                FROM pomodoro_sessions
+                WHERE user_id = %s AND status = 'completed'
+            ) AS completed
+            """,
+            (user_id, user_id, today_start, tomorrow_start, week_start, user_id),
+        )
+        row = cursor.fetchone()
+
+    return {
+        "total": {
+            "sessions": int(row["total_count"]),
+            "total_seconds": int(row["total_seconds"]),
+        },
+        "today": {
+            "sessions": int(row["today_count"]),
+            "total_seconds": int(row["today_seconds"]),
+        },
+        "week": {
+            "sessions": int(row["week_count"]),
+            "total_seconds": int(row["week_seconds"]),
+        },
+        "today_breaks": {
+            "sessions": int(row["break_count"]),
+            "total_seconds": int(row["break_seconds"]),
+        },
+    }
 
 
 @app.get("/pomodoro/stats")
@@ -2785,90 +4113,129 @@ def pomodoro_stats():
         return jsonify({"error": "Username is required"}), 400
 
     try:
-        with get_cursor() as cursor:
-            cursor.execute("SELECT id FROM users WHERE username = %s", (username,))
-            user = cursor.fetchone()
+        user_id = current_user_id()
+        if not user_id:
+            return jsonify({"error": "User not found"}), 404
 
-            if not user:
-                return jsonify({"error": "User not found"}), 404
+        stats = _cached_pomodoro_stats(user_id)
+        if stats is None:
+            stats = _query_pomodoro_stats(user_id)
+            _store_pomodoro_stats(user_id, stats)
 
-            user_id = user["id"]
+        return jsonify({"username": username, "stats": stats}), 200
 
-            # Total focus (pomodoro) sessions
-            cursor.execute(
-                """
-                SELECT COUNT(*) as count, COALESCE(SUM(duration_seconds), 0) as total_seconds
-                FROM pomodoro_sessions
-                WHERE user_id = %s AND status = 'completed' AND session_type = 'pomodoro'
-                """,
-                (user_id,),
-            )
-            total_stats = cursor.fetchone()
+    except Error as e:
+        logger.error(f"Database error: {e}")
+        return jsonify({"error": "Failed to fetch Pomodoro stats"}), 500
 
-            # Today's focus sessions
-            today = datetime.now(timezone.utc).date()
-            cursor.execute(
-                """
-                SELECT COUNT(*) as count, COALESCE(SUM(duration_seconds), 0) as total_seconds
-                FROM pomodoro_sessions
-                WHERE user_id = %s AND status = 'completed' AND session_type = 'pomodoro'
-                AND DATE(session_date) = %s
-                """,
-                (user_id, today),
-            )
-            today_stats = cursor.fetchone()
 
-            # This week's focus sessions (last 7 days)
-            cursor.execute(
-                """
-                SELECT COUNT(*) as count, COALESCE(SUM(duration_seconds), 0) as total_seconds
-                FROM pomodoro_sessions
-                WHERE user_id = %s AND status = 'completed' AND session_type = 'pomodoro'
-                AND session_date >= DATE_SUB(NOW(), INTERVAL 7 DAY)
-                """,
-                (user_id,),
-            )
-            week_stats = cursor.fetchone()
+# ─── Pomodoro Reaper ──────────────────────────────────────────────────────────
 
-            # Today's break time (short + long breaks), kept separate so it
-            # doesn't dilute the "focus time" numbers above
+
+def reap_stale_pomodoro_sessions(
+    stale_after_minutes=POMODORO_STALE_AFTER_MINUTES, batch_size=POMODORO_REAPER_BATCH_SIZE
+):
+    """
+    Cancel every Pomodoro session still in_progress `stale_after_minutes`
+    after it started, `batch_size` per transaction, freeing the active slots
+    that hold them. Cancelled sessions count
+    toward no stats, so no cache needs invalidating. Returns how many were
+    cancelled.
+    """
+    cutoff = (
+        datetime.now(timezone.utc).replace(tzinfo=None)
+        - timedelta(minutes=stale_after_minutes)
+    )
+    reaped = 0
+    while True:
+        with get_cursor() as cursor:
             cursor.execute(
                 """
-                SELECT COUNT(*) as count, COALESCE(SUM(duration_seconds), 0) as total_seconds
-                FROM pomodoro_sessions
-                WHERE user_id = %s AND status = 'completed'
-                AND session_type IN ('short_break', 'long_break')
-                AND DATE(session_date) = %s
+                SELECT id FROM pomodoro_sessions
+                WHERE status = 'in_progress' AND session_date < %s
+                ORDER BY session_date
+                LIMIT %s
+                FOR UPDATE
                 """,
-                (user_id, today),
+                (cutoff, batch_size),
             )
-            break_stats = cursor.fetchone()
+            ids = [row["id"] for row in cursor.fetchall()]
+            if ids:
+                placeholders = ", ".join(["%s"] * len(ids))
+                cursor.execute(
+                    f"UPDATE pomodoro_sessions SET status = 'cancelled' WHERE id IN ({placeholders})",
+                    ids,
+                )
+                cursor.execute(
+                    f"DELETE FROM active_pomodoro WHERE session_id IN ({placeholders})", ids
+                )
+        reaped += len(ids)
+        if len(ids) < batch_size:
+            return reaped
 
-        return jsonify({
-            "username": username,
-            "stats": {
-                "total": {
-                    "sessions": total_stats["count"],
-                    "total_seconds": int(total_stats["total_seconds"]),
-                },
-                "today": {
-                    "sessions": today_stats["count"],
-                    "total_seconds": int(today_stats["total_seconds"]),
-                },
-                "week": {
-                    "sessions": week_stats["count"],
-                    "total_seconds": int(week_stats["total_seconds"]),
-                },
-                "today_breaks": {
-                    "sessions": break_stats["count"],
-                    "total_seconds": int(break_stats["total_seconds"]),
-                },
-            },
-        }), 200
 
-    except Error as e:
-        logger.error(f"Database error: {e}")
-        return jsonify({"error": "Failed to fetch Pomodoro stats"}), 500
+def _acquire_reaper_lock(connection):
+    """Try, without waiting, to take the reaper's advisory lock on
+    `connection`. MySQL holds it until that connection closes, so a worker
+    that dies hands leadership on by itself."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (POMODORO_REAPER_LOCK,))
+        (acquired,) = cursor.fetchone()
+    finally:
+        cursor.close()
+    return acquired == 1
+
+
+def _run_pomodoro_reaper(stop):
+    """
+    Reaper thread body. Every interval the worker checks that it still holds
+    the advisory lock (on a connection of its own, outside the pool), or
+    tries to take it, and reaps only if it is the leader. A database error
+    drops the connection, and with it the lock, so another worker can take
+    over.
+    """
+    connection = None
+    leader = False
+    while not stop.wait(POMODORO_REAPER_INTERVAL_SECONDS):
+        try:
+            if connection is None or not connection.is_connected():
+                connection = mysql.connector.connect(**DB_CONFIG)
+                leader = False
+            if not leader:
+                leader = _acquire_reaper_lock(connection)
+                if leader:
+                    logger.info("This worker is now the Pomodoro reaper")
+            if leader:
+                reaped = reap_stale_pomodoro_sessions()
+                if reaped:
+                    logger.info(f"Cancelled {reaped} abandoned Pomodoro session(s)")
+        except Error as e:
+            logger.error(f"Pomodoro reaper failed: {e}")
+            if connection is not None:
+                try:
+                    connection.close()
+                except Error:
+                    pass
+            connection = None
+            leader = False
+
+
+_reaper_stop = threading.Event()
+_reaper_thread = None
+
+
+def start_pomodoro_reaper():
+    """Start this process's reaper thread, once. Every gunicorn worker calls
+    it (see gunicorn.conf.py); the advisory lock keeps all but one idle."""
+    global _reaper_thread
+    if POMODORO_REAPER_INTERVAL_SECONDS <= 0 or _reaper_thread is not None:
+        return
+    _reaper_thread = threading.Thread(
+        target=_run_pomodoro_reaper, args=(_reaper_stop,),
+        name="pomodoro-reaper", daemon=True,
+    )
+    _reaper_thread.start()
 
 
 # Runs under gunicorn too, where there is no __main__. Compose only starts this
@@ -2877,6 +4244,7 @@ normalize_existing_finance_categories()
 
 
 if __name__ == "__main__":
+    start_pomodoro_reaper()
     app.run(
         host="0.0.0.0",
         port=int(os.getenv("PORT", 3000)),
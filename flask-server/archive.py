@@ -0,0 +1,155 @@
+"""
+The archive tier: old, finished rows moved out of the hot tables.
+
+Completed TODO items and completed or cancelled Pomodoro sessions go to
+todo_items_archive and pomodoro_sessions_archive, so todo_items and
+pomodoro_sessions (and their indexes) hold only the working set. GET /todo
+and GET /pomodoro/sessions read the archive only when asked for history.
+archive_history.py runs archive_history() periodically.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+
+from db import get_cursor
+
+# archive_history() moves completed TODO items and finished Pomodoro
+# sessions older than ARCHIVE_AFTER_DAYS to the archive tables, at most
+# ARCHIVE_BATCH_SIZE rows per transaction. Never less than a week back, as
+# /pomodoro/stats reads the last week from the hot table alone.
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+MIN_ARCHIVE_AFTER_DAYS = 7
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+
+
+def _archive_pomodoro_batch(cursor, cutoff, batch_size):
+    """
+    Move up to `batch_size` completed or cancelled Pomodoro sessions from
+    before `cutoff` into pomodoro_sessions_archive, with their TODO titles,
+    and add the completed focus sessions among them to
+    pomodoro_archived_totals. Returns how many were moved.
+    """
+    cursor.execute(
+        """
+        SELECT id FROM pomodoro_sessions
+        WHERE session_date < %s AND status IN ('completed', 'cancelled')
+        ORDER BY session_date
+        LIMIT %s
+        FOR UPDATE
+        """,
+        (cutoff, batch_size),
+    )
+    ids = [row["id"] for row in cursor.fetchall()]
+    if not ids:
+        return 0
+
+    placeholders = ", ".join(["%s"] * len(ids))
+    cursor.execute(
+        f"""
+        INSERT INTO pomodoro_sessions_archive
+            (id, user_id, todo_id, todo_title, session_type, duration_seconds,
+             status, session_date, created_at)
+        SELECT ps.id, ps.user_id, ps.todo_id, ti.title, ps.session_type,
+               ps.duration_seconds, ps.status, ps.session_date, ps.created_at
+        FROM pomodoro_sessions ps
+        LEFT JOIN todo_items ti ON ps.todo_id = ti.id
+        WHERE ps.id IN ({placeholders})
+        """,
+        ids,
+    )
+    cursor.execute(
+        f"""
+        INSERT INTO pomodoro_archived_totals (user_id, sessions, total_seconds)
+        SELECT user_id, COUNT(*), SUM(duration_seconds)
+        FROM pomodoro_sessions
+        WHERE id IN ({placeholders})
+          AND status = 'completed' AND session_type = 'pomodoro'
+        GROUP BY user_id
+        ON DUPLICATE KEY UPDATE
+            sessions = sessions + VALUES(sessions),
+            total_seconds = total_seconds + VALUES(total_seconds)
+        """,
+        ids,
+    )
+    cursor.execute(f"DELETE FROM pomodoro_sessions WHERE id IN ({placeholders})", ids)
+    return len(ids)
+
+
+def _archive_todo_batch(cursor, cutoff, batch_size):
+    """
+    Move up to `batch_size` TODO items completed before `cutoff` into
+    todo_items_archive, tags included. Returns how many were moved.
+
+    An item that a Pomodoro session still points at waits until the session
+    is archived, so the session keeps its title. When an item is archived,
+    the next occurrence of its recurring series loses its
+    recurrence_parent_id, as the foreign key sets it to NULL. Nothing can
+    complete an archived item again, so no duplicate is spawned.
+    """
+    cursor.execute(
+        """
+        SELECT ti.id FROM todo_items ti
+        WHERE ti.status = 'completed' AND ti.completed_at < %s
+          AND NOT EXISTS (SELECT 1 FROM pomodoro_sessions ps WHERE ps.todo_id = ti.id)
+        ORDER BY ti.completed_at
+        LIMIT %s
+        FOR UPDATE
+        """,
+        (cutoff, batch_size),
+    )
+    ids = [row["id"] for row in cursor.fetchall()]
+    if not ids:
+        return 0
+
+    placeholders = ", ".join(["%s"] * len(ids))
+    cursor.execute(
+        f"""
+        INSERT INTO todo_items_archive
+            (id, user_id, category_id, title, description, priority, status,
+             due_date, recurrence_rule, recurrence_parent_id, completed_at,
+             created_at, updated_at)
+        SELECT id, user_id, category_id, title, description, priority, status,
+               due_date, recurrence_rule, recurrence_parent_id, completed_at,
+               created_at, updated_at
+        FROM todo_items
+        WHERE id IN ({placeholders})
+        """,
+        ids,
+    )
+    cursor.execute(
+        f"""
+        INSERT INTO todo_item_tags_archive (todo_id, tag_id)
+        SELECT todo_id, tag_id FROM todo_item_tags WHERE todo_id IN ({placeholders})
+        """,
+        ids,
+    )
+    cursor.execute(f"DELETE FROM todo_items WHERE id IN ({placeholders})", ids)
+    return len(ids)
+
+
+def archive_history(days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move finished Pomodoro sessions and completed TODO items older than
+    `days` into the archive tables. Each batch is its own short
+    transaction, so the hot tables are never locked for long, and a run cut
+    short leaves whole batches behind. Sessions go first, which frees the
+    items they pointed at for the same run.
+
+    Returns {"pomodoro_sessions": n, "todo_items": n}, the rows moved.
+    """
+    if days < MIN_ARCHIVE_AFTER_DAYS:
+        raise ValueError(f"days must be at least {MIN_ARCHIVE_AFTER_DAYS}")
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+
+    moved = {}
+    for name, archive_batch in (
+        ("pomodoro_sessions", _archive_pomodoro_batch),
+        ("todo_items", _archive_todo_batch),
+    ):
+        moved[name] = 0
+        while True:
+            with get_cursor() as cursor:
+                count = archive_batch(cursor, cutoff, batch_size)
+            moved[name] += count
+            if count < batch_size:
+                break
+    return moved
@@ -0,0 +1,53 @@
+"""
+Move old, finished rows out of the hot tables into the archive tier.
+
+Completed TODO items and completed or cancelled Pomodoro sessions older than
+--days go to todo_items_archive and pomodoro_sessions_archive, --batch-size
+rows per transaction, so todo_items and pomodoro_sessions (and their
+indexes) hold only the working set. GET /todo and GET /pomodoro/sessions
+read the archive only when called with ?history=true.
+
+Meant to run periodically, e.g. nightly from cron:
+
+    docker compose exec flask python archive_history.py
+
+Runs against the database in DB_HOST/DB_USER/DB_PASSWORD/DB_NAME.
+
+Usage:
+    python archive_history.py [--days N] [--batch-size N]
+"""
+import argparse
+import sys
+
+from archive import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, MIN_ARCHIVE_AFTER_DAYS, archive_history
+
+
+def main(argv=None, out=print):
+    parser = argparse.ArgumentParser(
+        description="Archive completed TODO items and finished Pomodoro sessions."
+    )
+    parser.add_argument(
+        "--days", type=int, default=ARCHIVE_AFTER_DAYS,
+        help=f"archive rows older than this (default: {ARCHIVE_AFTER_DAYS}, "
+             f"at least {MIN_ARCHIVE_AFTER_DAYS})",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=ARCHIVE_BATCH_SIZE,
+        help=f"rows moved per transaction (default: {ARCHIVE_BATCH_SIZE})",
+    )
+    args = parser.parse_args(argv)
+    if args.days < MIN_ARCHIVE_AFTER_DAYS:
+        parser.error(f"--days must be at least {MIN_ARCHIVE_AFTER_DAYS}")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+
+    moved = archive_history(args.days, args.batch_size)
+    out(
+        f"Archived {moved['todo_items']} TODO item(s) and "
+        f"{moved['pomodoro_sessions']} Pomodoro session(s) older than {args.days} days"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+Rebuild the daily time rollup (time_entry_daily_rollup) from time_entries.
+
+/entry/summary and the dashboard's category charts read the rollup, which
+the entry routes keep current as entries are written. Run this once after
+creating the table on an existing database, and again after changing
+ROLLUP_TIMEZONE, which decides the days time is bucketed into:
+
+    docker compose exec flask python backfill_rollup.py
+
+Users are rebuilt --batch-size at a time, in id order, one transaction per
+batch. Their entries are locked for the length of it, so the API can keep
+serving while this runs, and running it again is harmless.
+
+Runs against the database in DB_HOST/DB_USER/DB_PASSWORD/DB_NAME.
+
+Usage:
+    python backfill_rollup.py [--batch-size N]
+"""
+import argparse
+import sys
+
+from rollup import ROLLUP_BACKFILL_BATCH_SIZE, ROLLUP_TIMEZONE, backfill_rollup
+
+
+def main(argv=None, out=print):
+    parser = argparse.ArgumentParser(
+        description="Rebuild the daily time rollup from time_entries."
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=ROLLUP_BACKFILL_BATCH_SIZE,
+        help=f"users rebuilt per transaction (default: {ROLLUP_BACKFILL_BATCH_SIZE})",
+    )
+    args = parser.parse_args(argv)
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+
+    rebuilt = backfill_rollup(args.batch_size)
+    out(
+        f"Rebuilt the rollup for {rebuilt['users']} user(s): "
+        f"{rebuilt['days']} day/category row(s) in {ROLLUP_TIMEZONE.key}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
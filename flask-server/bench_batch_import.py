@@ -0,0 +1,77 @@
+"""
+Rows/second for the two ways /entry/batch-import has written time entries:
+
+  before  one pooled connection and one commit per row
+  after   chunked executemany inside a single transaction
+
+Runs against the database in DB_HOST/DB_USER/DB_PASSWORD/DB_NAME, under a
+throwaway user that is deleted (with its entries) at the end.
+
+Usage:
+    python bench_batch_import.py [rows]
+"""
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from db import BATCH_IMPORT_CHUNK_SIZE, get_cursor, insert_rows_chunked
+
+BENCH_USERNAME = "__bench_batch_import__"
+INSERT_SQL = """
+    INSERT INTO time_entries (user_id, category_id, start_time, end_time)
+    VALUES (%s, %s, %s, %s)
+"""
+
+
+def make_rows(user_id, category_id, count):
+    base = datetime(2000, 1, 1, tzinfo=timezone.utc)
+    return [
+        (i, (user_id, category_id, base + timedelta(hours=i), base + timedelta(hours=i, minutes=30)))
+        for i in range(count)
+    ]
+
+
+def per_row_commits(rows):
+    for _, params in rows:
+        with get_cursor() as cursor:
+            cursor.execute(INSERT_SQL, params)
+
+
+def single_transaction(rows):
+    with get_cursor() as cursor:
+        insert_rows_chunked(cursor, INSERT_SQL, rows, BATCH_IMPORT_CHUNK_SIZE)
+
+
+def clear_entries(user_id):
+    with get_cursor() as cursor:
+        cursor.execute("DELETE FROM time_entries WHERE user_id = %s", (user_id,))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    with get_cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO users (username, pwd_hash) VALUES (%s, %s)",
+            (BENCH_USERNAME, b"!"),
+        )
+        user_id = cursor.lastrowid
+        cursor.execute("SELECT id FROM category ORDER BY id LIMIT 1")
+        category_id = cursor.fetchone()["id"]
+
+    rows = make_rows(user_id, category_id, count)
+    try:
+        for label, write in (("before", per_row_commits), ("after", single_transaction)):
+            started = time.perf_counter()
+            write(rows)
+            elapsed = time.perf_counter() - started
+            print(f"{label:>6}: {count} rows in {elapsed:.2f}s ({count / elapsed:,.0f} rows/s)")
+            clear_entries(user_id)
+    finally:
+        clear_entries(user_id)
+        with get_cursor() as cursor:
+            cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+MySQL access shared by the Flask API and the command-line jobs.
+
+The connection settings, the per-process connection pool, get_cursor() and
+the bulk writers live here rather than in app.py so that the command-line
+scripts can use them without loading the web app: importing this module
+opens no connection and needs nothing but the DB_* environment variables.
+"""
+import logging
+import os
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+from mysql.connector import Error
+
+from categories import normalize_category_name
+from db_pool import MeteredConnectionPool
+from metrics import CountingCursor
+
+logger = logging.getLogger(__name__)
+
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST"),
+    "port": int(os.getenv("DB_PORT", "3306")),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "database": os.getenv("DB_NAME"),
+}
+
+missing = [k for k, v in DB_CONFIG.items() if not v]
+if missing:
+    raise RuntimeError(f"Missing required DB environment variables: {missing}")
+
+# Sized per gunicorn worker: keep workers x DB_POOL_SIZE under MySQL's
+# max_connections. A request that finds every connection checked out waits
+# up to DB_POOL_ACQUIRE_TIMEOUT seconds for one, alongside at most
+# DB_POOL_MAX_WAITERS others, before failing.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "5"))
+DB_POOL_MAX_WAITERS = int(os.getenv("DB_POOL_MAX_WAITERS", "32"))
+
+# Batch imports write this many rows per executemany (a single multi-row
+# INSERT), all inside one transaction.
+BATCH_IMPORT_CHUNK_SIZE = int(os.getenv("BATCH_IMPORT_CHUNK_SIZE", "500"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the connection pool, creating it on first call."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = MeteredConnectionPool(
+                    pool_name="time_tracker_pool",
+                    pool_size=DB_POOL_SIZE,
+                    acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,
+                    max_waiters=DB_POOL_MAX_WAITERS,
+                    **DB_CONFIG,
+                )
+    return _pool
+
+
+@contextmanager
+def get_cursor(dictionary=True):
+    """
+    Context manager that acquires a pooled connection, yields a cursor,
+    commits on success, rolls back on error, and always cleans up.
+
+    Usage:
+        with get_cursor() as cursor:
+            cursor.execute(...)
+    """
+    request_metrics = g.get("request_metrics") if has_request_context() else None
+    started = time.perf_counter()
+    connection = get_pool().get_connection()
+    cursor = connection.cursor(dictionary=dictionary)
+    if request_metrics is not None:
+        cursor = CountingCursor(cursor, request_metrics)
+    try:
+        yield cursor
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+        if request_metrics is not None:
+            request_metrics.db_seconds += time.perf_counter() - started
+
+
+@contextmanager
+def get_streaming_cursor():
+    """
+    Like get_cursor, but for a read-only query whose rows are handed on with
+    fetchmany() as they arrive rather than collected with fetchall().
+
+    The cursor is unbuffered, so rows wait on the server until read. A client
+    that hangs up mid-stream leaves some unread, and a connection in that
+    state cannot be reused, so they are drained before it returns to the pool.
+    """
+    request_metrics = g.get("request_metrics") if has_request_context() else None
+    started = time.perf_counter()
+    connection = get_pool().get_connection()
+    cursor = connection.cursor(dictionary=True, buffered=False)
+    if request_metrics is not None:
+        cursor = CountingCursor(cursor, request_metrics)
+    try:
+        yield cursor
+    finally:
+        try:
+            connection.consume_results()
+        except Error as e:
+            logger.warning(f"Could not drain streaming cursor: {e}")
+        cursor.close()
+        connection.close()
+        if request_metrics is not None:
+            request_metrics.db_seconds += time.perf_counter() - started
+
+
+def lookup_user_id(cursor, username):
+    """users.id for `username`, or None if there is no such user."""
+    cursor.execute("SELECT id FROM users WHERE username = %s", (username,))
+    user = cursor.fetchone()
+    return user["id"] if user else None
+
+
+def collation_key(name):
+    """
+    What MySQL compares `name` by under utf8mb4_unicode_ci, the collation of
+    the lookup tables' name columns: case and accents folded and trailing
+    spaces ignored, so "Saúde", "SAUDE" and "saude " all share a key (and a
+    row). Names read back from the database are matched to the ones asked
+    for by this key; casefold() alone would miss "Saúde" for "Saude".
+    """
+    decomposed = unicodedata.normalize("NFKD", name.casefold().rstrip(" "))
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def select_named_rows(cursor, table, names):
+    """Return {collation_key(name): id} for the rows of `table` matching `names`."""
+    placeholders = ", ".join(["%s"] * len(names))
+    cursor.execute(
+        f"SELECT id, name FROM {table} WHERE name IN ({placeholders})", list(names)
+    )
+    return {collation_key(row["name"]): row["id"] for row in cursor.fetchall()}
+
+
+def ensure_named_rows(cursor, table, names, normalize=None, max_length=100):
+    """
+    Make sure each name has a row in `table` (a lookup table with a unique
+    `name` column of `max_length` characters in the database's case- and
+    accent-insensitive collation) and return {collation_key(name): id},
+    keyed by the names as given.
+
+    One SELECT ... IN finds the names already on record, which keep their
+    stored spelling. Any left over are passed through `normalize` first if
+    given, created in a single INSERT and read back with one more SELECT.
+    Names longer than `max_length` are not created, as the column would cut
+    them short, and are left out of the result for the caller to report.
+    Runs on the caller's cursor, inside the caller's transaction.
+    """
+    wanted = {collation_key(name): name for name in names}
+    if not wanted:
+        return {}
+
+    ids = select_named_rows(cursor, table, wanted.values())
+    missing = [name for key, name in wanted.items() if key not in ids]
+    if not missing:
+        return ids
+
+    creating = []
+    for name in missing:
+        created_name = normalize(name) if normalize else name
+        if len(created_name) <= max_length:
+            creating.append((name, created_name))
+    if not creating:
+        return ids
+
+    to_create = [created_name for _, created_name in creating]
+    values = ", ".join(["(%s)"] * len(to_create))
+    # Not INSERT IGNORE: that would also turn any other bad value into a
+    # warning. Only a name another transaction created meanwhile is skipped.
+    cursor.execute(
+        f"INSERT INTO {table} (name) VALUES {values} ON DUPLICATE KEY UPDATE id = id",
+        to_create,
+    )
+    created = select_named_rows(cursor, table, to_create)
+    for name, created_name in creating:
+        if collation_key(created_name) in created:
+            ids[collation_key(name)] = created[collation_key(created_name)]
+    return ids
+
+
+def category_error(name):
+    """The batch-import error for a row whose category ensure_named_rows
+    left out."""
+    if len(name) > 100:
+        return "Category name must be between 1 and 100 characters"
+    return "Category could not be created"
+
+
+def insert_rows_chunked(cursor, insert_sql, rows, chunk_size):
+    """
+    Insert `rows`, a list of (index, params) pairs, with one executemany per
+    chunk inside the caller's transaction.
+
+    Each chunk runs under a savepoint. If the chunk fails it is rolled back
+    and replayed row by row under a savepoint each, so a bad row costs only
+    itself and is reported by its original index.
+
+    Returns (inserted_count, errors), errors being [{"index", "error"}].
+    """
+    inserted = 0
+    errors = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        cursor.execute("SAVEPOINT batch_chunk")
+        try:
+            cursor.executemany(insert_sql, [params for _, params in chunk])
+            inserted += len(chunk)
+        except Error:
+            cursor.execute("ROLLBACK TO SAVEPOINT batch_chunk")
+            for index, params in chunk:
+                cursor.execute("SAVEPOINT batch_row")
+                try:
+                    cursor.execute(insert_sql, params)
+                    inserted += 1
+                except Error as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT batch_row")
+                    errors.append({"index": index, "error": str(e)})
+                cursor.execute("RELEASE SAVEPOINT batch_row")
+        cursor.execute("RELEASE SAVEPOINT batch_chunk")
+    return inserted, errors
+
+
+def write_finance_entries(cursor, user_id, rows, chunk_size=None):
+    """
+    Bulk writer shared by /finance/batch-import, /finance/batch-generate and
+    ingest_itau_pdfs.py, run on the caller's cursor.
+
+    `rows` are already-validated (index, category, product_name, price,
+    purchase_date, status) tuples. Their categories are resolved by
+    collation_key in one pass (creating the missing ones, normalized), and
+    the entries are inserted chunk_size at a time.
+
+    Returns (inserted_count, errors) like insert_rows_chunked; rows whose
+    category could not be created (a name over 100 characters, say) are
+    reported there too.
+    """
+    chunk_size = chunk_size or BATCH_IMPORT_CHUNK_SIZE
+    errors = []
+
+    category_ids = ensure_named_rows(
+        cursor,
+        "finance_categories",
+        [row[1] for row in rows],
+        normalize=normalize_category_name,
+    )
+
+    insert_rows = []
+    for index, category, product_name, price, purchase_date, status in rows:
+        category_id = category_ids.get(collation_key(category))
+        if category_id is None:
+            errors.append({"index": index, "error": category_error(category)})
+            continue
+        insert_rows.append(
+            (index, (user_id, category_id, product_name, price, purchase_date, status))
+        )
+
+    inserted, insert_errors = insert_rows_chunked(
+        cursor,
+        """
+        INSERT INTO finance_entries (user_id, category_id, product_name, price, purchase_date, status)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        """,
+        insert_rows,
+        chunk_size,
+    )
+
+    return inserted, errors + insert_errors
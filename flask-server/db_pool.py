@@ -0,0 +1,165 @@
+"""Connection pool with a blocking acquire and the numbers to watch it by.
+
+mysql-connector's MySQLConnectionPool fails a get_connection() the moment
+every connection is checked out ("pool exhausted"), which under a burst
+turns a brief wait into a 500. MeteredConnectionPool puts a semaphore in
+front of it: callers queue for a free connection up to a deadline, the
+queue itself is bounded, and every acquire is timed.
+
+Each gunicorn worker builds its own pool, so the metrics describe the
+worker that reports them.
+"""
+import threading
+import time
+import weakref
+
+from mysql.connector.errors import PoolError
+from mysql.connector.pooling import MySQLConnectionPool
+
+# Upper bounds, in seconds, of the acquire-latency histogram buckets.
+ACQUIRE_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class PooledConnection:
+    """A checked-out connection. Behaves like the connection it wraps, but
+    close() hands it back to the MeteredConnectionPool it came from.
+    `created_at` is when the pool first handed out the underlying
+    connection (a time.monotonic() value)."""
+
+    def __init__(self, pool, connection, created_at):
+        self._pool = pool
+        self._connection = connection
+        self._closed = False
+        self.created_at = created_at
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._connection.close()
+        finally:
+            self._pool._release()
+
+
+class MeteredConnectionPool:
+    """MySQLConnectionPool with a deadline-bounded, queueing get_connection()."""
+
+    def __init__(self, pool_name, pool_size, acquire_timeout, max_waiters, **config):
+        self._pool = MySQLConnectionPool(
+            pool_name=pool_name, pool_size=pool_size, **config
+        )
+        self.pool_size = pool_size
+        self.acquire_timeout = acquire_timeout
+        self.max_waiters = max_waiters
+
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self._checked_out = 0
+        self._waiters = 0
+        self._timeouts = 0
+        self._rejected = 0
+        self._bucket_counts = [0] * (len(ACQUIRE_LATENCY_BUCKETS) + 1)
+        self._acquire_count = 0
+        self._acquire_seconds = 0.0
+        # Underlying connection -> when this pool first handed it out. Held
+        # weakly, so a connection the pool discards drops out with it.
+        self._created_at = weakref.WeakKeyDictionary()
+
+    def get_connection(self):
+        """
+        Check out a connection, waiting up to acquire_timeout seconds for one
+        to be returned if all pool_size are in use.
+
+        Raises PoolError (a mysql.connector.Error) when the deadline passes or
+        when max_waiters callers are already queued.
+        """
+        started = time.monotonic()
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self._waiters >= self.max_waiters:
+                    self._rejected += 1
+                    raise PoolError(
+                        f"Connection pool wait queue is full ({self.max_waiters} waiting)"
+                    )
+                self._waiters += 1
+            try:
+                acquired = self._slots.acquire(timeout=self.acquire_timeout)
+            finally:
+                with self._lock:
+                    self._waiters -= 1
+            if not acquired:
+                with self._lock:
+                    self._timeouts += 1
+                raise PoolError(
+                    f"Timed out after {self.acquire_timeout}s waiting for a connection"
+                )
+
+        try:
+            connection = self._pool.get_connection()
+        except Exception:
+            self._slots.release()
+            raise
+
+        created_at = self._record_acquire(time.monotonic() - started, connection)
+        return PooledConnection(self, connection, created_at)
+
+    def _record_acquire(self, seconds, connection):
+        """Count an acquire that took `seconds`; returns the connection's
+        created_at."""
+        bucket = len(ACQUIRE_LATENCY_BUCKETS)
+        for i, bound in enumerate(ACQUIRE_LATENCY_BUCKETS):
+            if seconds <= bound:
+                bucket = i
+                break
+        # mysql-connector hands out a fresh wrapper around the same
+        # connection each time; the age belongs to the connection.
+        underlying = getattr(connection, "_cnx", connection)
+        with self._lock:
+            self._checked_out += 1
+            self._bucket_counts[bucket] += 1
+            self._acquire_count += 1
+            self._acquire_seconds += seconds
+            return self._created_at.setdefault(underlying, time.monotonic())
+
+    def _release(self):
+        with self._lock:
+            self._checked_out -= 1
+        self._slots.release()
+
+    def stats(self):
+        """Snapshot of the pool's state and acquire history."""
+        now = time.monotonic()
+        with self._lock:
+            ages = [now - created_at for created_at in self._created_at.values()]
+            cumulative = 0
+            buckets = []
+            for bound, count in zip(
+                list(ACQUIRE_LATENCY_BUCKETS) + ["+Inf"], self._bucket_counts
+            ):
+                cumulative += count
+                buckets.append({"le": bound, "count": cumulative})
+
+            return {
+                "pool_size": self.pool_size,
+                "acquire_timeout_seconds": self.acquire_timeout,
+                "max_waiters": self.max_waiters,
+                "checked_out": self._checked_out,
+                "waiters": self._waiters,
+                "timeouts": self._timeouts,
+                "rejected": self._rejected,
+                "acquire_latency_seconds": {
+                    "count": self._acquire_count,
+                    "sum": round(self._acquire_seconds, 6),
+                    "buckets": buckets,
+                },
+                "connection_age_seconds": {
+                    "connections": len(ages),
+                    "max": round(max(ages), 3) if ages else 0,
+                    "mean": round(sum(ages) / len(ages), 3) if ages else 0,
+                },
+            }
@@ -0,0 +1,58 @@
+"""
+Materialize upcoming occurrences of recurring TODO items.
+
+Every recurring item with a due date heads a series (todo_series); this
+stores the series' occurrences in todo_occurrences up to --days from now,
+where GET /todo/occurrences reads them for the calendar. Each series keeps a
+high-water mark, so a run only expands the days that came into the horizon
+since the last one, --batch-size series per transaction.
+
+Meant to run periodically, e.g. nightly from cron:
+
+    docker compose exec flask python extend_recurrences.py
+
+Runs against the database in DB_HOST/DB_USER/DB_PASSWORD/DB_NAME.
+
+Usage:
+    python extend_recurrences.py [--days N] [--batch-size N]
+"""
+import argparse
+import sys
+
+from todo_series import (
+    RECURRENCE_BATCH_SIZE,
+    RECURRENCE_HORIZON_DAYS,
+    RECURRENCE_MAX_HORIZON_DAYS,
+    extend_recurrence_horizon,
+)
+
+
+def main(argv=None, out=print):
+    parser = argparse.ArgumentParser(
+        description="Materialize upcoming occurrences of recurring TODO items."
+    )
+    parser.add_argument(
+        "--days", type=int, default=RECURRENCE_HORIZON_DAYS,
+        help=f"how far ahead to materialize (default: {RECURRENCE_HORIZON_DAYS}, "
+             f"at most {RECURRENCE_MAX_HORIZON_DAYS})",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=RECURRENCE_BATCH_SIZE,
+        help=f"series extended per transaction (default: {RECURRENCE_BATCH_SIZE})",
+    )
+    args = parser.parse_args(argv)
+    if not 1 <= args.days <= RECURRENCE_MAX_HORIZON_DAYS:
+        parser.error(f"--days must be between 1 and {RECURRENCE_MAX_HORIZON_DAYS}")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+
+    extended = extend_recurrence_horizon(args.days, args.batch_size)
+    out(
+        f"Extended {extended['series']} series by {extended['occurrences']} "
+        f"occurrence(s), {args.days} days ahead"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+"""Gunicorn hooks, picked up automatically from the working directory.
+
+They keep the multiprocess metrics directory (see metrics.py) honest: it
+is emptied when the server boots, so counters start from zero rather than
+from a previous container's files, and a worker that exits has its live
+gauges dropped.
+
+Each worker also starts the Pomodoro reaper thread once it has loaded the
+app; threads do not survive a fork, so it cannot start any earlier.
+"""
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+
+def on_starting(server):
+    path = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    from app import start_pomodoro_reaper
+
+    start_pomodoro_reaper()
@@ -0,0 +1,263 @@
+"""
+Back-fill finance entries from a directory of statement PDFs: Itau's, or
+any other bank with a parser registered in statement_pdf.
+
+The command-line counterpart of /finance/parse-itau-pdf followed by
+/finance/batch-import, for archives too big for an upload: every *.pdf under
+DIRECTORY is parsed on a pool of worker processes, statements already seen
+(same bank and Emissão date) are skipped the way the upload route skips them, and
+each statement's entries are written straight to MySQL through the bulk
+writer the batch-import route uses, one transaction per statement.
+
+Progress is kept in a checkpoint file (by default inside DIRECTORY), written
+after every statement, so an interrupted run picks up where it stopped.
+Files are recognised by content, so renaming or moving them does not import
+them twice. A run killed between a statement's commit and its checkpoint
+write imports that one statement again when resumed.
+
+Credits and refunds are left out, as in the upload flow. Statements carry no
+time of day, so each purchase is dated at midnight in --timezone.
+
+Runs against the database in DB_HOST/DB_USER/DB_PASSWORD/DB_NAME.
+
+Usage:
+    python ingest_itau_pdfs.py USERNAME DIRECTORY [--workers N]
+        [--checkpoint FILE] [--timezone ZONE] [--dry-run]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from statement_pdf import StatementPdfError, extract_statement, statement_to_finance_entries
+
+CHECKPOINT_NAME = ".itau-ingest-checkpoint.json"
+DEFAULT_TIMEZONE = "America/Sao_Paulo"
+
+
+def find_statements(directory):
+    """Every PDF under `directory`, in a stable order (so that of two copies
+    of a statement, the same one is always kept)."""
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(".pdf"):
+                paths.append(os.path.join(root, name))
+    return paths
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Checkpoint:
+    """Which files (by SHA-256) a previous run already dealt with.
+
+    {"username": ..., "files": {digest: {"file", "bank", "issued_on",
+    "status", "entries"}}}, where status is "imported" or "duplicate".
+    """
+
+    def __init__(self, path, username):
+        self.path = path
+        self.username = username
+        self.files = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("username") != username:
+                raise SystemExit(
+                    f"{path} is a checkpoint for {data.get('username')!r}, not {username!r}"
+                )
+            self.files = data.get("files", {})
+
+    def issue_dates(self):
+        """(bank, issued_on) -> file, for every statement already imported."""
+        return {
+            (info.get("bank", "itau"), info["issued_on"]): info["file"]
+            for info in self.files.values()
+            if info["status"] == "imported"
+        }
+
+    def record(self, digest, **info):
+        self.files[digest] = info
+        self._save()
+
+    def _save(self):
+        """Write via a temp file and rename, so a crash mid-write leaves the
+        previous checkpoint intact."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"username": self.username, "files": self.files}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+def parse_one(path):
+    """Worker-process entry point: (statement, None) or (None, error)."""
+    try:
+        return extract_statement(path), None
+    except StatementPdfError as e:
+        return None, str(e)
+    except Exception as e:
+        return None, f"Failed to parse the PDF: {e}"
+
+
+def parse_all(paths, workers):
+    """Parse `paths` on `workers` processes, yielding results in path order
+    while later files are still being parsed."""
+    if workers <= 1:
+        yield from map(parse_one, paths)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(parse_one, paths)
+
+
+def finance_rows(statement, tz):
+    """The statement's entries as write_finance_entries rows, plus how many
+    credits/refunds were left out."""
+    entries, skipped = statement_to_finance_entries(statement)
+    rows = []
+    for index, entry in enumerate(entries):
+        purchased = datetime.fromisoformat(entry["purchase_date"]).replace(tzinfo=tz)
+        rows.append((
+            index,
+            entry["category"],
+            entry["product_name"],
+            entry["price"],
+            purchased.astimezone(timezone.utc),
+            entry["status"],
+        ))
+    return rows, len(skipped)
+
+
+def ingest(username, directory, workers, checkpoint_path, tz, dry_run=False, out=print):
+    """Import every new statement under `directory` for `username`. Returns
+    the number of files that failed."""
+    # db is only needed to write, and is imported here rather than at the
+    # top so that worker processes and --dry-run never need DB settings.
+    user_id = None
+    if not dry_run:
+        from db import get_cursor, lookup_user_id, write_finance_entries
+
+        with get_cursor() as cursor:
+            user_id = lookup_user_id(cursor, username)
+        if not user_id:
+            raise SystemExit(f"User {username!r} not found")
+
+    checkpoint = Checkpoint(checkpoint_path, username)
+    seen_issue_dates = checkpoint.issue_dates()
+
+    todo = []
+    for path in find_statements(directory):
+        digest = file_digest(path)
+        if digest not in checkpoint.files:
+            todo.append((path, digest))
+    out(f"{len(todo)} new statement(s) to read, {len(checkpoint.files)} done previously")
+
+    imported = duplicates = failed = entry_total = 0
+    for (path, digest), (statement, error) in zip(
+        todo, parse_all([path for path, _ in todo], workers)
+    ):
+        name = os.path.relpath(path, directory)
+        if error:
+            failed += 1
+            out(f"FAILED     {name}: {error}")
+            continue
+
+        bank = statement.get("banco", "itau")
+        issued_on = statement["emissao"]
+        if (bank, issued_on) in seen_issue_dates:
+            duplicates += 1
+            out(f"DUPLICATE  {name}: same statement as {seen_issue_dates[bank, issued_on]}")
+            if not dry_run:
+                checkpoint.record(
+                    digest, file=name, bank=bank, issued_on=issued_on,
+                    status="duplicate", entries=0,
+                )
+            continue
+        seen_issue_dates[bank, issued_on] = name
+
+        rows, skipped = finance_rows(statement, tz)
+        if dry_run:
+            inserted, errors = len(rows), []
+        else:
+            with get_cursor() as cursor:
+                inserted, errors = write_finance_entries(cursor, user_id, rows)
+            checkpoint.record(
+                digest, file=name, bank=bank, issued_on=issued_on,
+                status="imported", entries=inserted,
+            )
+
+        imported += 1
+        entry_total += inserted
+        notes = []
+        if not statement["resumo"]["conferido"]:
+            off = ", ".join(
+                f"card {d['cartao_final']} off by {d['diferenca']:.2f} on page(s) "
+                + "/".join(map(str, d["paginas"]))
+                for d in statement["reconciliacao"]["divergencias"]
+            )
+            notes.append(f"totals do not reconcile: {off}" if off else "totals do not reconcile")
+        if skipped:
+            notes.append(f"{skipped} credit(s) left out")
+        if errors:
+            notes.append(f"{len(errors)} row(s) failed")
+        suffix = f" ({'; '.join(notes)})" if notes else ""
+        out(f"IMPORTED   {name}: {bank}, issued {issued_on}, {inserted} entries{suffix}")
+
+    verb = "would import" if dry_run else "imported"
+    out(
+        f"Done: {verb} {entry_total} entries from {imported} statement(s); "
+        f"{duplicates} duplicate(s), {failed} failure(s)"
+    )
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Import a directory of bank statement PDFs as finance entries."
+    )
+    parser.add_argument("username")
+    parser.add_argument("directory")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="parser processes (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help=f"progress file (default: DIRECTORY/{CHECKPOINT_NAME})",
+    )
+    parser.add_argument(
+        "--timezone", default=DEFAULT_TIMEZONE,
+        help=f"zone purchases are dated in (default: {DEFAULT_TIMEZONE})",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="parse and report only; write nothing",
+    )
+    args = parser.parse_args(argv)
+
+    checkpoint_path = args.checkpoint or os.path.join(args.directory, CHECKPOINT_NAME)
+    failed = ingest(
+        args.username,
+        args.directory,
+        args.workers,
+        checkpoint_path,
+        ZoneInfo(args.timezone),
+        dry_run=args.dry_run,
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,21 @@
 """Extract structured data from Itau credit card statement PDFs.
 
-Public API:
-    extract_statement(pdf_path)                  -> dict  # one statement, JSON-serializable
-    extract_statement_from_bytes(data, filename) -> dict  # same, from an uploaded file
-    statement_to_finance_entries(statement)      -> (entries, skipped)
-
-Requires poppler's `pdftotext` binary to be available on PATH.
+The first parser in statement_pdf's registry, registered on import. PDFs
+are read through statement_pdf (extract_statement and friends), which hands
+the page texts of any statement _is_itau_statement() claims to
+_statement_from_pages().
 """
-import os
 import re
-import subprocess
-import tempfile
+import threading
+from collections import OrderedDict
 from datetime import date
 
 from categories import normalize_category_name
+from statement_pdf import (
+    StatementParser,
+    StatementPdfError,
+    register_parser,
+)
 
 DATE_RE = re.compile(r"^(\d{2})/(\d{2})$")
 AMOUNT_RE = re.compile(r"^-?[\d.]+,\d{2}$")
@@ -22,6 +24,8 @@ EMISSAO_RE = re.compile(r"Emiss[aã]o:\s*(\d{2})/(\d{2})/(\d{4})")
 VENCIMENTO_RE = re.compile(r"Vencimento:\s*(\d{2})/(\d{2})/(\d{4})")
 CARD_SUBTOTAL_RE = re.compile(r"Lançamentos no cartão \(final (\d{3,4})\)\s+(-?[\d.]+,\d{2})")
 GRAND_TOTAL_RE = re.compile(r"Total dos lançamentos atuais\s+([\d.]+,\d{2})")
+# The bank's name appears on the first page of every statement.
+SNIFF_RE = re.compile(r"ita[uú]", re.IGNORECASE)
 
 STOP_MARKERS = (
     "Limites de crédito",
@@ -30,53 +34,83 @@ STOP_MARKERS = (
 )
 START_MARKER = "Lançamentos: compras e saques"
 
+# Classifies a stripped line of the transaction table in one match. Every
+# alternative but the marker scan is anchored at the start of the line, so the
+# common lines (transactions) are classified without searching them for a
+# marker. A line that matches nothing has two or more tokens and does not end
+# in an amount: a category/city continuation line.
+LINE_RE = re.compile(
+    r"""
+    (?P<transaction>
+        (?P<day>\d{{2}})/(?P<month>\d{{2}})\s
+        (?P<description>.*\s)?
+        (?P<amount>-?[\d.]+,\d{{2}})$)
+  | (?P<subtotal>Lançamentos\ no\ cartão)
+  | (?P<card_header>(?P<holder>.*?)\s*\(final\s+(?P<card>\d{{3,4}})\))$
+  | (?P<column_header>(?:DATA|Titular)\s)
+  | .*?(?:(?P<start>{start})|(?P<stop>{stop}))
+  | (?P<ends_in_amount>.*\s-?[\d.]+,\d{{2}})$
+  | (?P<single_token>\S+)$
+    """.format(
+        start=re.escape(START_MARKER),
+        stop="|".join(re.escape(marker) for marker in STOP_MARKERS),
+    ),
+    re.VERBOSE,
+)
+
 # Itau statements lay out two card tables side by side. In the `pdftotext
 # -layout` output the left table's content always ends well before column 90
 # and the right table's content always starts at column 95, so splitting each
 # physical line at column 90 cleanly separates the two tables.
 SPLIT_COL = 90
 
+# Layouts drift, though, so each page's split is found from the page itself
+# (split_col_for_page): a histogram of how many lines have text in each
+# column between SPLIT_SEARCH_LOW and SPLIT_SEARCH_HIGH, where a column at
+# most GUTTER_MAX_FILL of the lines cross (full-width headers do) counts as
+# gutter. A gutter only counts if transactions sit on both sides of it: on a
+# single-table page the blank run before the right-aligned amounts looks
+# like one too. SPLIT_COL is the fallback, and the tie-break between equally
+# wide gutters.
+# Pages sharing a layout fingerprint (the columns their card headers and
+# subtotals put "(final" at) share the answer, up to SPLIT_CACHE_SIZE layouts.
+SPLIT_SEARCH_LOW = 60
+SPLIT_SEARCH_HIGH = 120
+GUTTER_MAX_FILL = 0.05
+SPLIT_CACHE_SIZE = 256
+
 # Fallback category when a transaction has no category/city continuation line.
 DEFAULT_CATEGORY = "Uncategorized"
 
+# Bump whenever a change here alters what _statement_from_pages returns for the
+# same PDF: it salts the statement cache's keys (see statement_cache.py).
+PARSER_VERSION = "6"
+
 
-class ItauPdfError(Exception):
-    """Raised when a PDF cannot be read or is not an Itau statement."""
+class ItauPdfError(StatementPdfError):
+    """Raised when a PDF is not an Itau statement."""
 
 
 def brl_to_float(s):
     return round(float(s.replace(".", "").replace(",", ".")), 2)
 
 
-def extract_pages(path):
-    """Return a list of page texts using poppler's pdftotext -layout, which
-    (unlike pdfplumber's word extraction) correctly spaces words even on
-    statements whose embedded font has very tight inter-word kerning."""
-    try:
-        result = subprocess.run(
-            ["pdftotext", "-layout", path, "-"],
-            capture_output=True,
-            text=True,
-            check=True,
-            timeout=30,
-        )
-    except FileNotFoundError:
-        raise ItauPdfError("pdftotext is not installed on the server")
-    except subprocess.TimeoutExpired:
-        raise ItauPdfError("Timed out while reading the PDF")
-    except subprocess.CalledProcessError:
-        raise ItauPdfError("Could not read the PDF — is it a valid, unencrypted file?")
-    return result.stdout.split("\f")
-
-
-def ordered_lines_for_page(page_text):
+def ordered_lines_for_page(page_text, split_col=SPLIT_COL):
     """Reading order: the left card-table column top-to-bottom, then the
     right card-table column top-to-bottom (matches how Itau flows the
     two-card table across the page)."""
-    raw_lines = page_text.split("\n")
-    left_lines = [ln[:SPLIT_COL].rstrip() for ln in raw_lines if ln[:SPLIT_COL].strip()]
-    right_lines = [ln[SPLIT_COL:].rstrip() for ln in raw_lines if ln[SPLIT_COL:].strip()]
-    return left_lines + right_lines
+    left_lines = []
+    right_lines = []
+    for ln in page_text.split("\n"):
+        left = ln[:split_col].rstrip()
+        if left:
+            left_lines.append(left)
+        if len(ln) > split_col:
+            right = ln[split_col:].rstrip()
+            if right:
+                right_lines.append(right)
+    left_lines.extend(right_lines)
+    return left_lines
 
 
 def guess_year(day, month, emissao):
@@ -87,122 +121,372 @@ def guess_year(day, month, emissao):
     return candidate
 
 
-def _parse_transactions(pages, emissao):
-    """Walk the statement's transaction table(s) and return
-    (transactions, titulares) where titulares maps card_final -> holder name."""
-    transactions = []
-    titulares = {}
-    current_card = None
-    active = False
-    pending = None  # last transaction dict, to attach a category/city line
+class _ScanState:
+    """Where the line scanner is between pages: inside the transaction table
+    or not, the card whose table it is reading, and the last transaction (to
+    attach a category/city line to). Snapshotted at the start of each page
+    so that a page can be scanned again on its own."""
 
-    for page_text in pages:
-        for line in ordered_lines_for_page(page_text):
-            stripped = line.strip()
-            if not stripped:
-                continue
+    __slots__ = ("active", "current_card", "pending")
 
-            if START_MARKER in stripped:
-                active = True
-                pending = None
-                continue
+    def __init__(self, active=False, current_card=None, pending=None):
+        self.active = active
+        self.current_card = current_card
+        self.pending = pending
 
-            if any(marker in stripped for marker in STOP_MARKERS):
-                active = False
-                pending = None
-                continue
+    def copy(self):
+        return _ScanState(self.active, self.current_card, self.pending)
 
-            if not active:
-                continue
 
-            if stripped.startswith("Lançamentos no cartão"):
-                pending = None
-                continue
+def _scan_page(page_text, emissao, state, titulares, tx_dates, split_col=SPLIT_COL):
+    """Scan one page's transaction lines, starting from and updating `state`.
+    Card holders found are added to `titulares`; `tx_dates` memoizes
+    (dd, mm) -> ISO date. Returns the page's transactions."""
+    transactions = []
+    active = state.active
+    current_card = state.current_card
+    pending = state.pending
+    match_line = LINE_RE.match
+
+    for line in ordered_lines_for_page(page_text, split_col):
+        stripped = line.strip()
+        if not stripped:
+            continue
+
+        m = match_line(stripped)
+        kind = m.lastgroup if m else None
+
+        if kind == "start":
+            active = True
+            pending = None
+            continue
+
+        if kind == "stop":
+            active = False
+            pending = None
+            continue
+
+        if not active:
+            continue
+
+        if kind == "transaction":
+            day, month, description, amount = m.group("day", "month", "description", "amount")
+            # "- 12,34" (credit/refund) has the minus sign split off as its
+            # own token by the -layout column split.
+            tokens = description.split() if description else []
+            sign = 1
+            if tokens and tokens[-1] == "-":
+                sign = -1
+                tokens.pop()
+            tx_date = tx_dates.get((day, month))
+            if tx_date is None:
+                tx_date = guess_year(int(day), int(month), emissao).isoformat()
+                tx_dates[day, month] = tx_date
+            pending = {
+                "cartao_final": current_card or "",
+                "data": tx_date,
+                "estabelecimento": " ".join(tokens),
+                "categoria_local": "",
+                "valor": sign * brl_to_float(amount),
+            }
+            transactions.append(pending)
+        elif kind == "card_header":
+            current_card = m.group("card")
+            titulares[current_card] = m.group("holder").strip()
+            pending = None
+        elif kind == "subtotal":
+            pending = None
+        elif kind is None and pending is not None:
+            # A line right after a transaction is its category/city
+            # continuation line. Each transaction has at most one, so consume
+            # "pending" here to avoid later unrelated lines being appended
+            # to it.
+            pending["categoria_local"] = stripped
+            pending = None
+
+    state.active = active
+    state.current_card = current_card
+    state.pending = pending
+    return transactions
+
+
+def _parse_pages(pages, emissao):
+    """Scan every page in order, each split at its own detected column.
+    Returns (transactions per page, titulares, the scanner state each page
+    started from, the column each page was split at, the date memo)."""
+    titulares = {}
+    tx_dates = {}
+    state = _ScanState()
+    page_transactions = []
+    start_states = []
+    split_cols = []
+    for page_text in pages:
+        split_col = split_col_for_page(page_text)
+        start_states.append(state.copy())
+        split_cols.append(split_col)
+        page_transactions.append(
+            _scan_page(page_text, emissao, state, titulares, tx_dates, split_col)
+        )
+    return page_transactions, titulares, start_states, split_cols, tx_dates
 
-            header_match = CARD_HEADER_RE.match(stripped)
-            if header_match and not AMOUNT_RE.match(stripped.split()[-1]):
-                current_card = header_match.group(2)
-                titulares[current_card] = header_match.group(1).strip()
-                pending = None
-                continue
 
-            tokens = stripped.split()
-            if len(tokens) < 2:
-                continue
+def _parse_transactions(pages, emissao):
+    """Walk the statement's transaction table(s) and return
+    (transactions, titulares) where titulares maps card_final -> holder name."""
+    page_transactions, titulares, _, _, _ = _parse_pages(pages, emissao)
+    return [t for page in page_transactions for t in page], titulares
+
+
+def detect_split_cols(page_text, low=SPLIT_SEARCH_LOW, high=SPLIT_SEARCH_HIGH):
+    """Candidate columns, between `low` and `high`, at which to split the
+    page's two card tables: one per gutter (run of columns nearly every line
+    leaves blank) with a transaction on either side of it, widest first (the
+    space between the tables is wider than any inside one), then nearest
+    SPLIT_COL. Empty for a page with one table, or none."""
+    lines = page_text.split("\n")
+    rows = [ln[:high].ljust(high) for ln in lines if len(ln) > low]
+    if not rows:
+        return []
+    # One string holding the lines as a matrix, so that each column of the
+    # histogram is a strided slice counted in C rather than a Python loop
+    # over every line.
+    matrix = "".join(rows)
+    max_fill = int(GUTTER_MAX_FILL * len(rows))
+    runs = []
+    for col in range(low, high):
+        column = matrix[col::high]
+        if len(column) - column.count(" ") > max_fill:
+            continue
+        if runs and col == runs[-1][1] + 1:
+            runs[-1][1] = col
+        else:
+            runs.append([col, col])
+    # Split at the end of each gutter, right where the right table starts.
+    # A gutter running to `high` has no table after it.
+    runs = [(start, end) for start, end in runs if end < high - 1]
+    runs.sort(key=lambda run: (run[0] - run[1], abs(run[1] + 1 - SPLIT_COL)))
+    return [end + 1 for _, end in runs if _splits_two_tables(lines, end + 1)]
+
+
+def _is_transaction(text):
+    m = LINE_RE.match(text.strip())
+    return m is not None and m.lastgroup == "transaction"
+
+
+def _splits_two_tables(lines, split_col):
+    """Whether some line has a whole transaction left of `split_col` and
+    some line has one right of it."""
+    left = right = False
+    for ln in lines:
+        if len(ln) <= split_col:
+            continue
+        left = left or _is_transaction(ln[:split_col])
+        right = right or _is_transaction(ln[split_col:])
+        if left and right:
+            return True
+    return False
+
+
+_split_cache = OrderedDict()  # layout fingerprint -> split column
+_split_cache_lock = threading.Lock()
+
+
+def _layout_fingerprint(page_text):
+    """The columns "(final" appears at on the page. Card headers and
+    subtotals print it at a fixed offset into their table, so this pins down
+    where each table starts, for a couple of str.find calls. Empty for a
+    page with neither."""
+    columns = set()
+    pos = page_text.find("(final")
+    while pos != -1:
+        columns.add(pos - page_text.rfind("\n", 0, pos) - 1)
+        pos = page_text.find("(final", pos + 1)
+    return tuple(sorted(columns))
+
+
+def split_col_for_page(page_text):
+    """The column at which to split this page's two card tables."""
+    fingerprint = _layout_fingerprint(page_text)
+    if fingerprint:
+        with _split_cache_lock:
+            split_col = _split_cache.get(fingerprint)
+            if split_col is not None:
+                _split_cache.move_to_end(fingerprint)
+                return split_col
+
+    candidates = detect_split_cols(page_text)
+    split_col = candidates[0] if candidates else SPLIT_COL
+
+    if fingerprint:
+        with _split_cache_lock:
+            _split_cache[fingerprint] = split_col
+            while len(_split_cache) > SPLIT_CACHE_SIZE:
+                _split_cache.popitem(last=False)
+    return split_col
+
+
+def _totals_by_card(transactions):
+    totals = {}
+    for t in transactions:
+        totals[t["cartao_final"]] = round(totals.get(t["cartao_final"], 0.0) + t["valor"], 2)
+    return totals
 
-            date_match = DATE_RE.match(tokens[0])
-            # Handle "- 12,34" (credit/refund) where the minus sign is split
-            # off as its own token by the -layout column split.
-            if date_match and AMOUNT_RE.match(tokens[-1]):
-                amount_tokens = 2 if tokens[-2] == "-" else 1
-                day, month = int(date_match.group(1)), int(date_match.group(2))
-                tx_date = guess_year(day, month, emissao)
-                description = " ".join(tokens[1:-amount_tokens])
-                sign = -1 if amount_tokens == 2 else 1
-                amount = sign * brl_to_float(tokens[-1])
-                pending = {
-                    "cartao_final": current_card or "",
-                    "data": tx_date.isoformat(),
-                    "estabelecimento": description,
-                    "categoria_local": "",
-                    "valor": amount,
-                }
-                transactions.append(pending)
-                continue
 
-            if tokens[0] in ("DATA", "Titular"):
-                continue
+def _card_deltas(computed, declared):
+    """card -> computed minus declared, for every card where they differ (a
+    card missing on one side counts as zero there)."""
+    deltas = {}
+    for card in sorted(set(computed) | set(declared)):
+        delta = round(computed.get(card, 0.0) - declared.get(card, 0.0), 2)
+        if delta:
+            deltas[card] = delta
+    return deltas
 
-            # Otherwise, if a transaction line came right before this one,
-            # treat this as its category/city continuation line. Each
-            # transaction has at most one such line, so consume "pending"
-            # here to avoid later unrelated lines being appended to it.
-            if pending is not None and not AMOUNT_RE.match(tokens[-1]):
-                pending["categoria_local"] = stripped
-                pending = None
 
-    return transactions, titulares
+def _reparse_failing_pages(pages, emissao, page_transactions, start_states,
+                           split_cols, titulares, tx_dates, declared, subtotal_pages):
+    """
+    Rescan only the pages involved in a card that does not reconcile, each
+    from the state the first pass entered it with, at the other column splits
+    detect_split_cols finds on it and at SPLIT_COL. A page's new
+    transactions are kept when they bring the statement closer to its
+    declared subtotals.
+
+    Updates page_transactions, split_cols and titulares in place and returns
+    [{pagina, coluna}] for the pages that were replaced.
+    """
+    def mismatch():
+        flat = [t for page in page_transactions for t in page]
+        deltas = _card_deltas(_totals_by_card(flat), declared)
+        return deltas, round(sum(abs(d) for d in deltas.values()), 2)
+
+    deltas, error = mismatch()
+    suspects = set()
+    for index, transactions in enumerate(page_transactions):
+        if any(t["cartao_final"] in deltas for t in transactions):
+            suspects.add(index)
+    suspects.update(subtotal_pages[card] for card in deltas if card in subtotal_pages)
+
+    reparsed = []
+    for index in sorted(suspects):
+        if not error:
+            break
+        original = page_transactions[index]
+        best = None
+        for split_col in dict.fromkeys([*detect_split_cols(pages[index]), SPLIT_COL]):
+            if split_col == split_cols[index]:
+                continue
+            # The first pass already gave the previous page's last
+            # transaction its continuation line, if this page had one.
+            state = start_states[index].copy()
+            state.pending = None
+            trial_titulares = dict(titulares)
+            page_transactions[index] = _scan_page(
+                pages[index], emissao, state, trial_titulares, tx_dates, split_col,
+            )
+            _, trial_error = mismatch()
+            if trial_error < error:
+                error = trial_error
+                best = (split_col, page_transactions[index], trial_titulares)
+        if best is None:
+            page_transactions[index] = original
+            continue
+        split_cols[index], page_transactions[index], trial_titulares = best
+        titulares.update(trial_titulares)
+        reparsed.append({"pagina": index + 1, "coluna": split_cols[index]})
+
+    return reparsed
+
+
+def _search_pages(pattern, pages):
+    """The first match of `pattern` on any page, or None."""
+    for page_text in pages:
+        m = pattern.search(page_text)
+        if m:
+            return m
+    return None
 
 
-def extract_statement(pdf_path):
-    """Parse an Itau credit card statement PDF and return a JSON-serializable
-    dict with its transactions and a reconciliation summary."""
-    pages = extract_pages(pdf_path)
-    full_text = "\n".join(pages)
+def _statement_from_pages(pages, arquivo):
+    """The statement dict, with its transactions and a reconciliation
+    summary, for the page texts of an Itau credit card statement.
 
-    m = EMISSAO_RE.search(full_text)
+    Takes the whole list: reconciliation goes back to pages it has already
+    read, so the pages cannot be consumed as a stream."""
+    m = _search_pages(EMISSAO_RE, pages)
     if not m:
         raise ItauPdfError(
             "Could not find an 'Emissão' date — this does not look like an Itaú statement"
         )
     emissao = date(int(m.group(3)), int(m.group(2)), int(m.group(1)))
 
-    vm = VENCIMENTO_RE.search(full_text)
+    vm = _search_pages(VENCIMENTO_RE, pages)
     vencimento = date(int(vm.group(3)), int(vm.group(2)), int(vm.group(1))) if vm else None
 
-    transactions, titulares = _parse_transactions(pages, emissao)
-    transactions.sort(key=lambda t: t["data"])
+    page_transactions, titulares, start_states, split_cols, tx_dates = _parse_pages(
+        pages, emissao
+    )
 
-    computed_por_cartao = {}
-    for t in transactions:
-        computed_por_cartao[t["cartao_final"]] = round(
-            computed_por_cartao.get(t["cartao_final"], 0.0) + t["valor"], 2
+    declarado_por_cartao = {}
+    subtotal_pages = {}  # card -> index of the page its subtotal is printed on
+    for index, page_text in enumerate(pages):
+        for card, val in CARD_SUBTOTAL_RE.findall(page_text):
+            declarado_por_cartao[card] = brl_to_float(val)
+            subtotal_pages[card] = index
+    gm = _search_pages(GRAND_TOTAL_RE, pages)
+    declarado_total = brl_to_float(gm.group(1)) if gm else None
+
+    paginas_reprocessadas = []
+    if _card_deltas(
+        _totals_by_card([t for page in page_transactions for t in page]),
+        declarado_por_cartao,
+    ):
+        paginas_reprocessadas = _reparse_failing_pages(
+            pages, emissao, page_transactions, start_states, split_cols,
+            titulares, tx_dates, declarado_por_cartao, subtotal_pages,
         )
-    computed_total = round(sum(computed_por_cartao.values()), 2)
 
-    declarado_por_cartao = {
-        card: brl_to_float(val) for card, val in CARD_SUBTOTAL_RE.findall(full_text)
-    }
-    gm = GRAND_TOTAL_RE.search(full_text)
-    declarado_total = brl_to_float(gm.group(1)) if gm else None
+    transactions = [t for page in page_transactions for t in page]
+    transactions.sort(key=lambda t: t["data"])
+
+    computed_por_cartao = _totals_by_card(transactions)
+    computed_total = round(sum(computed_por_cartao.values()), 2)
 
     conferido = (
         computed_por_cartao == declarado_por_cartao
         and (declarado_total is None or computed_total == declarado_total)
     )
 
+    # Where a statement fails to reconcile: each card's computed-minus-
+    # declared difference and the pages its lines were read from, and each
+    # page's own per-card totals.
+    card_pages = {}
+    paginas = []
+    for index, page in enumerate(page_transactions):
+        for t in page:
+            card_pages.setdefault(t["cartao_final"], set()).add(index + 1)
+        paginas.append({
+            "pagina": index + 1,
+            "coluna": split_cols[index],
+            "transacoes": len(page),
+            "total_por_cartao": _totals_by_card(page),
+        })
+    for card, index in subtotal_pages.items():
+        card_pages.setdefault(card, set()).add(index + 1)
+    divergencias = [
+        {
+            "cartao_final": card,
+            "total_calculado": computed_por_cartao.get(card, 0.0),
+            "total_declarado": declarado_por_cartao.get(card),
+            "diferenca": delta,
+            "paginas": sorted(card_pages.get(card, ())),
+        }
+        for card, delta in _card_deltas(computed_por_cartao, declarado_por_cartao).items()
+    ]
+
     return {
-        "arquivo": os.path.basename(pdf_path),
+        "arquivo": arquivo,
+        "banco": "itau",
         "emissao": emissao.isoformat(),
         "vencimento": vencimento.isoformat() if vencimento else None,
         "titulares": titulares,
@@ -214,34 +498,14 @@ def extract_statement(pdf_path):
             "total_declarado_lancamentos": declarado_total,
             "conferido": conferido,
         },
+        "reconciliacao": {
+            "divergencias": divergencias,
+            "paginas": paginas,
+            "paginas_reprocessadas": paginas_reprocessadas,
+        },
     }
 
 
-def extract_statement_from_bytes(pdf_bytes, filename="statement.pdf"):
-    """Same as extract_statement, but for an uploaded file held in memory.
-
-    pdftotext needs a real path, so the bytes are written to a temp file that
-    is always removed again.
-    """
-    if not pdf_bytes:
-        raise ItauPdfError("The uploaded file is empty")
-    if not pdf_bytes.startswith(b"%PDF"):
-        raise ItauPdfError("The uploaded file is not a PDF")
-
-    tmp_path = None
-    try:
-        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
-            tmp.write(pdf_bytes)
-            tmp_path = tmp.name
-        statement = extract_statement(tmp_path)
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            os.unlink(tmp_path)
-
-    statement["arquivo"] = os.path.basename(filename)
-    return statement
-
-
 def _category_from_transaction(transaction):
     """Itau prints "<CATEGORY> .<CITY>" beneath each transaction (the space
     before the dot is not always there). Everything before the first dot is
@@ -282,3 +546,17 @@ def statement_to_finance_entries(statement):
             entries.append(row)
 
     return entries, skipped
+
+
+def _is_itau_statement(first_page):
+    return SNIFF_RE.search(first_page) is not None
+
+
+register_parser(StatementParser(
+    name="itau",
+    label="Itaú",
+    version=PARSER_VERSION,
+    sniff=_is_itau_statement,
+    parse=_statement_from_pages,
+    to_finance_entries=statement_to_finance_entries,
+))
@@ -0,0 +1,117 @@
+"""Prometheus metrics for the Flask API.
+
+Per-route request counts, latency and response size, plus how long each
+request spent inside get_cursor() and how many statements it ran there.
+
+Under gunicorn every worker is its own process, so each one's counters
+would otherwise be scraped separately, whichever worker happened to answer.
+When PROMETHEUS_MULTIPROC_DIR is set (the Dockerfile sets it, and
+gunicorn.conf.py clears it on boot and tidies up after dead workers)
+prometheus_client keeps the values in files there and render() sums them
+across workers.
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "Requests handled, by route template and status code.",
+    ["method", "route", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time from the request arriving to the last byte of the response.",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Response body size.",
+    ["method", "route"],
+    buckets=SIZE_BUCKETS,
+)
+DB_TIME = Histogram(
+    "http_request_db_seconds",
+    "Time a request spent inside get_cursor(), connection wait included.",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Statements a request executed through get_cursor().",
+    ["method", "route"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+
+
+class RequestMetrics:
+    """What one request has used so far; lives on flask.g."""
+
+    __slots__ = ("started", "db_seconds", "db_queries", "recorded")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        # Set once the request has been handed to observe_request.
+        self.recorded = False
+
+
+class CountingCursor:
+    """Wraps a cursor to count the statements run through it."""
+
+    def __init__(self, cursor, request_metrics):
+        self._cursor = cursor
+        self._metrics = request_metrics
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, *args, **kwargs):
+        self._metrics.db_queries += 1
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self._metrics.db_queries += 1
+        return self._cursor.executemany(*args, **kwargs)
+
+
+def observe_request(request_metrics, method, route, status, size):
+    """Record a finished request. `size` is None when it is not known
+    up front (a streamed response)."""
+    REQUESTS.labels(method, route, str(status)).inc()
+    REQUEST_LATENCY.labels(method, route).observe(
+        time.perf_counter() - request_metrics.started
+    )
+    if size is not None:
+        RESPONSE_SIZE.labels(method, route).observe(size)
+    DB_TIME.labels(method, route).observe(request_metrics.db_seconds)
+    DB_QUERIES.labels(method, route).observe(request_metrics.db_queries)
+
+
+def render():
+    """Return (body, content_type) for a scrape, merged across workers when
+    running in multiprocess mode."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
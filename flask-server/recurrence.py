@@ -0,0 +1,106 @@
+"""Recurrence rules for TODO series.
+
+A rule is RRULE-like: "FREQ=WEEKLY;INTERVAL=2", with FREQ one of DAILY,
+WEEKLY, MONTHLY or YEARLY and INTERVAL (1 to MAX_INTERVAL) defaulting to 1.
+"daily", "weekly", "monthly" and "yearly" are shorthands for the INTERVAL=1
+rules. todo_items.recurrence_rule holds a rule as normalize_rule() gives it,
+or "none".
+
+Occurrences are counted from the series' first due date (dtstart), so the
+n-th one is computed directly rather than by stepping through the ones
+before it: expanding a window costs the occurrences in it, however long the
+series has been running. Monthly and yearly occurrences keep dtstart's day
+of the month, moved back to the last day of shorter months (Jan 31, Feb 29,
+Mar 31, ...), instead of drifting to the shortest month's day.
+"""
+import calendar
+from datetime import timedelta
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+RULE_ALIASES = {
+    "daily": "FREQ=DAILY",
+    "weekly": "FREQ=WEEKLY",
+    "monthly": "FREQ=MONTHLY",
+    "yearly": "FREQ=YEARLY",
+}
+# Keeps a normalized rule well inside todo_items.recurrence_rule's 64 chars.
+MAX_INTERVAL = 999
+
+
+def parse_rule(rule):
+    """Return (freq, interval) for a rule or one of RULE_ALIASES. Raises
+    ValueError on anything else."""
+    parts = {}
+    for part in RULE_ALIASES.get(rule, rule).split(";"):
+        key, sep, value = part.partition("=")
+        if not sep:
+            raise ValueError(f"Invalid recurrence rule: {rule!r}")
+        parts[key.strip().upper()] = value.strip().upper()
+
+    freq = parts.pop("FREQ", None)
+    if freq not in FREQUENCIES:
+        raise ValueError(f"FREQ must be one of: {', '.join(FREQUENCIES)}")
+    try:
+        interval = int(parts.pop("INTERVAL", "1"))
+    except ValueError:
+        interval = 0
+    if not 1 <= interval <= MAX_INTERVAL:
+        raise ValueError(f"INTERVAL must be an integer between 1 and {MAX_INTERVAL}")
+    if parts:
+        raise ValueError(f"Unsupported recurrence rule part(s): {', '.join(parts)}")
+    return freq, interval
+
+
+def normalize_rule(rule):
+    """The form a rule is stored in: the lowercase shorthand for an INTERVAL=1
+    rule ("FREQ=WEEKLY" -> "weekly"), else "FREQ=X;INTERVAL=n". Raises
+    ValueError like parse_rule."""
+    freq, interval = parse_rule(rule)
+    if interval == 1:
+        return freq.lower()
+    return f"FREQ={freq};INTERVAL={interval}"
+
+
+def _add_months(dt, months):
+    month_index = dt.month - 1 + months
+    year = dt.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(dt.day, calendar.monthrange(year, month)[1])
+    return dt.replace(year=year, month=month, day=day)
+
+
+def _months_between(start, end):
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+def occurrences(rule, dtstart, start, end):
+    """Every occurrence of `rule`, counted from `dtstart`, in [start, end)."""
+    freq, interval = parse_rule(rule)
+    start = max(start, dtstart)
+    if start >= end:
+        return []
+
+    if freq in ("DAILY", "WEEKLY"):
+        step = timedelta(days=interval * (7 if freq == "WEEKLY" else 1))
+        first = -(-(start - dtstart) // step)  # ceiling division
+        last = -(-(end - dtstart) // step)
+        return [dtstart + n * step for n in range(first, last)]
+
+    step = interval * (12 if freq == "YEARLY" else 1)
+    # Clamping to the end of a short month can only move an occurrence
+    # earlier within its month, so one candidate either side of the window
+    # is all that needs checking.
+    first = max(0, _months_between(dtstart, start) // step)
+    last = _months_between(dtstart, end) // step + 1
+    candidates = (_add_months(dtstart, n * step) for n in range(first, last))
+    return [dt for dt in candidates if start <= dt < end]
+
+
+def next_occurrence(rule, dtstart, after):
+    """The first occurrence of `rule`, counted from `dtstart`, later than
+    `after`."""
+    _, interval = parse_rule(rule)
+    # No rule's interval is longer than this, so one window always holds it.
+    span = timedelta(days=366 * interval + 1)
+    start = after + timedelta(microseconds=1)
+    return occurrences(rule, dtstart, start, start + span)[0]
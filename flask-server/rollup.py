@@ -0,0 +1,139 @@
+"""
+Daily rollup of tracked time.
+
+time_entry_daily_rollup holds each user's tracked seconds per local day and
+category, local meaning ROLLUP_TIMEZONE: the days the dashboard groups
+entries by. Every write to time_entries adjusts it in the same transaction,
+so /entry/summary reads O(days) rows instead of every entry.
+
+backfill_rollup.py rebuilds it from time_entries. Run it once after the
+table is created, and again whenever ROLLUP_TIMEZONE changes.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from db import get_cursor
+
+ROLLUP_TIMEZONE = ZoneInfo(os.getenv("ROLLUP_TIMEZONE", "America/Sao_Paulo"))
+# The backfill rebuilds ROLLUP_BACKFILL_BATCH_SIZE users per transaction,
+# reading their entries ROLLUP_BACKFILL_FETCH_SIZE rows at a time.
+ROLLUP_BACKFILL_BATCH_SIZE = int(os.getenv("ROLLUP_BACKFILL_BATCH_SIZE", "50"))
+ROLLUP_BACKFILL_FETCH_SIZE = 1000
+
+ROLLUP_UPSERT_SQL = """
+    INSERT INTO time_entry_daily_rollup (user_id, day, category_id, seconds)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE seconds = seconds + VALUES(seconds)
+"""
+
+
+def local_today():
+    """The current day in ROLLUP_TIMEZONE."""
+    return datetime.now(ROLLUP_TIMEZONE).date()
+
+
+def rollup_deltas(category_id, start_time, end_time, sign=1):
+    """Split an entry into [(day, category_id, seconds)], one per
+    ROLLUP_TIMEZONE day it touches, so an entry running past local midnight
+    counts on both days. Naive datetimes are UTC, as stored. A sign of -1
+    gives the amounts to take back off."""
+    if start_time.tzinfo is None:
+        start_time = start_time.replace(tzinfo=timezone.utc)
+    if end_time.tzinfo is None:
+        end_time = end_time.replace(tzinfo=timezone.utc)
+
+    # Stepping in UTC keeps a DST change from shortening or stretching a day.
+    deltas = []
+    current = start_time.astimezone(timezone.utc)
+    end_time = end_time.astimezone(timezone.utc)
+    while current < end_time:
+        day = current.astimezone(ROLLUP_TIMEZONE).date()
+        next_midnight = datetime.combine(
+            day + timedelta(days=1), datetime.min.time(), tzinfo=ROLLUP_TIMEZONE
+        ).astimezone(timezone.utc)
+        segment_end = min(next_midnight, end_time)
+        seconds = int((segment_end - current).total_seconds())
+        if seconds:
+            deltas.append((day, category_id, sign * seconds))
+        current = segment_end
+    return deltas
+
+
+def apply_rollup_deltas(cursor, user_id, deltas):
+    """Fold deltas from rollup_deltas into the user's rollup rows, merging
+    those for the same day and category first. Rows that drop to zero are
+    left in place; readers skip them."""
+    merged = {}
+    for day, category_id, seconds in deltas:
+        merged[(day, category_id)] = merged.get((day, category_id), 0) + seconds
+
+    rows = [
+        (user_id, day, category_id, seconds)
+        for (day, category_id), seconds in merged.items()
+        if seconds
+    ]
+    if rows:
+        cursor.executemany(ROLLUP_UPSERT_SQL, rows)
+
+
+def _rebuild_users(cursor, user_ids):
+    """Replace the rollup rows of `user_ids` with ones computed from their
+    time entries, inside the caller's transaction. Returns the rows written.
+
+    The entries are read FOR SHARE: that holds off any write to those users'
+    entries (and with it the matching rollup update) until this transaction
+    commits, so nothing is counted twice or lost.
+    """
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    cursor.execute(
+        f"""
+        SELECT user_id, category_id, start_time, end_time
+        FROM time_entries
+        WHERE user_id IN ({placeholders})
+        FOR SHARE
+        """,
+        list(user_ids),
+    )
+    merged = {}
+    while True:
+        entries = cursor.fetchmany(ROLLUP_BACKFILL_FETCH_SIZE)
+        if not entries:
+            break
+        for entry in entries:
+            for day, category_id, seconds in rollup_deltas(
+                entry["category_id"], entry["start_time"], entry["end_time"]
+            ):
+                key = (entry["user_id"], day, category_id)
+                merged[key] = merged.get(key, 0) + seconds
+
+    cursor.execute(
+        f"DELETE FROM time_entry_daily_rollup WHERE user_id IN ({placeholders})",
+        list(user_ids),
+    )
+    rows = [(*key, seconds) for key, seconds in merged.items() if seconds]
+    if rows:
+        cursor.executemany(ROLLUP_UPSERT_SQL, rows)
+    return len(rows)
+
+
+def backfill_rollup(batch_size=ROLLUP_BACKFILL_BATCH_SIZE):
+    """Rebuild time_entry_daily_rollup from time_entries, walking users in
+    id order, batch_size users per transaction. Safe to run while the API is
+    serving writes, and to re-run. Returns {"users", "days"}: users rebuilt
+    and (user, day, category) rows written."""
+    users = days = 0
+    last_id = 0
+    while True:
+        with get_cursor() as cursor:
+            cursor.execute(
+                "SELECT id FROM users WHERE id > %s ORDER BY id LIMIT %s",
+                (last_id, batch_size),
+            )
+            user_ids = [row["id"] for row in cursor.fetchall()]
+            if not user_ids:
+                break
+            days += _rebuild_users(cursor, user_ids)
+        users += len(user_ids)
+        last_id = user_ids[-1]
+    return {"users": users, "days": days}
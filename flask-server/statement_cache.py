@@ -0,0 +1,133 @@
+"""Content-addressed cache of parsed Itau statements.
+
+People re-upload the same statement PDFs over and over. A statement is
+keyed by the SHA-256 of its bytes salted with statement_pdf.parsers_version(),
+so a repeat upload costs a hash instead of a pdftotext run. Bumping any
+parser's version strands every old entry instead of serving stale parses.
+
+Two tiers: a bounded in-process LRU, and optionally a directory of JSON
+files that every gunicorn worker (and the CLI) can share. The disk tier is
+bounded too, trimmed oldest-first by modification time, which a hit
+refreshes.
+"""
+import copy
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def statement_cache_hasher(parser_version):
+    """A sha256 object to feed a PDF's bytes into, chunk by chunk; its
+    hexdigest() is the statement's cache key."""
+    return hashlib.sha256(f"statement-pdf:{parser_version}:".encode())
+
+
+def statement_cache_key(pdf_bytes, parser_version):
+    digest = statement_cache_hasher(parser_version)
+    digest.update(pdf_bytes)
+    return digest.hexdigest()
+
+
+class StatementCache:
+    """Maps cache keys to parsed statement dicts. Callers get copies, so a
+    cached statement cannot be changed from outside."""
+
+    def __init__(self, max_entries, disk_dir=None, disk_max_entries=0):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_entries = disk_max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key):
+        with self._lock:
+            statement = self._entries.get(key)
+            if statement is not None:
+                self._entries.move_to_end(key)
+                return copy.deepcopy(statement)
+
+        statement = self._read_disk(key)
+        if statement is not None:
+            self._remember(key, statement)
+            return copy.deepcopy(statement)
+        return None
+
+    def put(self, key, statement):
+        statement = copy.deepcopy(statement)
+        self._remember(key, statement)
+        self._write_disk(key, statement)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key, statement):
+        with self._lock:
+            self._entries[key] = statement
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                statement = json.load(f)
+            os.utime(path)
+            return statement
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable statement cache file {path}: {e}")
+            return None
+
+    def _write_disk(self, key, statement):
+        """Write via a temp file and rename, so a reader in another worker
+        never sees half a file."""
+        if not self.disk_dir:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(statement, f)
+            os.replace(tmp_path, self._disk_path(key))
+            self._trim_disk()
+        except OSError as e:
+            logger.warning(f"Could not write statement cache file: {e}")
+
+    def _trim_disk(self):
+        if not self.disk_max_entries:
+            return
+        paths = [
+            os.path.join(self.disk_dir, name)
+            for name in os.listdir(self.disk_dir)
+            if name.endswith(".json")
+        ]
+        if len(paths) <= self.disk_max_entries:
+            return
+
+        def mtime(path):
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                return 0
+
+        paths.sort(key=mtime)
+        for path in paths[:len(paths) - self.disk_max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,244 @@
+"""Bank statement PDFs: text extraction and the parser registry.
+
+Every supported bank's statement goes through the same pipeline: poppler's
+`pdftotext -layout` turns the PDF into page texts, the first page is shown
+to each registered parser's sniff() to find out who issued it, and only
+then are the remaining pages read and handed to that one parser. A PDF no
+parser claims is rejected after its first page, without a full extraction.
+
+Parsers register themselves with register_parser(); the ones shipped with
+the app are listed in BUILTIN_PARSERS and imported on first use.
+
+Public API:
+    extract_statement(pdf_path)                  -> dict  # one statement, JSON-serializable
+    extract_statement_from_bytes(data, filename) -> dict  # same, from an uploaded file
+    extract_statement_from_file(f, filename)     -> dict  # same, from an open binary file
+    statement_to_finance_entries(statement)      -> (entries, skipped)
+    parsers_version()                            -> str   # salts the statement cache
+
+Every parser returns the same statement shape (see itau_pdf.py) plus
+"banco", the parser's name.
+
+Requires poppler's `pdftotext` binary to be available on PATH.
+"""
+import codecs
+import importlib
+import os
+import shutil
+import subprocess
+import threading
+
+# Modules that register a parser when imported.
+BUILTIN_PARSERS = ("itau_pdf",)
+
+# pdftotext gets this long to read a statement before it is killed.
+PDFTOTEXT_TIMEOUT_SECONDS = 30
+# Bytes read from pdftotext's stdout at a time.
+PDFTOTEXT_READ_SIZE = 64 * 1024
+
+
+class StatementPdfError(Exception):
+    """Raised when a PDF cannot be read or parsed as a statement."""
+
+
+class UnsupportedStatementError(StatementPdfError):
+    """Raised when no registered parser recognizes the statement."""
+
+
+class StatementParser:
+    """One bank's statement format.
+
+    sniff(first_page) -> bool is cheap and only sees the first page's text;
+    parse(pages, arquivo) -> statement dict does the real work.
+    to_finance_entries(statement) -> (entries, skipped) maps a statement
+    onto /finance/batch-import rows. Bump `version` whenever parse() would
+    return something different for the same PDF.
+    """
+
+    __slots__ = ("name", "label", "version", "sniff", "parse", "to_finance_entries")
+
+    def __init__(self, name, label, version, sniff, parse, to_finance_entries):
+        self.name = name
+        self.label = label
+        self.version = version
+        self.sniff = sniff
+        self.parse = parse
+        self.to_finance_entries = to_finance_entries
+
+
+_parsers = {}
+_builtins_loaded = False
+_registry_lock = threading.Lock()
+
+
+def register_parser(parser):
+    """Add (or replace, by name) a statement parser."""
+    with _registry_lock:
+        _parsers[parser.name] = parser
+
+
+def _load_builtin_parsers():
+    global _builtins_loaded
+    if _builtins_loaded:
+        return
+    for module in BUILTIN_PARSERS:
+        importlib.import_module(module)
+    _builtins_loaded = True
+
+
+def parsers():
+    """The registered parsers, in registration order."""
+    _load_builtin_parsers()
+    with _registry_lock:
+        return list(_parsers.values())
+
+
+def parsers_version():
+    """Every registered parser's name and version, e.g. "itau:5"; changes
+    whenever any parser's output would."""
+    return ",".join(f"{p.name}:{p.version}" for p in parsers())
+
+
+def identify_parser(first_page):
+    """The parser whose sniff() claims this first page, or None."""
+    for parser in parsers():
+        if parser.sniff(first_page):
+            return parser
+    return None
+
+
+def pdftotext_pages(source, pdf_bytes=None, pdf_file=None):
+    """Run poppler's `pdftotext -layout <source> -` and yield its pages
+    (separated by form feeds) as they are written to stdout. -layout spaces
+    words correctly even where a statement's embedded font kerns them
+    tightly.
+
+    `source` is a path, or "-" to feed `pdf_bytes` (or the open binary file
+    `pdf_file`, copied a chunk at a time) through stdin, in which case
+    nothing touches the disk. Any failure surfaces as StatementPdfError once
+    the output has been read; closing the generator early stops pdftotext.
+    """
+    piped = pdf_bytes is not None or pdf_file is not None
+    try:
+        process = subprocess.Popen(
+            ["pdftotext", "-layout", source, "-"],
+            stdin=subprocess.PIPE if piped else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+    except FileNotFoundError:
+        raise StatementPdfError("pdftotext is not installed on the server")
+
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        process.kill()
+
+    def feed():
+        # pdftotext may quit before reading it all (not a PDF, say); its
+        # exit status reports that, so a broken pipe here is not an error.
+        try:
+            if pdf_file is not None:
+                shutil.copyfileobj(pdf_file, process.stdin, PDFTOTEXT_READ_SIZE)
+            else:
+                process.stdin.write(pdf_bytes)
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    timer = threading.Timer(PDFTOTEXT_TIMEOUT_SECONDS, kill)
+    timer.start()
+    writer = None
+    if piped:
+        writer = threading.Thread(target=feed, daemon=True)
+        writer.start()
+
+    try:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        buffered = ""
+        while True:
+            # read1: whatever is available, not a full block, so pages are
+            # yielded as pdftotext writes them.
+            chunk = process.stdout.read1(PDFTOTEXT_READ_SIZE)
+            final = not chunk
+            buffered += decoder.decode(chunk, final=final)
+            *pages, buffered = buffered.split("\f")
+            yield from pages
+            if final:
+                break
+        process.wait()
+    finally:
+        timer.cancel()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        if writer is not None:
+            writer.join()
+
+    if timed_out.is_set():
+        raise StatementPdfError("Timed out while reading the PDF")
+    if process.returncode != 0:
+        raise StatementPdfError("Could not read the PDF — is it a valid, unencrypted file?")
+    yield buffered
+
+
+def _statement_from_page_stream(page_stream, filename):
+    """Sniff the first page off `page_stream` (a pdftotext_pages generator),
+    then read the rest for the parser that claimed it. Only the sniff sees a
+    stream: parse() gets every page as a list."""
+    pages = iter(page_stream)
+    first_page = next(pages, "")
+    parser = identify_parser(first_page)
+    if parser is None:
+        page_stream.close()
+        supported = ", ".join(p.label for p in parsers())
+        raise UnsupportedStatementError(
+            f"Not a statement from a supported bank ({supported})"
+        )
+
+    statement = parser.parse([first_page, *pages], os.path.basename(filename))
+    statement["banco"] = parser.name
+    return statement
+
+
+def extract_statement(pdf_path):
+    """Parse a statement PDF from any registered bank."""
+    return _statement_from_page_stream(pdftotext_pages(pdf_path), pdf_path)
+
+
+def extract_statement_from_bytes(pdf_bytes, filename="statement.pdf"):
+    """Same as extract_statement, for an uploaded file held in memory. The
+    bytes are piped straight into pdftotext; no temp file is written."""
+    check_pdf_header(pdf_bytes[:4])
+    return _statement_from_page_stream(pdftotext_pages("-", pdf_bytes), filename)
+
+
+def extract_statement_from_file(pdf_file, filename="statement.pdf"):
+    """Same as extract_statement_from_bytes, for an open binary file (an
+    upload spooled to disk, say), read from its current position."""
+    start = pdf_file.tell()
+    check_pdf_header(pdf_file.read(4))
+    pdf_file.seek(start)
+    return _statement_from_page_stream(pdftotext_pages("-", pdf_file=pdf_file), filename)
+
+
+def check_pdf_header(head):
+    """Reject an upload whose first bytes are not a PDF's."""
+    if not head:
+        raise StatementPdfError("The uploaded file is empty")
+    if not head.startswith(b"%PDF"):
+        raise StatementPdfError("The uploaded file is not a PDF")
+
+
+def statement_to_finance_entries(statement):
+    """(entries, skipped) for a statement, by the parser that produced it."""
+    _load_builtin_parsers()
+    with _registry_lock:
+        parser = _parsers[statement.get("banco", "itau")]
+    return parser.to_finance_entries(statement)
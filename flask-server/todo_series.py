@@ -0,0 +1,154 @@
+"""
+Stored occurrences of recurring TODO items.
+
+Every recurring item with a due date heads a series (todo_series), whose
+upcoming occurrences are kept in todo_occurrences for the calendar up to a
+high-water mark. The TODO write paths extend the user's series with
+extend_user_series(); extend_recurrences.py runs extend_recurrence_horizon()
+for everyone. GET /todo/occurrences only reads what is stored.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+
+from db import get_cursor
+from recurrence import occurrences
+
+# Upcoming occurrences of recurring TODO items are stored this far ahead, by
+# the TODO write paths and by extend_recurrences.py (whose --days may go up to
+# RECURRENCE_MAX_HORIZON_DAYS).
+RECURRENCE_HORIZON_DAYS = int(os.getenv("RECURRENCE_HORIZON_DAYS", "60"))
+RECURRENCE_MAX_HORIZON_DAYS = 400
+RECURRENCE_BATCH_SIZE = int(os.getenv("RECURRENCE_BATCH_SIZE", "500"))
+
+
+def sync_todo_series(cursor, user_id=None):
+    """
+    Give every recurring TODO item that heads a series (has a due date, is
+    not completed and has not spawned a successor) a todo_series row, in one
+    INSERT ... SELECT; only `user_id`'s items when given. A new series starts
+    at its head's due date, with nothing materialized yet.
+    """
+    user_filter = "AND ti.user_id = %s" if user_id is not None else ""
+    cursor.execute(
+        f"""
+        INSERT INTO todo_series (user_id, head_item_id, rule, dtstart, materialized_until)
+        SELECT ti.user_id, ti.id, ti.recurrence_rule, ti.due_date, ti.due_date
+        FROM todo_items ti
+        LEFT JOIN todo_series s ON s.head_item_id = ti.id
+        WHERE s.id IS NULL
+          AND ti.recurrence_rule <> 'none'
+          AND ti.due_date IS NOT NULL
+          AND ti.status <> 'completed'
+          AND NOT EXISTS (
+              SELECT 1 FROM todo_items c WHERE c.recurrence_parent_id = ti.id
+          )
+          {user_filter}
+        """,
+        [user_id] if user_id is not None else [],
+    )
+
+
+def extend_series(cursor, series, until):
+    """
+    Materialize the occurrences of `series` (todo_series rows) up to
+    `until`: each series is expanded from its high-water mark in one pass,
+    every new occurrence goes in with one executemany, and one UPDATE moves
+    the marks. Occurrences no later than the head's due date (the head
+    itself, and any the series has since moved past) are pruned. Returns how
+    many occurrences were written.
+    """
+    if not series:
+        return 0
+
+    rows = []
+    for row in series:
+        for due_date in occurrences(row["rule"], row["dtstart"], row["materialized_until"], until):
+            rows.append((row["id"], due_date, row["user_id"]))
+    if rows:
+        cursor.executemany(
+            "INSERT IGNORE INTO todo_occurrences (series_id, due_date, user_id) "
+            "VALUES (%s, %s, %s)",
+            rows,
+        )
+
+    series_ids = [row["id"] for row in series]
+    placeholders = ", ".join(["%s"] * len(series_ids))
+    cursor.execute(
+        f"UPDATE todo_series SET materialized_until = %s WHERE id IN ({placeholders})",
+        [until, *series_ids],
+    )
+    cursor.execute(
+        f"""
+        DELETE o FROM todo_occurrences o
+        JOIN todo_series s ON o.series_id = s.id
+        JOIN todo_items ti ON s.head_item_id = ti.id
+        WHERE s.id IN ({placeholders}) AND o.due_date <= ti.due_date
+        """,
+        series_ids,
+    )
+    return len(rows)
+
+
+def _horizon(days):
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0) + timedelta(days=days)
+
+
+def extend_user_series(cursor, user_id, days=RECURRENCE_HORIZON_DAYS):
+    """
+    Start series for `user_id`'s recurring items that have none and
+    materialize all of that user's series up to `days` from now, on the
+    caller's cursor (inside its transaction). Called wherever a write may
+    start or restart a series. Returns how many occurrences were written.
+    """
+    sync_todo_series(cursor, user_id)
+    until = _horizon(days)
+    cursor.execute(
+        """
+        SELECT id, user_id, rule, dtstart, materialized_until
+        FROM todo_series
+        WHERE user_id = %s AND materialized_until < %s
+        FOR UPDATE
+        """,
+        (user_id, until),
+    )
+    return extend_series(cursor, cursor.fetchall(), until)
+
+
+def extend_recurrence_horizon(days=RECURRENCE_HORIZON_DAYS, batch_size=RECURRENCE_BATCH_SIZE):
+    """
+    Materialize every series' occurrences up to `days` from now, starting
+    series for recurring items that have none. Each batch of `batch_size`
+    series is its own short transaction, and a series already materialized
+    that far is not touched, so a run costs the occurrences that came into
+    the horizon since the last one.
+
+    Returns {"series": n, "occurrences": n}, the series extended and the
+    occurrences written.
+    """
+    if not 1 <= days <= RECURRENCE_MAX_HORIZON_DAYS:
+        raise ValueError(f"days must be between 1 and {RECURRENCE_MAX_HORIZON_DAYS}")
+    until = _horizon(days)
+
+    with get_cursor() as cursor:
+        sync_todo_series(cursor)
+
+    extended = {"series": 0, "occurrences": 0}
+    while True:
+        with get_cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT id, user_id, rule, dtstart, materialized_until
+                FROM todo_series
+                WHERE materialized_until < %s
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE
+                """,
+                (until, batch_size),
+            )
+            series = cursor.fetchall()
+            extended["occurrences"] += extend_series(cursor, series, until)
+        extended["series"] += len(series)
+        if len(series) < batch_size:
+            break
+    return extended
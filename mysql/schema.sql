@@ -39,7 +39,9 @@ CREATE TABLE IF NOT EXISTS time_entries (
 
   PRIMARY KEY (id),
 
-  KEY idx_time_entries_user (user_id),
+  -- Serves GET /entry's date windows and (start_time, id) keyset pages, and
+  -- doubles as the index behind fk_time_entries_user.
+  KEY idx_time_entries_user_start (user_id, start_time, id),
   KEY idx_time_entries_category (category_id),
 
   CONSTRAINT fk_time_entries_user
@@ -58,6 +60,31 @@ CREATE TABLE IF NOT EXISTS time_entries (
     CHECK (end_time > start_time)
 ) ENGINE=InnoDB;
 
+-- Seconds tracked per user, local day (ROLLUP_TIMEZONE) and category. Kept
+-- in step with time_entries by the API so GET /entry/summary reads days, not
+-- entries; backfill_rollup.py rebuilds it.
+CREATE TABLE IF NOT EXISTS time_entry_daily_rollup (
+  user_id INT UNSIGNED NOT NULL,
+  day DATE NOT NULL,
+  category_id INT UNSIGNED NOT NULL,
+  seconds INT NOT NULL DEFAULT 0,
+
+  PRIMARY KEY (user_id, day, category_id),
+  KEY idx_rollup_category (category_id),
+
+  CONSTRAINT fk_rollup_user
+    FOREIGN KEY (user_id)
+    REFERENCES users (id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE,
+
+  CONSTRAINT fk_rollup_category
+    FOREIGN KEY (category_id)
+    REFERENCES category (id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
 -- Finance categories table
 CREATE TABLE IF NOT EXISTS finance_categories (
   id INT UNSIGNED NOT NULL AUTO_INCREMENT,
@@ -125,18 +152,26 @@ CREATE TABLE IF NOT EXISTS todo_items (
   priority ENUM('low', 'medium', 'high') NOT NULL DEFAULT 'medium',
   status ENUM('pending', 'in_progress', 'completed') NOT NULL DEFAULT 'pending',
   due_date DATETIME DEFAULT NULL,
-  recurrence_rule ENUM('none', 'daily', 'weekly', 'monthly') NOT NULL DEFAULT 'none',
+  -- "none", or a rule as recurrence.normalize_rule() stores it.
+  recurrence_rule VARCHAR(64) NOT NULL DEFAULT 'none',
   recurrence_parent_id INT UNSIGNED DEFAULT NULL,
   completed_at DATETIME DEFAULT NULL,
   created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
   updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  -- The order GET /todo lists in (high first), as an indexable column.
+  priority_rank TINYINT UNSIGNED AS (
+    CASE priority WHEN 'high' THEN 1 WHEN 'medium' THEN 2 ELSE 3 END
+  ) STORED NOT NULL,
 
   PRIMARY KEY (id),
 
-  KEY idx_todo_items_user (user_id),
+  -- Serve GET /todo's order and keyset pages, with and without a status
+  -- filter; the first doubles as the index behind fk_todo_items_user.
+  KEY idx_todo_items_user_rank (user_id, priority_rank, due_date, id DESC),
+  KEY idx_todo_items_user_status_rank (user_id, status, priority_rank, due_date, id DESC),
+  -- Finds the completed items old enough to archive.
+  KEY idx_todo_items_completed_at (completed_at),
   KEY idx_todo_items_category (category_id),
-  KEY idx_todo_items_status (status),
-  KEY idx_todo_items_priority (priority),
   KEY idx_todo_items_recurrence_parent (recurrence_parent_id),
 
   CONSTRAINT fk_todo_items_user
@@ -189,6 +224,57 @@ CREATE TABLE IF NOT EXISTS todo_item_tags (
     ON UPDATE CASCADE
 ) ENGINE=InnoDB;
 
+-- Recurring TODO series. The head is the series' current (latest) item;
+-- completing it spawns the next, which becomes the head. Deleting the head
+-- ends the series. Upcoming occurrences are expanded from dtstart by rule
+-- (see recurrence.py) and stored up to materialized_until, the high-water
+-- mark, which extend_recurrences.py and the TODO write paths move forward.
+CREATE TABLE IF NOT EXISTS todo_series (
+  id INT UNSIGNED NOT NULL AUTO_INCREMENT,
+
+  user_id INT UNSIGNED NOT NULL,
+  head_item_id INT UNSIGNED NOT NULL,
+
+  rule VARCHAR(64) NOT NULL,
+  dtstart DATETIME NOT NULL,
+  materialized_until DATETIME NOT NULL,
+
+  PRIMARY KEY (id),
+
+  UNIQUE KEY uk_todo_series_head (head_item_id),
+  KEY idx_todo_series_user_horizon (user_id, materialized_until),
+  KEY idx_todo_series_horizon (materialized_until),
+
+  CONSTRAINT fk_todo_series_user
+    FOREIGN KEY (user_id)
+    REFERENCES users (id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE,
+
+  CONSTRAINT fk_todo_series_head
+    FOREIGN KEY (head_item_id)
+    REFERENCES todo_items (id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+-- Upcoming due dates of each series, later than its head's
+CREATE TABLE IF NOT EXISTS todo_occurrences (
+  series_id INT UNSIGNED NOT NULL,
+  due_date DATETIME NOT NULL,
+  user_id INT UNSIGNED NOT NULL,
+
+  PRIMARY KEY (series_id, due_date),
+
+  KEY idx_todo_occurrences_user_due (user_id, due_date),
+
+  CONSTRAINT fk_todo_occurrences_series
+    FOREIGN KEY (series_id)
+    REFERENCES todo_series (id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
 -- Pomodoro sessions table
 CREATE TABLE IF NOT EXISTS pomodoro_sessions (
   id INT UNSIGNED NOT NULL AUTO_INCREMENT,
@@ -204,10 +290,15 @@ CREATE TABLE IF NOT EXISTS pomodoro_sessions (
 
   PRIMARY KEY (id),
 
-  KEY idx_pomodoro_sessions_user (user_id),
+  -- Covers GET /pomodoro/stats entirely (every column it reads is in the
+  -- index) and doubles as the index behind fk_pomodoro_sessions_user.
+  KEY idx_pomodoro_sessions_stats (user_id, status, session_type, session_date, duration_seconds),
   KEY idx_pomodoro_sessions_todo (todo_id),
   KEY idx_pomodoro_sessions_date (session_date),
-  KEY idx_pomodoro_sessions_status (status),
+  -- GET /pomodoro/sessions reads a user's latest sessions in this order.
+  KEY idx_pomodoro_sessions_user_date (user_id, session_date),
+  -- Lets the reaper find abandoned in_progress sessions by age.
+  KEY idx_pomodoro_sessions_status (status, session_date),
   KEY idx_pomodoro_sessions_type (session_type),
 
   CONSTRAINT fk_pomodoro_sessions_user
@@ -222,3 +313,132 @@ CREATE TABLE IF NOT EXISTS pomodoro_sessions (
     ON DELETE SET NULL
     ON UPDATE CASCADE
 ) ENGINE=InnoDB;
+
+-- Each user's running Pomodoro session, if any. One row per user, so the
+-- timer's lookup (GET /pomodoro/active) is a primary-key read. Start points
+-- the slot at the new session; complete and cancel free it only if it still
+-- points at theirs.
+CREATE TABLE IF NOT EXISTS active_pomodoro (
+  user_id INT UNSIGNED NOT NULL,
+  session_id INT UNSIGNED NOT NULL,
+  todo_id INT UNSIGNED DEFAULT NULL,
+
+  session_type ENUM('pomodoro', 'short_break', 'long_break') NOT NULL,
+  started_at DATETIME NOT NULL,
+
+  PRIMARY KEY (user_id),
+
+  UNIQUE KEY uk_active_pomodoro_session (session_id),
+
+  CONSTRAINT fk_active_pomodoro_user
+    FOREIGN KEY (user_id)
+    REFERENCES users (id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE,
+
+  CONSTRAINT fk_active_pomodoro_session
+    FOREIGN KEY (session_id)
+    REFERENCES pomodoro_sessions (id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+-- Archive tier. archive_history.py moves completed TODO items and finished
+-- Pomodoro sessions here once they are old enough, so the hot tables above
+-- hold only the working set; reads look here only when asked for history.
+-- Rows keep the ids they had. The item and session archives are partitioned
+-- by year, so a year of history can be dropped or moved wholesale; MySQL
+-- allows no foreign keys on partitioned tables, so nothing references them.
+-- Split pmax (ALTER TABLE ... REORGANIZE PARTITION) before it fills up.
+CREATE TABLE IF NOT EXISTS todo_items_archive (
+  id INT UNSIGNED NOT NULL,
+
+  user_id INT UNSIGNED NOT NULL,
+  category_id INT UNSIGNED NOT NULL,
+
+  title VARCHAR(255) NOT NULL,
+  description TEXT DEFAULT NULL,
+  priority ENUM('low', 'medium', 'high') NOT NULL,
+  status ENUM('pending', 'in_progress', 'completed') NOT NULL,
+  due_date DATETIME DEFAULT NULL,
+  recurrence_rule VARCHAR(64) NOT NULL,
+  recurrence_parent_id INT UNSIGNED DEFAULT NULL,
+  completed_at DATETIME NOT NULL,
+  created_at DATETIME NOT NULL,
+  updated_at DATETIME NOT NULL,
+  archived_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  priority_rank TINYINT UNSIGNED AS (
+    CASE priority WHEN 'high' THEN 1 WHEN 'medium' THEN 2 ELSE 3 END
+  ) STORED NOT NULL,
+
+  PRIMARY KEY (id, completed_at),
+
+  KEY idx_todo_items_archive_user_rank (user_id, priority_rank, due_date, id DESC)
+) ENGINE=InnoDB
+PARTITION BY RANGE (YEAR(completed_at)) (
+  PARTITION p2024 VALUES LESS THAN (2025),
+  PARTITION p2025 VALUES LESS THAN (2026),
+  PARTITION p2026 VALUES LESS THAN (2027),
+  PARTITION p2027 VALUES LESS THAN (2028),
+  PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+-- Tags of archived TODO items
+CREATE TABLE IF NOT EXISTS todo_item_tags_archive (
+  todo_id INT UNSIGNED NOT NULL,
+  tag_id INT UNSIGNED NOT NULL,
+
+  PRIMARY KEY (todo_id, tag_id),
+
+  KEY idx_todo_item_tags_archive_tag (tag_id),
+
+  CONSTRAINT fk_todo_item_tags_archive_tag
+    FOREIGN KEY (tag_id)
+    REFERENCES todo_tags (id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+-- Archived Pomodoro sessions. The TODO title is copied in when a session is
+-- archived, as its item may be archived (or deleted) later.
+CREATE TABLE IF NOT EXISTS pomodoro_sessions_archive (
+  id INT UNSIGNED NOT NULL,
+
+  user_id INT UNSIGNED NOT NULL,
+  todo_id INT UNSIGNED DEFAULT NULL,
+  todo_title VARCHAR(255) DEFAULT NULL,
+
+  session_type ENUM('pomodoro', 'short_break', 'long_break') NOT NULL,
+  duration_seconds INT UNSIGNED NOT NULL,
+  status ENUM('in_progress', 'completed', 'cancelled') NOT NULL,
+  session_date DATETIME NOT NULL,
+  created_at DATETIME NOT NULL,
+  archived_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+  PRIMARY KEY (id, session_date),
+
+  KEY idx_pomodoro_sessions_archive_user (user_id, session_date)
+) ENGINE=InnoDB
+PARTITION BY RANGE (YEAR(session_date)) (
+  PARTITION p2024 VALUES LESS THAN (2025),
+  PARTITION p2025 VALUES LESS THAN (2026),
+  PARTITION p2026 VALUES LESS THAN (2027),
+  PARTITION p2027 VALUES LESS THAN (2028),
+  PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+-- Completed focus sessions each user has had archived, so the all-time
+-- figures in GET /pomodoro/stats need not read the archive.
+CREATE TABLE IF NOT EXISTS pomodoro_archived_totals (
+  user_id INT UNSIGNED NOT NULL,
+  sessions INT UNSIGNED NOT NULL DEFAULT 0,
+  total_seconds BIGINT UNSIGNED NOT NULL DEFAULT 0,
+
+  PRIMARY KEY (user_id),
+
+  CONSTRAINT fk_pomodoro_archived_totals_user
+    FOREIGN KEY (user_id)
+    REFERENCES users (id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE
+) ENGINE=InnoDB;
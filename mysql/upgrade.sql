@@ -0,0 +1,346 @@
+-- Brings a database created from an older mysql/schema.sql up to the current
+-- one. schema.sql only runs against an empty data volume; run this instead
+-- on an existing one (see "Upgrading an existing database" in README.md).
+--
+-- Every step checks information_schema or uses IF NOT EXISTS first, so the
+-- script can be re-run, and run again after it was interrupted. New indexes
+-- are added before the ones they replace are dropped, as each foreign key
+-- needs an index leading with its column at all times.
+--
+-- Adding todo_items.priority_rank rebuilds the table (MySQL cannot add a
+-- STORED generated column in place) and blocks writes to it meanwhile.
+--
+-- The CREATE TABLE statements are copies of those in schema.sql; keep the
+-- two in step.
+
+USE time_tracker;
+
+DROP PROCEDURE IF EXISTS upgrade_add_column;
+DROP PROCEDURE IF EXISTS upgrade_add_index;
+DROP PROCEDURE IF EXISTS upgrade_drop_index;
+DROP PROCEDURE IF EXISTS upgrade_modify_column;
+
+DELIMITER //
+
+-- Add `col` to `tbl` unless it is already there.
+CREATE PROCEDURE upgrade_add_column(IN tbl VARCHAR(64), IN col VARCHAR(64), IN definition TEXT)
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = tbl AND COLUMN_NAME = col
+  ) THEN
+    SET @upgrade_ddl = CONCAT('ALTER TABLE `', tbl, '` ADD COLUMN `', col, '` ', definition);
+    PREPARE upgrade_stmt FROM @upgrade_ddl;
+    EXECUTE upgrade_stmt;
+    DEALLOCATE PREPARE upgrade_stmt;
+  END IF;
+END//
+
+-- Make `idx` on `tbl` an index over `cols` (as in a KEY clause, e.g.
+-- 'user_id, id DESC'): add it if missing, rebuild it if it exists over
+-- other columns, leave it alone otherwise.
+CREATE PROCEDURE upgrade_add_index(IN tbl VARCHAR(64), IN idx VARCHAR(64), IN cols VARCHAR(255))
+BEGIN
+  DECLARE existing VARCHAR(255);
+
+  SELECT GROUP_CONCAT(COLUMN_NAME ORDER BY SEQ_IN_INDEX SEPARATOR ',') INTO existing
+  FROM information_schema.STATISTICS
+  WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = tbl AND INDEX_NAME = idx;
+
+  IF existing IS NULL OR existing <> REPLACE(REPLACE(cols, ' DESC', ''), ' ', '') THEN
+    SET @upgrade_ddl = CONCAT(
+      'ALTER TABLE `', tbl, '` ',
+      IF(existing IS NULL, '', CONCAT('DROP INDEX `', idx, '`, ')),
+      'ADD INDEX `', idx, '` (', cols, ')'
+    );
+    PREPARE upgrade_stmt FROM @upgrade_ddl;
+    EXECUTE upgrade_stmt;
+    DEALLOCATE PREPARE upgrade_stmt;
+  END IF;
+END//
+
+-- Drop `idx` from `tbl` if it is there.
+CREATE PROCEDURE upgrade_drop_index(IN tbl VARCHAR(64), IN idx VARCHAR(64))
+BEGIN
+  IF EXISTS (
+    SELECT 1 FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = tbl AND INDEX_NAME = idx
+  ) THEN
+    SET @upgrade_ddl = CONCAT('ALTER TABLE `', tbl, '` DROP INDEX `', idx, '`');
+    PREPARE upgrade_stmt FROM @upgrade_ddl;
+    EXECUTE upgrade_stmt;
+    DEALLOCATE PREPARE upgrade_stmt;
+  END IF;
+END//
+
+-- Redefine `col` of `tbl` if its type is not `data_type` (as in
+-- information_schema.COLUMNS.DATA_TYPE, e.g. 'varchar'). A missing table is
+-- left alone.
+CREATE PROCEDURE upgrade_modify_column(
+  IN tbl VARCHAR(64), IN col VARCHAR(64), IN data_type VARCHAR(64), IN definition TEXT
+)
+BEGIN
+  IF EXISTS (
+    SELECT 1 FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = tbl AND COLUMN_NAME = col
+      AND DATA_TYPE <> data_type
+  ) THEN
+    SET @upgrade_ddl = CONCAT('ALTER TABLE `', tbl, '` MODIFY COLUMN `', col, '` ', definition);
+    PREPARE upgrade_stmt FROM @upgrade_ddl;
+    EXECUTE upgrade_stmt;
+    DEALLOCATE PREPARE upgrade_stmt;
+  END IF;
+END//
+
+DELIMITER ;
+
+-- time_entries: one index for GET /entry's windows and keyset pages.
+CALL upgrade_add_index('time_entries', 'idx_time_entries_user_start', 'user_id, start_time, id');
+CALL upgrade_drop_index('time_entries', 'idx_time_entries_user');
+
+-- todo_items: GET /todo's order as an indexable column, and indexes that
+-- serve it with and without a status filter.
+CALL upgrade_add_column('todo_items', 'priority_rank',
+  "TINYINT UNSIGNED AS (CASE priority WHEN 'high' THEN 1 WHEN 'medium' THEN 2 ELSE 3 END) STORED NOT NULL");
+CALL upgrade_add_index('todo_items', 'idx_todo_items_user_rank', 'user_id, priority_rank, due_date, id DESC');
+CALL upgrade_add_index('todo_items', 'idx_todo_items_user_status_rank', 'user_id, status, priority_rank, due_date, id DESC');
+CALL upgrade_add_index('todo_items', 'idx_todo_items_completed_at', 'completed_at');
+CALL upgrade_drop_index('todo_items', 'idx_todo_items_user');
+CALL upgrade_drop_index('todo_items', 'idx_todo_items_status');
+CALL upgrade_drop_index('todo_items', 'idx_todo_items_priority');
+
+-- recurrence_rule: any rule recurrence.py parses, not just the shorthands.
+-- Rebuilds each table.
+CALL upgrade_modify_column('todo_items', 'recurrence_rule', 'varchar',
+  "VARCHAR(64) NOT NULL DEFAULT 'none'");
+CALL upgrade_modify_column('todo_items_archive', 'recurrence_rule', 'varchar', 'VARCHAR(64) NOT NULL');
+
+-- pomodoro_sessions: a covering index for /pomodoro/stats, one for the
+-- session list, and the reaper's status index gains session_date.
+CALL upgrade_add_index('pomodoro_sessions', 'idx_pomodoro_sessions_stats',
+  'user_id, status, session_type, session_date, duration_seconds');
+CALL upgrade_add_index('pomodoro_sessions', 'idx_pomodoro_sessions_user_date', 'user_id, session_date');
+CALL upgrade_add_index('pomodoro_sessions', 'idx_pomodoro_sessions_status', 'status, session_date');
+CALL upgrade_drop_index('pomodoro_sessions', 'idx_pomodoro_sessions_user');
+
+DROP PROCEDURE upgrade_add_column;
+DROP PROCEDURE upgrade_add_index;
+DROP PROCEDURE upgrade_drop_index;
+DROP PROCEDURE upgrade_modify_column;
+
+-- Seconds tracked per user, local day (ROLLUP_TIMEZONE) and category. Kept
+-- in step with time_entries by the API so GET /entry/summary reads days, not
+-- entries; backfill_rollup.py rebuilds it.
+CREATE TABLE IF NOT EXISTS time_entry_daily_rollup (
+  user_id INT UNSIGNED NOT NULL,
+  day DATE NOT NULL,
+  category_id INT UNSIGNED NOT NULL,
+  seconds INT NOT NULL DEFAULT 0,
+
+  PRIMARY KEY (user_id, day, category_id),
+  KEY idx_rollup_category (category_id),
+
+  CONSTRAINT fk_rollup_user
+    FOREIGN KEY (user_id)
+    REFERENCES users (id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE,
+
+  CONSTRAINT fk_rollup_category
+    FOREIGN KEY (category_id)
+    REFERENCES category (id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+-- Recurring TODO series. The head is the series' current (latest) item;
+-- completing it spawns the next, which becomes the head. Deleting the head
+-- ends the series. Upcoming occurrences are expanded from dtstart by rule
+-- (see recurrence.py) and stored up to materialized_until, the high-water
+-- mark, which extend_recurrences.py and the TODO write paths move forward.
+CREATE TABLE IF NOT EXISTS todo_series (
+  id INT UNSIGNED NOT NULL AUTO_INCREMENT,
+
+  user_id INT UNSIGNED NOT NULL,
+  head_item_id INT UNSIGNED NOT NULL,
+
+  rule VARCHAR(64) NOT NULL,
+  dtstart DATETIME NOT NULL,
+  materialized_until DATETIME NOT NULL,
+
+  PRIMARY KEY (id),
+
+  UNIQUE KEY uk_todo_series_head (head_item_id),
+  KEY idx_todo_series_user_horizon (user_id, materialized_until),
+  KEY idx_todo_series_horizon (materialized_until),
+
+  CONSTRAINT fk_todo_series_user
+    FOREIGN KEY (user_id)
+    REFERENCES users (id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE,
+
+  CONSTRAINT fk_todo_series_head
+    FOREIGN KEY (head_item_id)
+    REFERENCES todo_items (id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+-- Upcoming due dates of each series, later than its head's
+CREATE TABLE IF NOT EXISTS todo_occurrences (
+  series_id INT UNSIGNED NOT NULL,
+  due_date DATETIME NOT NULL,
+  user_id INT UNSIGNED NOT NULL,
+
+  PRIMARY KEY (series_id, due_date),
+
+  KEY idx_todo_occurrences_user_due (user_id, due_date),
+
+  CONSTRAINT fk_todo_occurrences_series
+    FOREIGN KEY (series_id)
+    REFERENCES todo_series (id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+-- Each user's running Pomodoro session, if any. One row per user, so the
+-- timer's lookup (GET /pomodoro/active) is a primary-key read. Start points
+-- the slot at the new session; complete and cancel free it only if it still
+-- points at theirs.
+CREATE TABLE IF NOT EXISTS active_pomodoro (
+  user_id INT UNSIGNED NOT NULL,
+  session_id INT UNSIGNED NOT NULL,
+  todo_id INT UNSIGNED DEFAULT NULL,
+
+  session_type ENUM('pomodoro', 'short_break', 'long_break') NOT NULL,
+  started_at DATETIME NOT NULL,
+
+  PRIMARY KEY (user_id),
+
+  UNIQUE KEY uk_active_pomodoro_session (session_id),
+
+  CONSTRAINT fk_active_pomodoro_user
+    FOREIGN KEY (user_id)
+    REFERENCES users (id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE,
+
+  CONSTRAINT fk_active_pomodoro_session
+    FOREIGN KEY (session_id)
+    REFERENCES pomodoro_sessions (id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+-- Archive tier. archive_history.py moves completed TODO items and finished
+-- Pomodoro sessions here once they are old enough, so the hot tables above
+-- hold only the working set; reads look here only when asked for history.
+-- Rows keep the ids they had. The item and session archives are partitioned
+-- by year, so a year of history can be dropped or moved wholesale; MySQL
+-- allows no foreign keys on partitioned tables, so nothing references them.
+-- Split pmax (ALTER TABLE ... REORGANIZE PARTITION) before it fills up.
+CREATE TABLE IF NOT EXISTS todo_items_archive (
+  id INT UNSIGNED NOT NULL,
+
+  user_id INT UNSIGNED NOT NULL,
+  category_id INT UNSIGNED NOT NULL,
+
+  title VARCHAR(255) NOT NULL,
+  description TEXT DEFAULT NULL,
+  priority ENUM('low', 'medium', 'high') NOT NULL,
+  status ENUM('pending', 'in_progress', 'completed') NOT NULL,
+  due_date DATETIME DEFAULT NULL,
+  recurrence_rule VARCHAR(64) NOT NULL,
+  recurrence_parent_id INT UNSIGNED DEFAULT NULL,
+  completed_at DATETIME NOT NULL,
+  created_at DATETIME NOT NULL,
+  updated_at DATETIME NOT NULL,
+  archived_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  priority_rank TINYINT UNSIGNED AS (
+    CASE priority WHEN 'high' THEN 1 WHEN 'medium' THEN 2 ELSE 3 END
+  ) STORED NOT NULL,
+
+  PRIMARY KEY (id, completed_at),
+
+  KEY idx_todo_items_archive_user_rank (user_id, priority_rank, due_date, id DESC)
+) ENGINE=InnoDB
+PARTITION BY RANGE (YEAR(completed_at)) (
+  PARTITION p2024 VALUES LESS THAN (2025),
+  PARTITION p2025 VALUES LESS THAN (2026),
+  PARTITION p2026 VALUES LESS THAN (2027),
+  PARTITION p2027 VALUES LESS THAN (2028),
+  PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+-- Tags of archived TODO items
+CREATE TABLE IF NOT EXISTS todo_item_tags_archive (
+  todo_id INT UNSIGNED NOT NULL,
+  tag_id INT UNSIGNED NOT NULL,
+
+  PRIMARY KEY (todo_id, tag_id),
+
+  KEY idx_todo_item_tags_archive_tag (tag_id),
+
+  CONSTRAINT fk_todo_item_tags_archive_tag
+    FOREIGN KEY (tag_id)
+    REFERENCES todo_tags (id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+-- Archived Pomodoro sessions. The TODO title is copied in when a session is
+-- archived, as its item may be archived (or deleted) later.
+CREATE TABLE IF NOT EXISTS pomodoro_sessions_archive (
+  id INT UNSIGNED NOT NULL,
+
+  user_id INT UNSIGNED NOT NULL,
+  todo_id INT UNSIGNED DEFAULT NULL,
+  todo_title VARCHAR(255) DEFAULT NULL,
+
+  session_type ENUM('pomodoro', 'short_break', 'long_break') NOT NULL,
+  duration_seconds INT UNSIGNED NOT NULL,
+  status ENUM('in_progress', 'completed', 'cancelled') NOT NULL,
+  session_date DATETIME NOT NULL,
+  created_at DATETIME NOT NULL,
+  archived_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+  PRIMARY KEY (id, session_date),
+
+  KEY idx_pomodoro_sessions_archive_user (user_id, session_date)
+) ENGINE=InnoDB
+PARTITION BY RANGE (YEAR(session_date)) (
+  PARTITION p2024 VALUES LESS THAN (2025),
+  PARTITION p2025 VALUES LESS THAN (2026),
+  PARTITION p2026 VALUES LESS THAN (2027),
+  PARTITION p2027 VALUES LESS THAN (2028),
+  PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+-- Completed focus sessions each user has had archived, so the all-time
+-- figures in GET /pomodoro/stats need not read the archive.
+CREATE TABLE IF NOT EXISTS pomodoro_archived_totals (
+  user_id INT UNSIGNED NOT NULL,
+  sessions INT UNSIGNED NOT NULL DEFAULT 0,
+  total_seconds BIGINT UNSIGNED NOT NULL DEFAULT 0,
+
+  PRIMARY KEY (user_id),
+
+  CONSTRAINT fk_pomodoro_archived_totals_user
+    FOREIGN KEY (user_id)
+    REFERENCES users (id)
+    ON DELETE CASCADE
+    ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+-- Sessions started before active_pomodoro existed: point each user's slot at
+-- their latest in_progress session. Users who already have a slot keep it.
+INSERT IGNORE INTO active_pomodoro (user_id, session_id, todo_id, session_type, started_at)
+SELECT ps.user_id, ps.id, ps.todo_id, ps.session_type, ps.session_date
+FROM pomodoro_sessions ps
+WHERE ps.status = 'in_progress'
+  AND ps.id = (
+    SELECT MAX(latest.id)
+    FROM pomodoro_sessions latest
+    WHERE latest.user_id = ps.user_id AND latest.status = 'in_progress'
+  );
@@ -7,7 +7,7 @@ import { CategoryChart } from "@/components/entries/CategoryChart";
 import { CategoryPieChart } from "@/components/entries/CategoryPieChart";
 import { WeeklyCalendar } from "@/components/entries/WeeklyCalendar";
 import { EntriesTable } from "@/components/entries/EntriesTable";
-import { getMondayOf, addDays } from "@/components/entries/utils";
+import { getMondayOf, addDays, entryCategoryTotals } from "@/components/entries/utils";
 import { DEMO_DATA } from "./constants";
 
 type FilterMode = "today" | "week" | "all";
@@ -62,6 +62,7 @@ export default function EntriesDemo() {
   }, [data, weekStart, weekEnd, filterMode]);
 
   const visibleEntries = filterMode === "all" ? data.entries : filteredEntries;
+  const visibleTotals = useMemo(() => entryCategoryTotals(visibleEntries), [visibleEntries]);
 
   const totalHours = (
     visibleEntries.reduce((acc, e) => acc + e.duration_seconds, 0) / 3600
@@ -107,7 +108,7 @@ export default function EntriesDemo() {
                   Scope: {"All entries"}
                 </span>
               </div>
-              <CategoryChart entries={visibleEntries} isDark={isDark} />
+              <CategoryChart totals={visibleTotals} isDark={isDark} />
             </div>
           </div>
           <div className="col-span-1">
@@ -118,7 +119,7 @@ export default function EntriesDemo() {
                   Scope: {"All entries"}
                 </span>
               </div>
-              <CategoryPieChart entries={visibleEntries} isDark={isDark} />
+              <CategoryPieChart totals={visibleTotals} isDark={isDark} />
             </div>
           </div>
         </div>
@@ -134,7 +135,7 @@ export default function EntriesDemo() {
                     Scope: {filterMode === "today" ? "Today" : "Selected week"}
                   </span>
                 </div>
-                <CategoryChart entries={visibleEntries} isDark={isDark} />
+                <CategoryChart totals={visibleTotals} isDark={isDark} />
               </div>
             </div>
 
@@ -149,7 +150,7 @@ export default function EntriesDemo() {
                     Scope: {filterMode === "today" ? "Today" : "Selected week"}
                   </span>
                 </div>
-                <CategoryPieChart entries={visibleEntries} isDark={isDark} />
+                <CategoryPieChart totals={visibleTotals} isDark={isDark} />
               </div>
             </div>
           </div>
@@ -1,7 +1,11 @@
 import { fetchWithTokenRefresh } from "@/lib/flask-client";
 import { FLASK_BASE_URL } from "@/lib/constants";
 
-export async function GET() {
-  const { response } = await fetchWithTokenRefresh(`${FLASK_BASE_URL}/entry`);
+export async function GET(req: Request) {
+  // Forward from/to/cursor/limit/all untouched; Flask validates them.
+  const { search } = new URL(req.url);
+  const { response } = await fetchWithTokenRefresh(`${FLASK_BASE_URL}/entry${search}`, {
+    headers: { Accept: req.headers.get("Accept") ?? "application/json" },
+  });
   return response;
 }
@@ -0,0 +1,9 @@
+import { fetchWithTokenRefresh } from "@/lib/flask-client";
+import { FLASK_BASE_URL } from "@/lib/constants";
+
+export async function GET(req: Request) {
+  // Forward granularity/from/to untouched; Flask validates them.
+  const { search } = new URL(req.url);
+  const { response } = await fetchWithTokenRefresh(`${FLASK_BASE_URL}/entry/summary${search}`);
+  return response;
+}
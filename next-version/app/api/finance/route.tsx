@@ -1,7 +1,10 @@
 import { fetchWithTokenRefresh } from "@/lib/flask-client";
 import { FLASK_BASE_URL } from "@/lib/constants";
 
-export async function GET() {
-  const { response } = await fetchWithTokenRefresh(`${FLASK_BASE_URL}/finance`);
+export async function GET(req: Request) {
+  // Passing Accept through lets a client opt into the NDJSON stream
+  const { response } = await fetchWithTokenRefresh(`${FLASK_BASE_URL}/finance`, {
+    headers: { Accept: req.headers.get("Accept") ?? "application/json" },
+  });
   return response;
 }
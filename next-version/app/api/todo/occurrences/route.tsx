@@ -0,0 +1,9 @@
+import { fetchWithTokenRefresh } from "@/lib/flask-client";
+import { FLASK_BASE_URL } from "@/lib/constants";
+
+export async function GET(req: Request) {
+  // from/to are forwarded untouched.
+  const { search } = new URL(req.url);
+  const { response } = await fetchWithTokenRefresh(`${FLASK_BASE_URL}/todo/occurrences${search}`);
+  return response;
+}
@@ -1,7 +1,12 @@
 import { fetchWithTokenRefresh } from "@/lib/flask-client";
 import { FLASK_BASE_URL } from "@/lib/constants";
 
-export async function GET() {
-  const { response } = await fetchWithTokenRefresh(`${FLASK_BASE_URL}/todo`);
+export async function GET(req: Request) {
+  // Passing Accept through lets a client opt into the NDJSON stream; filters
+  // and cursor/limit are forwarded untouched and validated by Flask.
+  const { search } = new URL(req.url);
+  const { response } = await fetchWithTokenRefresh(`${FLASK_BASE_URL}/todo${search}`, {
+    headers: { Accept: req.headers.get("Accept") ?? "application/json" },
+  });
   return response;
 }
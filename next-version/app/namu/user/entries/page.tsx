@@ -8,43 +8,103 @@ import { WeeklyCalendar } from "@/components/entries/WeeklyCalendar";
 import { EntriesTable } from "@/components/entries/EntriesTable";
 import { QuickStats } from "@/components/entries/QuickStats";
 import { SummaryCard } from "@/components/finance/SummaryCard";
-import { getMondayOf, addDays, formatDuration } from "@/components/entries/utils";
-import type { ApiResponse } from "@/components/entries/types";
+import {
+  getMondayOf,
+  addDays,
+  stripTime,
+  formatDuration,
+  summaryCategoryTotals,
+  toDayString,
+} from "@/components/entries/utils";
+import type { ApiResponse, CategoryTotal, SummaryResponse } from "@/components/entries/types";
 
 type FilterMode = "today" | "week" | "all";
 
 export default function Entries() {
   const [data, setData] = useState<ApiResponse | null>(null);
+  const [categoryTotals, setCategoryTotals] = useState<CategoryTotal[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [isDark, setIsDark] = useState(false);
   const [weekStart, setWeekStart] = useState(() => getMondayOf(new Date()));
   const [filterMode, setFilterMode] = useState<FilterMode>("week");
 
-  async function get_entries() {
+  // Only the span on screen is pulled: the selected week (or today), paged
+  // through via next_cursor. "All" is the one view that needs everything.
+  async function get_entries(mode: FilterMode, monday: Date) {
+    let base = "/api/entry?all=true";
+    if (mode !== "all") {
+      const from = mode === "today" ? stripTime(new Date()) : monday;
+      const to = addDays(from, mode === "today" ? 1 : 7);
+      base =
+        `/api/entry?from=${encodeURIComponent(from.toISOString())}` +
+        `&to=${encodeURIComponent(to.toISOString())}`;
+    }
+
     try {
-      const res = await fetch("/api/entry", {
+      let json: ApiResponse | null = null;
+      let cursor: string | null = null;
+      do {
+        const url: string = cursor
+          ? `${base}&cursor=${encodeURIComponent(cursor)}`
+          : base;
+        const res = await fetch(url, {
+          method: "GET",
+          credentials: "include",
+        });
+
+        if (!res.ok) {
+          const err = await res.json();
+          throw new Error(err.message || "Failed to fetch entries");
+        }
+
+        const page: ApiResponse = await res.json();
+        json = json
+          ? { ...page, entries: [...json.entries, ...page.entries] }
+          : page;
+        cursor = page.next_cursor ?? null;
+      } while (cursor);
+
+      setData(json);
+    } catch (err: unknown) {
+      setError(err instanceof Error ? err.message : "Unknown error");
+    } finally {
+      setLoading(false);
+    }
+  }
+
+  // The category charts read the daily rollup instead of adding up entries,
+  // bucketed by the same local days as the week navigator. "All" asks for
+  // months so the response stays small however long the history is.
+  async function get_category_totals(mode: FilterMode, monday: Date) {
+    const today = stripTime(new Date());
+    const params =
+      mode === "all"
+        ? `granularity=month&from=1970-01-01&to=${toDayString(today)}`
+        : mode === "today"
+          ? `granularity=day&from=${toDayString(today)}&to=${toDayString(today)}`
+          : `granularity=week&from=${toDayString(monday)}&to=${toDayString(addDays(monday, 6))}`;
+
+    try {
+      const res = await fetch(`/api/entry/summary?${params}`, {
         method: "GET",
         credentials: "include",
       });
-
       if (!res.ok) {
         const err = await res.json();
-        throw new Error(err.message || "Failed to fetch entries");
+        throw new Error(err.error || "Failed to fetch category totals");
       }
-
-      const json = await res.json();
-      setData(json);
+      const summary: SummaryResponse = await res.json();
+      setCategoryTotals(summaryCategoryTotals(summary));
     } catch (err: unknown) {
       setError(err instanceof Error ? err.message : "Unknown error");
-    } finally {
-      setLoading(false);
     }
   }
 
   useEffect(() => {
-    get_entries();
-  }, []);
+    get_entries(filterMode, weekStart);
+    get_category_totals(filterMode, weekStart);
+  }, [filterMode, weekStart]);
 
   useEffect(() => {
     const media = window.matchMedia("(prefers-color-scheme: dark)");
@@ -209,7 +269,7 @@ export default function Entries() {
                 Scope: All entries
               </span>
             </div>
-            <CategoryChart entries={visibleEntries} isDark={isDark} />
+            <CategoryChart totals={categoryTotals} isDark={isDark} />
           </div>
           <div className="bg-surface p-4 md:p-6 rounded-xl shadow-sm border border-subtle">
             <div className="flex items-center justify-between mb-4">
@@ -218,7 +278,7 @@ export default function Entries() {
                 Scope: All entries
               </span>
             </div>
-            <CategoryPieChart entries={visibleEntries} isDark={isDark} />
+            <CategoryPieChart totals={categoryTotals} isDark={isDark} />
           </div>
         </div>
       ) : filterMode === "today" ? (
@@ -230,7 +290,7 @@ export default function Entries() {
                   <h2 className="text-lg font-semibold text-primary">Hours per Category</h2>
                   <span className="text-xs text-muted">Scope: Today</span>
                 </div>
-                <CategoryChart entries={visibleEntries} isDark={isDark} />
+                <CategoryChart totals={categoryTotals} isDark={isDark} />
               </div>
             </div>
             <div className="row-span-1">
@@ -241,7 +301,7 @@ export default function Entries() {
                   </h2>
                   <span className="text-xs text-muted">Scope: Today</span>
                 </div>
-                <CategoryPieChart entries={visibleEntries} isDark={isDark} />
+                <CategoryPieChart totals={categoryTotals} isDark={isDark} />
               </div>
             </div>
           </div>
@@ -264,7 +324,7 @@ export default function Entries() {
                     Scope: Selected week
                   </span>
                 </div>
-                <CategoryChart entries={visibleEntries} isDark={isDark} />
+                <CategoryChart totals={categoryTotals} isDark={isDark} />
               </div>
             </div>
 
@@ -278,7 +338,7 @@ export default function Entries() {
                     Scope: Selected week
                   </span>
                 </div>
-                <CategoryPieChart entries={visibleEntries} isDark={isDark} />
+                <CategoryPieChart totals={categoryTotals} isDark={isDark} />
               </div>
             </div>
           </div>
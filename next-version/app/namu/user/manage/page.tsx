@@ -646,7 +646,7 @@ export default function ManagePage() {
     setError(null);
     try {
       const [entriesRes, catsRes] = await Promise.all([
-        fetch("/api/entry", { credentials: "include" }),
+        fetch("/api/entry?all=true", { credentials: "include" }),
         fetch("/api/categories"),
       ]);
       if (!entriesRes.ok) throw new Error("Failed to fetch entries");
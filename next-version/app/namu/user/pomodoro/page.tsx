@@ -26,12 +26,12 @@ function PomodoroPageContent() {
   useEffect(() => {
     async function fetchTodos() {
       try {
-        const res = await fetch("/api/todo", { credentials: "include" });
+        const res = await fetch("/api/todo?status=pending&status=in_progress", {
+          credentials: "include",
+        });
         if (!res.ok) throw new Error("Failed to load To Do items");
         const data = await res.json();
-        const items = (data.items as TodoItem[]).filter(
-          (item) => item.status !== "completed"
-        );
+        const items = data.items as TodoItem[];
         setTodos(items);
 
         if (deepLinkTodoId) {
@@ -125,7 +125,14 @@ export default function TimerPage() {
 
   const fetchEntries = useCallback(async () => {
     try {
-      const res = await fetch("/api/entry", { credentials: "include" });
+      // Nothing here looks further back than the recent-category window
+      const from = new Date(
+        Date.now() - RECENT_WINDOW_DAYS * 24 * 60 * 60 * 1000
+      ).toISOString();
+      const res = await fetch(
+        `/api/entry?all=true&from=${encodeURIComponent(from)}`,
+        { credentials: "include" }
+      );
       if (!res.ok) throw new Error("Failed to fetch entries");
       const json = await res.json();
       setEntries(json.entries ?? []);
@@ -1,6 +1,6 @@
 "use client";
 
-import { useEffect, useState, useMemo } from "react";
+import { useEffect, useRef, useState, useMemo } from "react";
 import type {
   TodoItem,
   Category,
@@ -15,6 +15,10 @@ import { SummaryCards } from "@/components/todo/SummaryCards";
 import { ConfirmDialog } from "@/components/ConfirmDialog";
 
 const FILTERS_STORAGE_KEY = "todoFilters";
+// Items are fetched a page at a time, filtered by the server.
+const TODO_PAGE_SIZE = 100;
+// Typing in the search box refetches once the user pauses.
+const FILTER_FETCH_DELAY_MS = 300;
 
 type PersistedFilters = {
   statusFilter: StatusFilter;
@@ -34,6 +38,19 @@ const DEFAULT_FILTERS: PersistedFilters = {
   sortOption: "priority",
 };
 
+// GET /todo parameters for the filters on screen. The list still filters
+// what it holds, so optimistic edits that stop matching drop out at once.
+function todoQuery(filters: PersistedFilters, cursor: string | null): string {
+  const params = new URLSearchParams({ limit: String(TODO_PAGE_SIZE) });
+  if (filters.statusFilter !== "all") params.append("status", filters.statusFilter);
+  if (filters.priorityFilter !== "all") params.append("priority", filters.priorityFilter);
+  if (filters.categoryFilter) params.set("category", filters.categoryFilter);
+  for (const tag of filters.tagFilter) params.append("tag", tag);
+  if (filters.searchQuery.trim()) params.set("q", filters.searchQuery.trim());
+  if (cursor) params.set("cursor", cursor);
+  return params.toString();
+}
+
 type SubmitData = {
   title: string;
   category: string;
@@ -46,6 +63,9 @@ type SubmitData = {
 
 export default function TodoPage() {
   const [items, setItems] = useState<TodoItem[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const latestFetch = useRef(0);
   const [categories, setCategories] = useState<Category[]>([]);
   const [allTags, setAllTags] = useState<Tag[]>([]);
   const [loading, setLoading] = useState(true);
@@ -60,19 +80,31 @@ export default function TodoPage() {
   const [selectMode, setSelectMode] = useState(false);
   const [selectedIds, setSelectedIds] = useState<Set<number>>(new Set());
 
-  async function fetchTodoItems() {
+  // Fetch the first page for the current filters, or with a cursor the
+  // page after it. Responses to superseded fetches are dropped.
+  async function fetchTodoItems(cursor: string | null = null) {
+    const fetchId = ++latestFetch.current;
+    if (cursor) setLoadingMore(true);
     try {
-      const res = await fetch("/api/todo", { credentials: "include" });
+      const res = await fetch(`/api/todo?${todoQuery(filters, cursor)}`, {
+        credentials: "include",
+      });
       if (!res.ok) {
         const err = await res.json();
-        throw new Error(err.message || "Failed to fetch To Do items");
+        throw new Error(err.error || "Failed to fetch To Do items");
       }
       const data = await res.json();
-      setItems(data.items ?? []);
+      if (fetchId !== latestFetch.current) return;
+      const page: TodoItem[] = data.items ?? [];
+      setItems((prev) => (cursor ? [...prev, ...page] : page));
+      setNextCursor(data.next_cursor ?? null);
     } catch (err: any) {
-      setError(err.message || "Unknown error");
+      if (fetchId === latestFetch.current) setError(err.message || "Unknown error");
     } finally {
-      setLoading(false);
+      if (fetchId === latestFetch.current) {
+        setLoading(false);
+        setLoadingMore(false);
+      }
     }
   }
 
@@ -99,7 +131,6 @@ export default function TodoPage() {
   }
 
   useEffect(() => {
-    fetchTodoItems();
     fetchCategories();
     fetchTags();
 
@@ -111,6 +142,11 @@ export default function TodoPage() {
     }
   }, []);
 
+  useEffect(() => {
+    const timer = setTimeout(() => fetchTodoItems(), FILTER_FETCH_DELAY_MS);
+    return () => clearTimeout(timer);
+  }, [filters]);
+
   // Press "n" to open a fresh Create form, unless typing in a field or the
   // form is already open.
   useEffect(() => {
@@ -474,6 +510,18 @@ export default function TodoPage() {
         onBulkStatusChange={handleBulkStatusChange}
         onBulkDelete={handleBulkDelete}
       />
+
+      {nextCursor && (
+        <div className="flex justify-center">
+          <button
+            onClick={() => fetchTodoItems(nextCursor)}
+            disabled={loadingMore}
+            className="px-4 py-2 text-sm font-medium rounded-lg border border-subtle bg-surface hover:bg-surface-hover transition disabled:opacity-50 text-primary"
+          >
+            {loadingMore ? "Loading..." : "Load more"}
+          </button>
+        </div>
+      )}
     </main>
   );
 }
@@ -1,7 +1,7 @@
 "use client";
 
 import { useEffect, useMemo, useRef, useState } from "react";
-import { normalizeCategoryName } from "@/lib/categoryName";
+import { categoryKey, normalizeCategoryName } from "@/lib/categoryName";
 
 type ItauPdfImportModalProps = {
   isOpen: boolean;
@@ -29,6 +29,14 @@ type StatementInfo = {
   cards: string[];
   total: number;
   reconciled: boolean;
+  /** Cards whose lines do not add up to the subtotal printed for them. */
+  unreconciled_cards: Array<{
+    card: string;
+    computed: number;
+    declared: number | null;
+    delta: number;
+    pages: number[];
+  }>;
   entry_count: number;
   skipped_count: number;
 };
@@ -68,11 +76,11 @@ function adoptExistingSpellings<T extends { category: string }>(
 ): T[] {
   if (known.length === 0) return rows;
 
-  const canonical = new Map(known.map((name) => [name.toLowerCase(), name]));
+  const canonical = new Map(known.map((name) => [categoryKey(name), name]));
   let changed = false;
 
   const next = rows.map((row) => {
-    const match = canonical.get(row.category.toLowerCase());
+    const match = canonical.get(categoryKey(row.category));
     if (match && match !== row.category) {
       changed = true;
       return { ...row, category: match };
@@ -117,11 +125,11 @@ export function ItauPdfImportModal({
   const categoryOptions = useMemo(() => {
     const bySlug = new Map<string, string>();
     for (const name of knownCategories) {
-      bySlug.set(name.toLowerCase(), name);
+      bySlug.set(categoryKey(name), name);
     }
     const isNew = new Set<string>();
     for (const entry of entries) {
-      const slug = entry.category.toLowerCase();
+      const slug = categoryKey(entry.category);
       if (!bySlug.has(slug)) {
         bySlug.set(slug, entry.category);
         isNew.add(slug);
@@ -482,6 +490,23 @@ export function ItauPdfImportModal({
                     .join(", ")})`}{" "}
               do not add up to the totals printed on them. Some lines may be
               missing or wrong — review the preview carefully before importing.
+              {unreconciled.some((s) => s.unreconciled_cards.length > 0) && (
+                <ul className="mt-2 list-disc list-inside">
+                  {unreconciled.flatMap((s) =>
+                    s.unreconciled_cards.map((c) => (
+                      <li key={`${s.file}-${c.card}`}>
+                        {s.issued_on}, card {c.card || "(unknown)"}: read{" "}
+                        {c.computed.toFixed(2)}
+                        {c.declared === null
+                          ? ", no printed subtotal"
+                          : ` vs ${c.declared.toFixed(2)} printed`}{" "}
+                        (page{c.pages.length === 1 ? "" : "s"}{" "}
+                        {c.pages.join(", ")})
+                      </li>
+                    ))
+                  )}
+                </ul>
+              )}
             </div>
           )}
 
@@ -9,24 +9,18 @@ import {
   ResponsiveContainer,
   CartesianGrid,
 } from "recharts";
-import { Entry } from "@/components/entries/types";
+import { CategoryTotal } from "@/components/entries/types";
 import { LIGHT_PALETTE, DARK_PALETTE } from "@/components/entries/colors";
 
 type CategoryChartProps = {
-  entries: Entry[];
+  totals: CategoryTotal[];
   isDark: boolean;
 };
 
-export function CategoryChart({ entries, isDark }: CategoryChartProps) {
+export function CategoryChart({ totals, isDark }: CategoryChartProps) {
   const palette = isDark ? DARK_PALETTE : LIGHT_PALETTE;
 
-  const grouped: Record<string, number> = {};
-  entries.forEach((entry) => {
-    grouped[entry.category] =
-      (grouped[entry.category] || 0) + entry.duration_seconds;
-  });
-
-  const data = Object.entries(grouped).map(([category, seconds], index) => ({
+  const data = totals.map(({ category, seconds }, index) => ({
     category,
     hours: +(seconds / 3600).toFixed(2),
     fill: palette[index % palette.length],
@@ -10,32 +10,25 @@ import {
   TooltipProps,
   PieLabelRenderProps,
 } from "recharts";
-import { Entry } from "@/components/entries/types";
+import { CategoryTotal } from "@/components/entries/types";
 import { LIGHT_PALETTE, DARK_PALETTE } from "@/components/entries/colors";
 import { ReactNode } from "react";
 
 type CategoryPieChartProps = {
-  entries: Entry[];
+  totals: CategoryTotal[];
   isDark: boolean;
   height?: number; // optional, default 300
 };
 
 export function CategoryPieChart({
-  entries,
+  totals,
   isDark,
   height = 300,
 }: CategoryPieChartProps) {
   const palette = isDark ? DARK_PALETTE : LIGHT_PALETTE;
 
-  // Aggregate duration (seconds) per category
-  const grouped: Record<string, number> = {};
-  for (const entry of entries) {
-    grouped[entry.category] =
-      (grouped[entry.category] || 0) + entry.duration_seconds;
-  }
-
   // Prepare chart data: hours + color per slice
-  const data = Object.entries(grouped).map(([category, seconds], index) => ({
+  const data = totals.map(({ category, seconds }, index) => ({
     category,
     hours: +(seconds / 3600).toFixed(2),
     fill: palette[index % palette.length],
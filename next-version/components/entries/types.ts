@@ -9,4 +9,21 @@ export type Entry = {
 export type ApiResponse = {
   username: string;
   entries: Entry[];
+  next_cursor?: string | null;
+};
+
+export type CategoryTotal = {
+  category: string;
+  seconds: number;
+};
+
+export type SummaryResponse = {
+  granularity: "day" | "week" | "month";
+  from: string;
+  to: string;
+  periods: {
+    period: string;
+    total_seconds: number;
+    categories: CategoryTotal[];
+  }[];
 };
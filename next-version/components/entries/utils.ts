@@ -1,3 +1,5 @@
+import type { CategoryTotal, Entry, SummaryResponse } from "@/components/entries/types";
+
 export function addDays(date: Date, days: number): Date {
   const d = new Date(date);
   d.setDate(d.getDate() + days);
@@ -23,3 +25,31 @@ export function getMondayOf(date: Date): Date {
   monday.setHours(0, 0, 0, 0);
   return monday;
 }
+
+// Local calendar day as YYYY-MM-DD, the form /entry/summary takes its range in.
+export function toDayString(date: Date): string {
+  const y = date.getFullYear();
+  const m = String(date.getMonth() + 1).padStart(2, "0");
+  const d = String(date.getDate()).padStart(2, "0");
+  return `${y}-${m}-${d}`;
+}
+
+// Seconds per category over every period of a /entry/summary response.
+export function summaryCategoryTotals(summary: SummaryResponse): CategoryTotal[] {
+  const grouped: Record<string, number> = {};
+  for (const period of summary.periods) {
+    for (const { category, seconds } of period.categories) {
+      grouped[category] = (grouped[category] || 0) + seconds;
+    }
+  }
+  return Object.entries(grouped).map(([category, seconds]) => ({ category, seconds }));
+}
+
+// The same totals worked out from entries already in hand (the demo page).
+export function entryCategoryTotals(entries: Entry[]): CategoryTotal[] {
+  const grouped: Record<string, number> = {};
+  for (const entry of entries) {
+    grouped[entry.category] = (grouped[entry.category] || 0) + entry.duration_seconds;
+  }
+  return Object.entries(grouped).map(([category, seconds]) => ({ category, seconds }));
+}
@@ -6,6 +6,7 @@ import {
   type TimerMode,
   type TimerRunState,
   STATE_STORAGE_KEY,
+  ACTIVE_POLL_MS,
   getDurationSeconds,
   modeToSessionType,
   modeLabel,
@@ -92,8 +93,8 @@ export function PomodoroTimer({
       });
       navigator.sendBeacon("/api/pomodoro/cancel", payload);
     } catch {
-      // Best-effort only — the backend self-heals dangling sessions the
-      // next time this user starts a new one.
+      // Best-effort only — the backend's reaper cancels sessions left
+      // dangling.
     }
   }, []);
 
@@ -264,9 +265,39 @@ export function PomodoroTimer({
     return () => clearInterval(interval);
   }, [runState, finishSession]);
 
+  // ── Active-session poll: while a session runs, check now and then that
+  // the backend still has it as this user's active one. If it was
+  // completed, cancelled or replaced elsewhere (another tab or device, or
+  // the reaper), this timer stands down instead of reporting it again.
+  useEffect(() => {
+    if (runState === "idle") return;
+
+    const interval = setInterval(async () => {
+      const sessionId = sessionIdRef.current;
+      if (!sessionId) return;
+      try {
+        const res = await fetch("/api/pomodoro/active", { credentials: "include" });
+        if (!res.ok) return;
+        const data = await res.json();
+        if (sessionIdRef.current !== sessionId || data.active?.session_id === sessionId) return;
+      } catch {
+        return;
+      }
+      sessionIdRef.current = null;
+      endTimestampRef.current = null;
+      remainingSecondsRef.current = null;
+      runStateRef.current = "idle";
+      setRunState("idle");
+      setDisplaySeconds(getDurationSeconds(modeRef.current, settingsRef.current));
+      persistCurrent();
+    }, ACTIVE_POLL_MS);
+
+    return () => clearInterval(interval);
+  }, [runState, persistCurrent]);
+
   // ── Cleanup on navigation away: best-effort cancel of the in-progress
-  // backend session; the backend's self-heal-on-next-start is the
-  // authoritative fallback if this never fires (crash, force-quit).
+  // backend session; the backend's reaper is the authoritative fallback
+  // if this never fires (crash, force-quit).
   useEffect(() => {
     function handlePageHide() {
       if (runStateRef.current !== "idle" && sessionIdRef.current) {
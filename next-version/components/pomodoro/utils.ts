@@ -12,6 +12,9 @@ export const DEFAULT_SETTINGS: PomodoroSettings = {
 
 export const SETTINGS_STORAGE_KEY = "pomodoroSettings";
 export const STATE_STORAGE_KEY = "pomodoroState";
+// How often a running timer checks that its session is still the user's
+// active one (GET /api/pomodoro/active).
+export const ACTIVE_POLL_MS = 30_000;
 
 export function getDurationSeconds(
   mode: TimerMode,
@@ -1,6 +1,7 @@
 "use client";
 
 import { useEffect, useRef, useState } from "react";
+import { recurrenceLabel } from "@/lib/recurrence";
 import type { TodoItem, Category, RecurrenceRule } from "@/lib/types";
 import { CategorySelector } from "./CategorySelector";
 import { TagInput } from "./TagInput";
@@ -11,6 +12,17 @@ const LAST_PRIORITY_KEY = "todoLastPriority";
 
 type Priority = "low" | "medium" | "high";
 
+// The rules the Repeat select offers. An item given another rule through the
+// API keeps it: the select shows it as an extra option.
+const RECURRENCE_OPTIONS: { value: RecurrenceRule; label: string }[] = [
+  { value: "none", label: "Does not repeat" },
+  { value: "daily", label: "Daily" },
+  { value: "weekly", label: "Weekly" },
+  { value: "FREQ=WEEKLY;INTERVAL=2", label: "Every 2 weeks" },
+  { value: "monthly", label: "Monthly" },
+  { value: "yearly", label: "Yearly" },
+];
+
 // Defaults for a *new* item: last-used category (only if it still exists) and
 // priority, falling back to blank / "medium". Guarded so storage being
 // unavailable never breaks the form.
@@ -307,10 +319,14 @@ export function TodoForm({
               disabled={!dueDate}
               className="w-full px-3 py-2 rounded-lg border border-strong bg-surface-raised text-sm focus:outline-none focus:ring-2 focus:ring-neutral-400 disabled:opacity-50"
             >
-              <option value="none">Does not repeat</option>
-              <option value="daily">Daily</option>
-              <option value="weekly">Weekly</option>
-              <option value="monthly">Monthly</option>
+              {RECURRENCE_OPTIONS.map((option) => (
+                <option key={option.value} value={option.value}>
+                  {option.label}
+                </option>
+              ))}
+              {!RECURRENCE_OPTIONS.some((option) => option.value === recurrenceRule) && (
+                <option value={recurrenceRule}>{recurrenceLabel(recurrenceRule)}</option>
+              )}
             </select>
             {!dueDate && (
               <p className="text-xs text-dim">
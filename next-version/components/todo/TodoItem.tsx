@@ -1,5 +1,6 @@
 "use client";
 
+import { recurrenceLabel } from "@/lib/recurrence";
 import type { TodoItem } from "@/lib/types";
 import { PriorityBadge } from "./PriorityBadge";
 import { StatusBadge } from "./StatusBadge";
@@ -15,12 +16,6 @@ type TodoItemProps = {
   onToggleSelect?: (item: TodoItem) => void;
 };
 
-const RECURRENCE_LABELS: Record<string, string> = {
-  daily: "Repeats daily",
-  weekly: "Repeats weekly",
-  monthly: "Repeats monthly",
-};
-
 export function TodoItemComponent({
   item,
   onToggleComplete,
@@ -97,10 +92,10 @@ export function TodoItemComponent({
             <StatusBadge status={item.status} />
             {item.recurrence_rule !== "none" && (
               <span
-                title={RECURRENCE_LABELS[item.recurrence_rule]}
+                title={recurrenceLabel(item.recurrence_rule)}
                 className="inline-flex items-center gap-1 px-2 py-0.5 rounded-full text-xs bg-purple-50 dark:bg-purple-900/20 text-tint-purple-ink dark:text-purple-400 border border-purple-200 dark:border-purple-800"
               >
-                ↻ {RECURRENCE_LABELS[item.recurrence_rule]}
+                ↻ {recurrenceLabel(item.recurrence_rule)}
               </span>
             )}
           </div>
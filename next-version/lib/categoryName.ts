@@ -30,3 +30,18 @@ export function normalizeCategoryName(name: string): string {
     })
     .join(" ");
 }
+
+/**
+ * The key two category names share when the database treats them as the
+ * same name: its collation ignores case, accents and trailing spaces, so
+ * "Saúde", "SAUDE" and "saude" are one category.
+ *
+ * Mirrors collation_key() in flask-server/db.py.
+ */
+export function categoryKey(name: string): string {
+  return name
+    .toLocaleLowerCase()
+    .replace(/ +$/, "")
+    .normalize("NFKD")
+    .replace(/[\u0300-\u036f]/g, "");
+}
@@ -28,13 +28,23 @@ export async function fetchWithTokenRefresh(
     },
   });
 
-  // Create response
+  // Create response. NDJSON is piped through as it arrives rather than
+  // buffered and re-serialized, so a streamed list reaches the browser
+  // line by line.
   let response: NextResponse;
-  try {
-    const data = await flaskRes.json();
-    response = NextResponse.json(data, { status: flaskRes.status });
-  } catch {
-    response = NextResponse.json({}, { status: flaskRes.status });
+  const contentType = flaskRes.headers.get("Content-Type") ?? "";
+  if (contentType.startsWith("application/x-ndjson")) {
+    response = new NextResponse(flaskRes.body, {
+      status: flaskRes.status,
+      headers: { "Content-Type": contentType },
+    });
+  } else {
+    try {
+      const data = await flaskRes.json();
+      response = NextResponse.json(data, { status: flaskRes.status });
+    } catch {
+      response = NextResponse.json({}, { status: flaskRes.status });
+    }
   }
 
   // Check if Flask sent a refreshed token in Set-Cookie header
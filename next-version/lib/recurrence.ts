@@ -0,0 +1,21 @@
+import type { RecurrenceRule } from "./types";
+
+const UNITS: Record<string, string> = {
+  DAILY: "day",
+  WEEKLY: "week",
+  MONTHLY: "month",
+  YEARLY: "year",
+};
+
+/**
+ * The badge text for a rule as the API stores it: "Repeats weekly" for a
+ * shorthand, "Repeats every 2 weeks" for "FREQ=WEEKLY;INTERVAL=2".
+ *
+ * Mirrors normalize_rule() in flask-server/recurrence.py.
+ */
+export function recurrenceLabel(rule: RecurrenceRule): string {
+  const match = /^FREQ=([A-Z]+);INTERVAL=(\d+)$/.exec(rule);
+  if (!match) return `Repeats ${rule}`;
+  const unit = UNITS[match[1]] ?? match[1].toLowerCase();
+  return `Repeats every ${match[2]} ${unit}s`;
+}
@@ -37,7 +37,15 @@ export interface Tag {
   name: string;
 }
 
-export type RecurrenceRule = "none" | "daily" | "weekly" | "monthly";
+// "none", a shorthand, or any other rule as the API normalizes it (see
+// lib/recurrence.ts).
+export type RecurrenceRule =
+  | "none"
+  | "daily"
+  | "weekly"
+  | "monthly"
+  | "yearly"
+  | `FREQ=${string};INTERVAL=${number}`;
 
 export interface TodoItem {
   id: number;
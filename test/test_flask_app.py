@@ -14,7 +14,12 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'flask-server')
 # Disable rate limiting for tests
 os.environ["RATELIMIT_ENABLED"] = "false"
 
-from app import app, get_pool, retrieve_entry_from_username
+from app import (
+    app,
+    _pomodoro_stats_cache,
+    _statement_cache,
+    _user_id_cache,
+)
 
 
 @pytest.fixture
@@ -27,6 +32,18 @@ def app_context():
     return app
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Keep per-process caches (username -> id, Pomodoro stats, parsed
+    statements) from leaking between tests."""
+    caches = (_user_id_cache, _pomodoro_stats_cache, _statement_cache)
+    for cache in caches:
+        cache.clear()
+    yield
+    for cache in caches:
+        cache.clear()
+
+
 @pytest.fixture
 def client(app_context):
     """Create a test client for the Flask application."""
@@ -199,6 +216,11 @@ class TestLoginUser:
             data = response.get_json()
             assert "access_token" in data
             assert data["authenticated"] is True
+            from flask_jwt_extended import decode_token
+            with app.app_context():
+                claims = decode_token(data["access_token"])
+            assert claims["sub"] == "testuser"
+            assert claims["uid"] == 1
 
 
 class TestCategories:
@@ -334,257 +356,1557 @@ class TestTimeEntryCreation:
         assert response.status_code == 201
 
 
-class TestTokenRefresh:
-    """Tests for JWT token refresh mechanism."""
+class TestMyEntries:
+    """Tests for the paginated, date-windowed time entry listing."""
 
-    def test_token_refresh_expiring_token(self, client, sample_jwt_token):
-        """Should refresh expiring tokens."""
+    def test_entries_invalid_from(self, client, sample_jwt_token):
+        """Should reject a window bound that is not ISO 8601."""
         headers = {"Authorization": f"Bearer {sample_jwt_token}"}
-        response = client.get("/protected", headers=headers)
-        # Should either return 200 or set new cookie
-        assert response.status_code in [200, 401]
-
-
-def _mock_cursor(mock_cursor_context):
-    """Helper to wire up a MagicMock cursor context manager and return it."""
-    mock_cursor = MagicMock()
-    mock_cursor.__enter__ = MagicMock(return_value=mock_cursor)
-    mock_cursor.__exit__ = MagicMock(return_value=False)
-    mock_cursor_context.return_value = mock_cursor
-    return mock_cursor
+        response = client.get("/entry?from=yesterday", headers=headers)
+        assert response.status_code == 400
 
+    def test_entries_window_without_timezone(self, client, sample_jwt_token):
+        """Should reject a window bound with no UTC offset."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.get("/entry?from=2024-01-01T00:00:00", headers=headers)
+        assert response.status_code == 400
 
-def _todo_item_row(**overrides):
-    """A DB row shape matching the todo_items lookup joined for update/bulk-update."""
-    row = {
-        "id": 1,
-        "user_id": 1,
-        "category_id": 1,
-        "title": "Task",
-        "description": "",
-        "priority": "medium",
-        "status": "completed",
-        "due_date": None,
-        "recurrence_rule": "none",
-    }
-    row.update(overrides)
-    return row
+    def test_entries_to_before_from(self, client, sample_jwt_token):
+        """Should reject an empty or inverted window."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.get(
+            "/entry?from=2024-01-08T00:00:00Z&to=2024-01-01T00:00:00Z",
+            headers=headers,
+        )
+        assert response.status_code == 400
 
+    def test_entries_invalid_cursor(self, client, sample_jwt_token):
+        """Should reject a cursor it did not hand out."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.get("/entry?cursor=not-a-cursor", headers=headers)
+        assert response.status_code == 400
 
-class TestListTodoCategories:
-    """Tests for the TODO categories listing endpoint."""
+    def test_entries_limit_out_of_range(self, client, sample_jwt_token):
+        """Should reject a page size above the maximum."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.get("/entry?limit=100000", headers=headers)
+        assert response.status_code == 400
 
     @patch('app.get_cursor')
-    def test_list_todo_categories_success(self, mock_cursor_context, client):
-        """Should return list of TODO categories."""
+    def test_entries_page_has_next_cursor(self, mock_cursor_context, client, sample_jwt_token):
+        """A full page should hand back a cursor that resumes after its last row."""
+        from app import _decode_entry_cursor
+
         mock_cursor = _mock_cursor(mock_cursor_context)
+        start = datetime(2024, 1, 1, 10, 0, 0)
+        mock_cursor.fetchone.return_value = {"id": 1}
         mock_cursor.fetchall.return_value = [
-            {"id": 1, "name": "Work"},
-            {"id": 2, "name": "Personal"},
+            {
+                "id": i,
+                "category": "Work",
+                "start_time": start + timedelta(hours=i),
+                "end_time": start + timedelta(hours=i, minutes=30),
+                "duration_seconds": 1800,
+            }
+            for i in range(1, 4)
         ]
 
-        response = client.get("/todo/categories")
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.get("/entry?limit=2", headers=headers)
         assert response.status_code == 200
         data = response.get_json()
-        assert len(data["categories"]) == 2
-
-
-class TestCreateTodoCategory:
-    """Tests for the TODO category creation endpoint."""
-
-    def test_create_todo_category_missing_name(self, client, sample_jwt_token):
-        """Should fail without a name."""
-        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
-        response = client.post("/todo/category", json={}, headers=headers)
-        assert response.status_code == 400
-
-    def test_create_todo_category_name_too_long(self, client, sample_jwt_token):
-        """Should fail with a name over 100 characters."""
-        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
-        response = client.post(
-            "/todo/category", json={"name": "a" * 101}, headers=headers
+        assert [e["id"] for e in data["entries"]] == [1, 2]
+        assert _decode_entry_cursor(data["next_cursor"]) == (
+            start + timedelta(hours=2), 2
         )
-        assert response.status_code == 400
 
-    def test_create_todo_category_blank_name(self, client, sample_jwt_token):
-        """Should fail with a whitespace-only name."""
-        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
-        response = client.post(
-            "/todo/category", json={"name": "   "}, headers=headers
-        )
-        assert response.status_code == 400
+        # The query asks for one row beyond the page to detect the next one
+        query, params = mock_cursor.execute.call_args[0]
+        assert "LIMIT" in query
+        assert params[-1] == 3
 
     @patch('app.get_cursor')
-    def test_create_todo_category_already_exists(self, mock_cursor_context, client, sample_jwt_token):
-        """Should return 200 if the category already exists."""
+    def test_entries_last_page_has_no_cursor(self, mock_cursor_context, client, sample_jwt_token):
+        """A short page is the last one."""
         mock_cursor = _mock_cursor(mock_cursor_context)
-        mock_cursor.fetchone.return_value = {"id": 1, "name": "Work"}
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.fetchall.return_value = []
 
         headers = {"Authorization": f"Bearer {sample_jwt_token}"}
-        response = client.post(
-            "/todo/category", json={"name": "Work"}, headers=headers
+        response = client.get(
+            "/entry?from=2024-01-01T00:00:00Z&to=2024-01-08T00:00:00Z",
+            headers=headers,
         )
         assert response.status_code == 200
+        assert response.get_json()["next_cursor"] is None
 
     @patch('app.get_cursor')
-    def test_create_todo_category_success(self, mock_cursor_context, client, sample_jwt_token):
-        """Should create a new TODO category."""
+    def test_entries_all_is_unbounded(self, mock_cursor_context, client, sample_jwt_token):
+        """all=true should return the old unpaginated shape."""
         mock_cursor = _mock_cursor(mock_cursor_context)
-        mock_cursor.fetchone.return_value = None
-        mock_cursor.lastrowid = 5
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.fetchall.return_value = []
 
         headers = {"Authorization": f"Bearer {sample_jwt_token}"}
-        response = client.post(
-            "/todo/category", json={"name": "Errands"}, headers=headers
-        )
-        assert response.status_code == 201
-        data = response.get_json()
-        assert data["category"] == {"id": 5, "name": "Errands"}
-
+        response = client.get("/entry?all=true", headers=headers)
+        assert response.status_code == 200
+        assert "next_cursor" not in response.get_json()
+        query, _ = mock_cursor.execute.call_args[0]
+        assert "LIMIT" not in query
 
-class TestCreateTodoItem:
-    """Tests for TODO item creation."""
 
-    def test_create_todo_item_missing_fields(self, client, sample_jwt_token):
-        """Should fail without title and category."""
-        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
-        response = client.post("/todo/create", json={}, headers=headers)
-        assert response.status_code == 400
+def _batch_entry(category="Work", hour=10):
+    return {
+        "category": category,
+        "start_time": f"2024-01-01T{hour:02d}:00:00+00:00",
+        "end_time": f"2024-01-01T{hour:02d}:30:00+00:00",
+    }
 
-    def test_create_todo_item_blank_title(self, client, sample_jwt_token):
-        """Should fail with a whitespace-only title."""
-        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
-        response = client.post(
-            "/todo/create",
-            json={"title": "   ", "category": "Work"},
-            headers=headers,
-        )
-        assert response.status_code == 400
 
-    def test_create_todo_item_title_too_long(self, client, sample_jwt_token):
-        """Should fail with a title over 255 characters."""
-        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
-        response = client.post(
-            "/todo/create",
-            json={"title": "a" * 256, "category": "Work"},
-            headers=headers,
-        )
-        assert response.status_code == 400
+class TestBatchImportTimeEntries:
+    """Tests for the single-transaction /entry/batch-import path."""
 
-    def test_create_todo_item_invalid_priority(self, client, sample_jwt_token):
-        """Should fail with an invalid priority."""
-        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
-        response = client.post(
-            "/todo/create",
-            json={"title": "Task", "category": "Work", "priority": "urgent"},
-            headers=headers,
-        )
-        assert response.status_code == 400
+    @patch('app.get_cursor')
+    def test_batch_import_validates_then_inserts_once(self, mock_cursor_context, client, sample_jwt_token):
+        """Invalid rows are reported; valid rows go out in one executemany."""
+        mock_cursor = MagicMock()
+        mock_cursor.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_cursor.__exit__ = MagicMock(return_value=False)
+        mock_cursor.fetchone.return_value = {"id": 1}  # user
+        mock_cursor.fetchall.side_effect = [
+            [{"id": 4, "name": "Work"}],   # existing categories
+            [{"id": 9, "name": "Chess"}],  # created by the INSERT
+        ]
+        mock_cursor_context.return_value = mock_cursor
 
-    def test_create_todo_item_due_date_without_timezone(self, client, sample_jwt_token):
-        """Should fail when due_date has no timezone offset."""
         headers = {"Authorization": f"Bearer {sample_jwt_token}"}
-        response = client.post(
-            "/todo/create",
-            json={
-                "title": "Task",
-                "category": "Work",
-                "due_date": "2024-01-01T10:00:00",
-            },
-            headers=headers,
-        )
-        assert response.status_code == 400
+        response = client.post("/entry/batch-import", json={"entries": [
+            _batch_entry("work", 10),
+            {"category": "Work", "start_time": "bad", "end_time": "bad"},
+            _batch_entry("Chess", 12),
+        ]}, headers=headers)
 
-    def test_create_todo_item_invalid_due_date_format(self, client, sample_jwt_token):
-        """Should fail when due_date cannot be parsed."""
-        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
-        response = client.post(
-            "/todo/create",
-            json={"title": "Task", "category": "Work", "due_date": "not-a-date"},
-            headers=headers,
-        )
-        assert response.status_code == 400
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data["success"] == 2
+        assert data["failed"] == 1
+        assert data["errors"][0]["index"] == 1
+
+        queries = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        inserts = [q for q in queries if q.startswith("INSERT INTO category ")]
+        assert len(inserts) == 1
+        assert mock_cursor.execute.call_args_list[queries.index(inserts[0])][0][1] == ["Chess"]
+        entries_call, rollup_call = mock_cursor.executemany.call_args_list
+        assert [row[1] for row in entries_call[0][1]] == [4, 9]
+        assert "time_entry_daily_rollup" in rollup_call[0][0]
+        assert sorted(row[2:] for row in rollup_call[0][1]) == [(4, 1800), (9, 1800)]
 
     @patch('app.get_cursor')
-    def test_create_todo_item_user_not_found(self, mock_cursor_context, client, sample_jwt_token):
-        """Should fail with 404 if the JWT identity resolves to no DB user."""
+    def test_batch_import_reports_overlong_category(self, mock_cursor_context, client, sample_jwt_token):
+        """A category name the column would truncate is reported on its row,
+        not created."""
         mock_cursor = _mock_cursor(mock_cursor_context)
-        mock_cursor.fetchone.return_value = None
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.fetchall.return_value = [{"id": 4, "name": "Work"}]
 
         headers = {"Authorization": f"Bearer {sample_jwt_token}"}
-        response = client.post(
-            "/todo/create",
-            json={"title": "Task", "category": "Work"},
-            headers=headers,
-        )
-        assert response.status_code == 404
+        response = client.post("/entry/batch-import", json={"entries": [
+            _batch_entry("Work", 10),
+            _batch_entry("x" * 101, 11),
+        ]}, headers=headers)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data["success"] == 1
+        assert data["errors"] == [
+            {"index": 1, "error": "Category name must be between 1 and 100 characters"}
+        ]
+        queries = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        assert not any(q.startswith("INSERT INTO category ") for q in queries)
 
+    @patch('app.BATCH_IMPORT_CHUNK_SIZE', 2)
     @patch('app.get_cursor')
-    def test_create_todo_item_category_not_found(self, mock_cursor_context, client, sample_jwt_token):
-        """Should fail with 404 if the category does not exist."""
-        mock_cursor = _mock_cursor(mock_cursor_context)
-        mock_cursor.fetchone.side_effect = [{"id": 1}, None]
+    def test_batch_import_chunks_rows(self, mock_cursor_context, client, sample_jwt_token):
+        """Rows are written BATCH_IMPORT_CHUNK_SIZE at a time."""
+        mock_cursor = MagicMock()
+        mock_cursor.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_cursor.__exit__ = MagicMock(return_value=False)
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.fetchall.return_value = [{"id": 4, "name": "Work"}]
+        mock_cursor_context.return_value = mock_cursor
 
         headers = {"Authorization": f"Bearer {sample_jwt_token}"}
-        response = client.post(
-            "/todo/create",
-            json={"title": "Task", "category": "Nonexistent"},
-            headers=headers,
-        )
-        assert response.status_code == 404
+        response = client.post("/entry/batch-import", json={
+            "entries": [_batch_entry(hour=h) for h in range(5)]
+        }, headers=headers)
+
+        assert response.status_code == 200
+        assert response.get_json()["success"] == 5
+        assert mock_cursor.executemany.call_count == 4  # 3 chunks + the rollup
+        assert mock_cursor_context.call_count == 2  # user lookup, then the import
 
     @patch('app.get_cursor')
-    def test_create_todo_item_success(self, mock_cursor_context, client, sample_jwt_token):
-        """Should create a TODO item successfully."""
-        mock_cursor = _mock_cursor(mock_cursor_context)
-        mock_cursor.fetchone.side_effect = [{"id": 1}, {"id": 2}]
-        mock_cursor.lastrowid = 10
+    def test_batch_import_failed_chunk_replays_per_row(self, mock_cursor_context, client, sample_jwt_token):
+        """A chunk that fails is retried row by row so only the bad row fails."""
+        from mysql.connector import Error
+
+        mock_cursor = MagicMock()
+        mock_cursor.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_cursor.__exit__ = MagicMock(return_value=False)
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.fetchall.return_value = [{"id": 4, "name": "Work"}]
+        def executemany(query, rows):
+            if "INSERT INTO time_entries" in query:
+                raise Error("chunk failed")
+        mock_cursor.executemany.side_effect = executemany
+
+        def execute(query, params=None):
+            if "INSERT INTO time_entries" in query and params[2].hour == 11:
+                raise Error("row failed")
+        mock_cursor.execute.side_effect = execute
+        mock_cursor_context.return_value = mock_cursor
 
         headers = {"Authorization": f"Bearer {sample_jwt_token}"}
-        response = client.post(
-            "/todo/create",
-            json={"title": "Task", "category": "Work", "priority": "high"},
-            headers=headers,
-        )
-        assert response.status_code == 201
+        response = client.post("/entry/batch-import", json={
+            "entries": [_batch_entry(hour=h) for h in (10, 11, 12)]
+        }, headers=headers)
+
+        assert response.status_code == 200
         data = response.get_json()
-        assert data["item"]["id"] == 10
-        assert data["item"]["priority"] == "high"
+        assert data["success"] == 2
+        assert data["failed"] == 1
+        assert data["errors"][0]["index"] == 1
+        queries = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        assert "ROLLBACK TO SAVEPOINT batch_chunk" in queries
+        assert "ROLLBACK TO SAVEPOINT batch_row" in queries
 
 
-class TestUpdateTodoItem:
-    """Tests for TODO item updates."""
+class TestFinanceBulkWriter:
+    """Tests for the bulk writer behind /finance/batch-import and batch-generate."""
 
-    def test_update_todo_item_no_body(self, client, sample_jwt_token):
-        """Should fail without a request body."""
-        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
-        response = client.put("/todo/1", json={}, headers=headers)
-        assert response.status_code == 400
+    @patch('app.get_cursor')
+    def test_batch_import_resolves_categories_once(self, mock_cursor_context, client, sample_jwt_token):
+        """Known categories match case-insensitively; new ones are created normalized."""
+        mock_cursor = MagicMock()
+        mock_cursor.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_cursor.__exit__ = MagicMock(return_value=False)
+        mock_cursor.fetchone.return_value = {"id": 1}  # user
+        mock_cursor.fetchall.side_effect = [
+            [{"id": 2, "name": "Food"}],         # existing categories
+            [{"id": 5, "name": "Alimentação"}],  # created by the INSERT
+        ]
+        mock_cursor_context.return_value = mock_cursor
 
-    def test_update_todo_item_invalid_priority(self, client, sample_jwt_token):
-        """Should fail with an invalid priority."""
+        entry = {"product_name": "x", "price": 1.5, "purchase_date": "2024-01-01T10:00:00+00:00"}
         headers = {"Authorization": f"Bearer {sample_jwt_token}"}
-        response = client.put(
-            "/todo/1", json={"priority": "urgent"}, headers=headers
-        )
-        assert response.status_code == 400
+        response = client.post("/finance/batch-import", json={"entries": [
+            {**entry, "category": "FOOD"},
+            {**entry, "category": "ALIMENTAÇÃO"},
+            {**entry, "category": "Food", "price": -1},
+        ]}, headers=headers)
 
-    def test_update_todo_item_invalid_status(self, client, sample_jwt_token):
-        """Should fail with an invalid status."""
-        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
-        response = client.put(
-            "/todo/1", json={"status": "done"}, headers=headers
-        )
-        assert response.status_code == 400
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data["success"] == 2
+        assert data["failed"] == 1
+        assert data["errors"][0]["index"] == 2
+
+        created = [c for c in mock_cursor.execute.call_args_list
+                   if c[0][0].startswith("INSERT INTO finance_categories")]
+        assert created[0][0][1] == ["Alimentação"]
+        rows = mock_cursor.executemany.call_args[0][1]
+        assert [row[1] for row in rows] == [2, 5]
 
     @patch('app.get_cursor')
-    def test_update_todo_item_not_found(self, mock_cursor_context, client, sample_jwt_token):
-        """Should fail with 404 if the item does not belong to the user."""
+    def test_batch_import_matches_categories_without_accents(self, mock_cursor_context, client, sample_jwt_token):
+        """"Saude" is the stored "Saúde" to the column's accent-insensitive
+        collation, so it resolves to that row instead of failing to be created."""
         mock_cursor = _mock_cursor(mock_cursor_context)
-        mock_cursor.fetchone.return_value = None
+        mock_cursor.fetchone.return_value = {"id": 1}  # user
+        mock_cursor.fetchall.return_value = [{"id": 4, "name": "Saúde"}]
 
+        entry = {"product_name": "x", "price": 1.5, "purchase_date": "2024-01-01T10:00:00+00:00"}
         headers = {"Authorization": f"Bearer {sample_jwt_token}"}
-        response = client.put(
+        response = client.post("/finance/batch-import", json={"entries": [
+            {**entry, "category": "SAUDE"},
+            {**entry, "category": "Saúde"},
+        ]}, headers=headers)
+
+        assert response.status_code == 200
+        assert response.get_json()["success"] == 2
+        queries = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        assert not any(q.startswith("INSERT INTO finance_categories") for q in queries)
+        rows = mock_cursor.executemany.call_args[0][1]
+        assert [row[1] for row in rows] == [4, 4]
+
+    @patch('app.get_cursor')
+    def test_batch_generate_writes_in_chunks(self, mock_cursor_context, client, sample_jwt_token):
+        """MAX_GENERATE_ROWS rows take one executemany per chunk, in one transaction."""
+        mock_cursor = MagicMock()
+        mock_cursor.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_cursor.__exit__ = MagicMock(return_value=False)
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.fetchall.return_value = [{"id": 2, "name": "Bills"}]
+        mock_cursor_context.return_value = mock_cursor
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post("/finance/batch-generate", json={
+            "frequency": "monthly",
+            "day": 1,
+            "start_date": "2000-01-01",
+            "end_date": "2041-08-31",  # 500 months x 2 templates = 1000 rows
+            "entries": [
+                {"category": "Bills", "product_name": "Rent", "price": 900},
+                {"category": "bills", "product_name": "Power", "price": 80},
+            ],
+        }, headers=headers)
+
+        assert response.status_code == 200
+        assert response.get_json() == {"success": 1000, "failed": 0, "errors": []}
+        assert mock_cursor.executemany.call_count == 2
+        assert mock_cursor_context.call_count == 2  # user lookup, then the write
+
+
+class TestConnectionPool:
+    """Tests for the blocking, metered connection pool."""
+
+    def _pool(self, size=1, timeout=0.05, max_waiters=4):
+        from db_pool import MeteredConnectionPool
+        with patch('db_pool.MySQLConnectionPool') as mock_pool_class:
+            mock_pool_class.return_value.get_connection.side_effect = lambda: MagicMock()
+            return MeteredConnectionPool(
+                pool_name="test", pool_size=size, acquire_timeout=timeout,
+                max_waiters=max_waiters,
+            )
+
+    def test_acquire_times_out_when_exhausted(self):
+        """With every connection out, get_connection waits then raises PoolError."""
+        from mysql.connector.errors import PoolError
+        pool = self._pool()
+        held = pool.get_connection()
+
+        with pytest.raises(PoolError):
+            pool.get_connection()
+
+        stats = pool.stats()
+        assert stats["checked_out"] == 1
+        assert stats["timeouts"] == 1
+        held.close()
+        assert pool.stats()["checked_out"] == 0
+
+    def test_waiter_gets_released_connection(self):
+        """A queued caller is handed the connection as soon as it is closed."""
+        import threading
+        pool = self._pool(timeout=2)
+        held = pool.get_connection()
+        threading.Timer(0.05, held.close).start()
+
+        connection = pool.get_connection()
+        assert connection is not None
+        stats = pool.stats()
+        assert stats["acquire_latency_seconds"]["count"] == 2
+        assert stats["acquire_latency_seconds"]["buckets"][-1]["count"] == 2
+
+    def test_full_wait_queue_fails_fast(self):
+        """Beyond max_waiters, callers are rejected without waiting."""
+        from mysql.connector.errors import PoolError
+        pool = self._pool(timeout=5, max_waiters=0)
+        pool.get_connection()
+
+        with pytest.raises(PoolError):
+            pool.get_connection()
+        assert pool.stats()["rejected"] == 1
+
+    def test_close_is_idempotent(self):
+        """Closing a connection twice must not free two slots."""
+        pool = self._pool(size=2)
+        connection = pool.get_connection()
+        connection.close()
+        connection.close()
+        assert pool.stats()["checked_out"] == 0
+        pool.get_connection()
+        pool.get_connection()
+        assert pool.stats()["checked_out"] == 2
+
+    def test_connection_age_follows_the_connection(self):
+        """A connection keeps its age across checkouts, and one the pool
+        lets go of stops being counted."""
+        import gc
+        from db_pool import MeteredConnectionPool
+        underlying = MagicMock()
+        with patch('db_pool.MySQLConnectionPool') as mock_pool_class:
+            mock_pool_class.return_value.get_connection.side_effect = (
+                lambda cnx=underlying: MagicMock(_cnx=cnx)
+            )
+            pool = MeteredConnectionPool(
+                pool_name="test", pool_size=1, acquire_timeout=0.05, max_waiters=1,
+            )
+
+        first = pool.get_connection()
+        first.close()
+        second = pool.get_connection()
+        assert second.created_at == first.created_at
+        assert pool.stats()["connection_age_seconds"]["connections"] == 1
+
+        second.close()
+        mock_pool_class.return_value.get_connection.side_effect = None
+        del first, second, underlying
+        gc.collect()
+        assert pool.stats()["connection_age_seconds"]["connections"] == 0
+
+    @patch('app.get_pool')
+    def test_internal_pool_endpoint_loopback(self, mock_get_pool, client):
+        """Without a token configured, loopback callers see the stats."""
+        mock_get_pool.return_value.stats.return_value = {"checked_out": 0}
+        response = client.get("/internal/pool")
+        assert response.status_code == 200
+        assert response.get_json()["pool"] == {"checked_out": 0}
+
+    @patch('app.INTERNAL_TOKEN', 'secret-token')
+    @patch('app.get_pool')
+    def test_internal_pool_endpoint_requires_token(self, mock_get_pool, client):
+        """With a token configured, it must be presented."""
+        mock_get_pool.return_value.stats.return_value = {}
+        assert client.get("/internal/pool").status_code == 404
+        response = client.get(
+            "/internal/pool", headers={"X-Internal-Token": "secret-token"}
+        )
+        assert response.status_code == 200
+
+
+def _metric_value(body, sample):
+    """Value of one sample line in a Prometheus text exposition, or 0."""
+    for line in body.splitlines():
+        if line.startswith(sample + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+class TestMetrics:
+    """Tests for the Prometheus /metrics endpoint."""
+
+    def test_counts_requests_by_route_template(self, client):
+        """Requests are labelled by URL rule, not by raw path."""
+        sample = 'http_requests_total{method="GET",route="/health",status="200"}'
+        before = _metric_value(client.get("/metrics").get_data(as_text=True), sample)
+
+        # The WSGI server closes each response once it is sent; that is when
+        # the request is recorded.
+        client.get("/health").close()
+        client.get("/health").close()
+
+        body = client.get("/metrics").get_data(as_text=True)
+        assert _metric_value(body, sample) == before + 2
+        assert 'http_request_duration_seconds_bucket{le="0.005",method="GET",route="/health"}' in body
+
+    @patch('db.get_pool')
+    def test_records_db_queries_per_request(self, mock_get_pool, client):
+        """Statements run through get_cursor() are counted against the route."""
+        cursor = MagicMock()
+        cursor.fetchall.return_value = []
+        mock_get_pool.return_value.get_connection.return_value.cursor.return_value = cursor
+
+        sample = 'http_request_db_queries_sum{method="GET",route="/get/categories"}'
+        before = _metric_value(client.get("/metrics").get_data(as_text=True), sample)
+
+        response = client.get("/get/categories")
+        assert response.status_code == 200
+        response.close()
+
+        body = client.get("/metrics").get_data(as_text=True)
+        assert _metric_value(body, sample) == before + 1
+        assert 'http_request_db_seconds_count{method="GET",route="/get/categories"}' in body
+
+    def test_counts_requests_refused_before_the_route(self, client, app_context):
+        """A request refused by a later before_request hook, as the rate
+        limiter refuses one with a 429, is still counted."""
+        from flask import abort
+
+        def refuse():
+            abort(429)
+
+        sample = 'http_requests_total{method="GET",route="/health",status="429"}'
+        before = _metric_value(client.get("/metrics").get_data(as_text=True), sample)
+
+        hooks = app_context.before_request_funcs[None]
+        with patch.dict(app_context.before_request_funcs, {None: [*hooks, refuse]}):
+            response = client.get("/health")
+        assert response.status_code == 429
+        response.close()
+
+        body = client.get("/metrics").get_data(as_text=True)
+        assert _metric_value(body, sample) == before + 1
+
+    def test_counts_unhandled_exceptions(self, client, app_context):
+        """A route that raises is counted as a 500 even though no response
+        went through after_request."""
+        def boom():
+            raise RuntimeError("boom")
+
+        sample = 'http_requests_total{method="GET",route="/health",status="500"}'
+        before = _metric_value(client.get("/metrics").get_data(as_text=True), sample)
+
+        endpoint = next(
+            rule.endpoint for rule in app_context.url_map.iter_rules() if rule.rule == "/health"
+        )
+        with patch.dict(app_context.view_functions, {endpoint: boom}):
+            with pytest.raises(RuntimeError):
+                client.get("/health")
+
+        body = client.get("/metrics").get_data(as_text=True)
+        assert _metric_value(body, sample) == before + 1
+
+    @patch('app.INTERNAL_TOKEN', 'secret-token')
+    def test_metrics_requires_internal_caller(self, client):
+        """/metrics is hidden from callers without the internal token."""
+        assert client.get("/metrics").status_code == 404
+
+
+class TestEntryRollup:
+    """Tests for the daily rollup and /entry/summary."""
+
+    def test_rollup_deltas_split_at_local_midnight(self):
+        """An entry past midnight in ROLLUP_TIMEZONE counts on both days."""
+        from rollup import rollup_deltas
+        # 23:00-00:30 at UTC-3 is 02:00-03:30 UTC on the 2nd, but the
+        # dashboard puts the first hour on the 1st
+        deltas = rollup_deltas(
+            7,
+            datetime(2024, 1, 1, 23, 0, tzinfo=timezone(timedelta(hours=-3))),
+            datetime(2024, 1, 2, 0, 30, tzinfo=timezone(timedelta(hours=-3))),
+        )
+        assert deltas == [
+            (datetime(2024, 1, 1).date(), 7, 3600),
+            (datetime(2024, 1, 2).date(), 7, 1800),
+        ]
+
+        # Naive datetimes are UTC, as stored: 23:00-01:00 UTC is all on the 1st
+        deltas = rollup_deltas(7, datetime(2024, 1, 1, 23, 0), datetime(2024, 1, 2, 1, 0), -1)
+        assert deltas == [(datetime(2024, 1, 1).date(), 7, -7200)]
+
+    @patch('rollup.get_cursor')
+    def test_backfill_rebuilds_users_in_keyset_batches(self, mock_cursor_context):
+        """Each batch of users is rebuilt in its own transaction, resuming
+        after the last id of the previous batch."""
+        from rollup import backfill_rollup
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchall.side_effect = [[{"id": 1}, {"id": 2}], [{"id": 5}], []]
+        mock_cursor.fetchmany.side_effect = [
+            [{"user_id": 1, "category_id": 3,
+              "start_time": datetime(2024, 1, 1, 12), "end_time": datetime(2024, 1, 1, 13)},
+             {"user_id": 1, "category_id": 3,
+              "start_time": datetime(2024, 1, 1, 14), "end_time": datetime(2024, 1, 1, 14, 30)}],
+            [],
+            [],
+        ]
+
+        assert backfill_rollup(batch_size=2) == {"users": 3, "days": 1}
+
+        assert mock_cursor_context.call_count == 3
+        keyset_params = [
+            c.args[1] for c in mock_cursor.execute.call_args_list
+            if "FROM users" in c.args[0]
+        ]
+        assert keyset_params == [(0, 2), (2, 2), (5, 2)]
+        reads = [c for c in mock_cursor.execute.call_args_list if "FROM time_entries" in c.args[0]]
+        assert "FOR SHARE" in reads[0].args[0]
+        query, rows = mock_cursor.executemany.call_args[0]
+        assert rows == [(1, datetime(2024, 1, 1).date(), 3, 5400)]
+
+    @patch('app.get_cursor')
+    def test_update_moves_time_in_rollup(self, mock_cursor_context, client, sample_jwt_token):
+        """Updating an entry takes its old time off and adds the new time."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.side_effect = [
+            {"id": 1},              # user
+            _time_entry_row(3),     # existing entry, category 1, 10:00-11:00
+            {"id": 2},              # new category
+        ]
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.put("/entry/3", json={
+            "category": "Study",
+            "start_time": "2024-01-01T10:00:00+00:00",
+            "end_time": "2024-01-01T10:30:00+00:00",
+        }, headers=headers)
+
+        assert response.status_code == 200
+        query, rows = mock_cursor.executemany.call_args[0]
+        assert "time_entry_daily_rollup" in query
+        assert sorted(row[2:] for row in rows) == [(1, -3600), (2, 1800)]
+
+    @patch('app.get_cursor')
+    def test_summary_groups_rows_by_period(self, mock_cursor_context, client, sample_jwt_token):
+        """Rollup rows come back grouped per period with a total."""
+        from datetime import date
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.fetchall.return_value = [
+            {"period": date(2024, 1, 1), "category": "Study", "seconds": 600},
+            {"period": date(2024, 1, 1), "category": "Work", "seconds": 3600},
+            {"period": date(2024, 1, 8), "category": "Work", "seconds": 60},
+        ]
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.get(
+            "/entry/summary?granularity=week&from=2024-01-01&to=2024-01-14",
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data["granularity"] == "week"
+        assert [p["period"] for p in data["periods"]] == ["2024-01-01", "2024-01-08"]
+        assert data["periods"][0]["total_seconds"] == 4200
+        query, params = mock_cursor.execute.call_args[0]
+        assert "FROM time_entry_daily_rollup" in query
+        assert "WEEKDAY" in query
+        assert "time_entries" not in query
+
+    def test_summary_rejects_bad_parameters(self, client, sample_jwt_token):
+        """Unknown granularity, malformed dates and reversed ranges are 400s."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        for query in (
+            "granularity=year",
+            "from=01/01/2024",
+            "from=2024-02-01&to=2024-01-01",
+        ):
+            response = client.get(f"/entry/summary?{query}", headers=headers)
+            assert response.status_code == 400
+
+
+def _statement(issued_on):
+    return {
+        "emissao": issued_on,
+        "vencimento": None,
+        "titulares": {},
+        "transacoes": [],
+        "resumo": {"total_lancamentos": 0.0, "conferido": True},
+        "reconciliacao": {"divergencias": [], "paginas": [], "paginas_reprocessadas": []},
+    }
+
+
+class TestParseItauPdf:
+    """Tests for streaming uploads through the PDF pool."""
+
+    def _upload(self, client, token, names):
+        import io
+        return client.post(
+            "/finance/parse-itau-pdf",
+            data={"file": [(io.BytesIO(b"%PDF-1.4 " + name.encode()), name) for name in names]},
+            headers={"Authorization": f"Bearer {token}"},
+            content_type="multipart/form-data",
+        )
+
+    @patch('app.extract_statement_from_file')
+    def test_results_keep_upload_order(self, mock_extract, client, sample_jwt_token):
+        """The first upload of a statement wins even if it is the slowest."""
+        import time as time_module
+        issued = {"a.pdf": "2024-01-10", "b.pdf": "2024-02-10", "c.pdf": "2024-01-10"}
+
+        def extract(pdf_file, filename):
+            time_module.sleep(0.05 if filename == "a.pdf" else 0)
+            return _statement(issued[filename])
+        mock_extract.side_effect = extract
+
+        response = self._upload(client, sample_jwt_token, ["a.pdf", "b.pdf", "c.pdf"])
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [s["file"] for s in data["statements"]] == ["a.pdf", "b.pdf"]
+        assert [f["file"] for f in data["failures"]] == ["c.pdf"]
+
+    @patch('app.PDF_PARSE_DEADLINE_SECONDS', 0.05)
+    @patch('app.extract_statement_from_file')
+    def test_deadline_reports_unfinished_files(self, mock_extract, client, sample_jwt_token):
+        """Files still parsing at the deadline are reported as timed out."""
+        import time as time_module
+
+        def extract(pdf_file, filename):
+            if filename == "slow.pdf":
+                time_module.sleep(0.5)
+            return _statement("2024-01-10" if filename == "fast.pdf" else "2024-02-10")
+        mock_extract.side_effect = extract
+
+        response = self._upload(client, sample_jwt_token, ["fast.pdf", "slow.pdf"])
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [s["file"] for s in data["statements"]] == ["fast.pdf"]
+        assert data["failures"][0]["file"] == "slow.pdf"
+        assert "Timed out" in data["failures"][0]["error"]
+
+
+    @patch('app.PDF_PARSE_WORKERS', 2)
+    @patch('app.extract_statement_from_file')
+    def test_files_parse_in_parallel_up_to_the_bound(self, mock_extract, client, sample_jwt_token):
+        """Each file goes to the pool once read, but no more than
+        PDF_PARSE_WORKERS of a request's files are held at once."""
+        import threading
+        import time as time_module
+        issued = {"a.pdf": "2024-01-10", "b.pdf": "2024-02-10",
+                  "c.pdf": "2024-03-10", "d.pdf": "2024-04-10"}
+        lock = threading.Lock()
+        running = []
+        peak = []
+        spools = []
+
+        def extract(pdf_file, filename):
+            assert pdf_file.read() == b"%PDF-1.4 " + filename.encode()
+            with lock:
+                running.append(filename)
+                peak.append(len(running))
+                spools.append(pdf_file)
+            time_module.sleep(0.05)
+            with lock:
+                running.remove(filename)
+            return _statement(issued[filename])
+        mock_extract.side_effect = extract
+
+        response = self._upload(client, sample_jwt_token, list(issued))
+
+        assert response.status_code == 200
+        assert [s["file"] for s in response.get_json()["statements"]] == list(issued)
+        assert max(peak) == 2
+        assert len(spools) == 4 and all(spool.closed for spool in spools)
+
+    @patch('app.MAX_PDF_UPLOAD_BYTES', 20)
+    @patch('app.PDF_UPLOAD_READ_SIZE', 4)
+    @patch('app.extract_statement_from_file')
+    def test_oversized_file_is_rejected_while_streaming(self, mock_extract, client, sample_jwt_token):
+        """A file over the limit is reported and the files after it still parse."""
+        mock_extract.return_value = _statement("2024-01-10")
+
+        response = self._upload(client, sample_jwt_token, ["much-too-big.pdf", "ok.pdf"])
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data["failures"] == [
+            {"file": "much-too-big.pdf", "error": "PDF is too large (max 10 MB)"}
+        ]
+        assert [s["file"] for s in data["statements"]] == ["ok.pdf"]
+        assert [c.args[1] for c in mock_extract.call_args_list] == ["ok.pdf"]
+
+    @patch('app.MAX_PDF_UPLOAD_BYTES', 1000)
+    @patch('app.MAX_PDF_REQUEST_BYTES', 400)
+    @patch('app.PDF_UPLOAD_READ_SIZE', 16)
+    @patch('app.extract_statement_from_file')
+    def test_request_size_is_capped_across_files(self, mock_extract, client, sample_jwt_token):
+        """Files each under the per-file cap still add up to the request cap,
+        and the request is refused before the rest of the body is read."""
+        mock_extract.return_value = _statement("2024-01-10")
+        names = [f"{'x' * 40}-{n}.pdf" for n in range(12)]
+
+        response = self._upload(client, sample_jwt_token, names)
+
+        assert response.status_code == 413
+        assert "too large" in response.get_json()["error"]
+        assert mock_extract.call_count < len(names)
+
+    @patch('app.MAX_PDF_UPLOAD_COUNT', 2)
+    @patch('app.extract_statement_from_file')
+    def test_too_many_files(self, mock_extract, client, sample_jwt_token):
+        mock_extract.side_effect = [_statement("2024-01-10"), _statement("2024-02-10")]
+        response = self._upload(client, sample_jwt_token, ["a.pdf", "b.pdf", "c.pdf"])
+        assert response.status_code == 400
+        assert "Too many files" in response.get_json()["error"]
+
+    @patch('app.MAX_PDF_UPLOAD_COUNT', 1)
+    @patch('app.extract_statement_from_file')
+    def test_extra_file_is_refused_before_it_is_parsed(self, mock_extract, client, sample_jwt_token):
+        """The part past the limit is refused on its headers, so only the
+        files within the limit can reach the parser."""
+        mock_extract.return_value = _statement("2024-01-10")
+        response = self._upload(client, sample_jwt_token, ["a.pdf", "b.pdf", "c.pdf"])
+        assert response.status_code == 400
+        assert {c.args[1] for c in mock_extract.call_args_list} <= {"a.pdf"}
+
+    def test_no_files(self, client, sample_jwt_token):
+        response = self._upload(client, sample_jwt_token, [])
+        assert response.status_code == 400
+
+
+class TestStatementCache:
+    """Tests for the content-addressed statement cache."""
+
+    @patch('app.extract_statement_from_file')
+    def test_repeat_upload_skips_parsing(self, mock_extract, client, sample_jwt_token):
+        """The same bytes under another name are served from cache."""
+        import io
+        mock_extract.return_value = _statement("2024-01-10")
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+
+        for name in ("jan.pdf", "jan-again.pdf"):
+            response = client.post(
+                "/finance/parse-itau-pdf",
+                data={"file": [(io.BytesIO(b"%PDF-1.4 same"), name)]},
+                headers=headers,
+                content_type="multipart/form-data",
+            )
+            assert response.status_code == 200
+            assert response.get_json()["statements"][0]["file"] == name
+
+        assert mock_extract.call_count == 1
+
+    def test_key_is_salted_with_parser_version(self):
+        """A new parser version never reuses an old parse."""
+        from statement_cache import statement_cache_key
+        assert statement_cache_key(b"%PDF", "1") != statement_cache_key(b"%PDF", "2")
+        assert statement_cache_key(b"%PDF", "1") == statement_cache_key(b"%PDF", "1")
+
+    def test_memory_tier_evicts_least_recently_used(self):
+        from statement_cache import StatementCache
+        cache = StatementCache(max_entries=2)
+        cache.put("a", {"n": 1})
+        cache.put("b", {"n": 2})
+        cache.get("a")
+        cache.put("c", {"n": 3})
+        assert cache.get("b") is None
+        assert cache.get("a") == {"n": 1}
+
+    def test_disk_tier_is_shared_and_bounded(self, tmp_path):
+        """A second cache (another worker) reads what the first wrote."""
+        import os
+        from statement_cache import StatementCache
+        writer = StatementCache(max_entries=10, disk_dir=str(tmp_path), disk_max_entries=2)
+        for key in ("a", "b", "c"):
+            writer.put(key, {"key": key})
+            os.utime(tmp_path / f"{key}.json", (0, {"a": 1, "b": 2, "c": 3}[key]))
+        writer.put("c", {"key": "c"})
+
+        reader = StatementCache(max_entries=10, disk_dir=str(tmp_path))
+        assert reader.get("c") == {"key": "c"}
+        assert len(list(tmp_path.glob("*.json"))) == 2
+
+        statement = reader.get("c")
+        statement["key"] = "changed"
+        assert reader.get("c") == {"key": "c"}
+
+
+class TestIngestItauPdfs:
+    """Tests for the batch statement ingestion CLI."""
+
+    def _archive(self, tmp_path):
+        for name in ("2024-01.pdf", "2024-02.pdf", "copy-of-2024-01.pdf", "broken.pdf"):
+            (tmp_path / name).write_bytes(b"%PDF-1.4 " + name.encode())
+
+        def extract(path):
+            name = os.path.basename(path)
+            if name == "broken.pdf":
+                from itau_pdf import ItauPdfError
+                raise ItauPdfError("Could not read the PDF")
+            statement = _statement("2024-01-10" if "01" in name else "2024-02-10")
+            statement["transacoes"] = [
+                {"cartao_final": "1234", "data": "2024-01-05", "estabelecimento": "MERCADO",
+                 "categoria_local": "ALIMENTAÇÃO .SAO PAULO", "valor": 12.5},
+                {"cartao_final": "1234", "data": "2024-01-06", "estabelecimento": "ESTORNO",
+                 "categoria_local": "", "valor": -3.0},
+            ]
+            return statement
+
+        return extract
+
+    def _ingest(self, tmp_path, lines):
+        from zoneinfo import ZoneInfo
+        from ingest_itau_pdfs import ingest
+        return ingest(
+            "testuser", str(tmp_path), 1, str(tmp_path / "checkpoint.json"),
+            ZoneInfo("America/Sao_Paulo"), out=lines.append,
+        )
+
+    @patch('db.get_cursor')
+    @patch('db.write_finance_entries', return_value=(1, []))
+    @patch('db.lookup_user_id', return_value=7)
+    def test_imports_new_statements_once(self, mock_lookup, mock_write, mock_cursor_context, tmp_path):
+        lines = []
+        with patch('ingest_itau_pdfs.extract_statement', side_effect=self._archive(tmp_path)):
+            failed = self._ingest(tmp_path, lines)
+
+        assert failed == 1
+        # 2024-01.pdf and 2024-02.pdf; the copy of January is a duplicate
+        assert mock_write.call_count == 2
+        _, user_id, rows = mock_write.call_args_list[0].args
+        assert user_id == 7
+        assert rows == [(
+            0, "Alimentação", "MERCADO", 12.5,
+            datetime(2024, 1, 5, 3, tzinfo=timezone.utc), "done",
+        )]
+        assert any(line.startswith("DUPLICATE  copy-of-2024-01.pdf") for line in lines)
+
+        # A second run only retries the file that failed
+        lines = []
+        with patch('ingest_itau_pdfs.extract_statement', side_effect=self._archive(tmp_path)) as mock_extract:
+            self._ingest(tmp_path, lines)
+        assert mock_write.call_count == 2
+        assert [os.path.basename(c.args[0]) for c in mock_extract.call_args_list] == ["broken.pdf"]
+
+    @patch('db.get_cursor')
+    @patch('db.write_finance_entries')
+    @patch('db.lookup_user_id', return_value=7)
+    def test_renamed_duplicate_of_earlier_run_is_skipped(self, mock_lookup, mock_write, mock_cursor_context, tmp_path):
+        mock_write.return_value = (1, [])
+        extract = self._archive(tmp_path)
+        (tmp_path / "copy-of-2024-01.pdf").unlink()
+        with patch('ingest_itau_pdfs.extract_statement', side_effect=extract):
+            self._ingest(tmp_path, [])
+
+        (tmp_path / "again-2024-01.pdf").write_bytes(b"%PDF-1.4 re-downloaded")
+        lines = []
+        with patch('ingest_itau_pdfs.extract_statement', side_effect=extract):
+            self._ingest(tmp_path, lines)
+
+        assert mock_write.call_count == 2
+        assert any(line.startswith("DUPLICATE  again-2024-01.pdf") for line in lines)
+
+    def test_db_module_loads_without_the_app(self):
+        """The CLIs import db, which must not need JWT_SECRET_KEY or pull
+        in app.py and its boot-time work."""
+        import subprocess
+        env = {k: v for k, v in os.environ.items() if k != "JWT_SECRET_KEY"}
+        env.update(DB_HOST="x", DB_USER="x", DB_PASSWORD="x", DB_NAME="x")
+        result = subprocess.run(
+            [sys.executable, "-c", "import sys, db, ingest_itau_pdfs, backfill_rollup, archive_history, extend_recurrences; assert 'app' not in sys.modules"],
+            cwd=os.path.join(os.path.dirname(__file__), "..", "flask-server"),
+            env=env, capture_output=True, text=True,
+        )
+        assert result.returncode == 0, result.stderr
+
+
+def _fake_pdftotext(script):
+    """Popen stand-in that runs `script` under Python in place of pdftotext,
+    recording the argv it was asked to run."""
+    import subprocess
+    real_popen = subprocess.Popen
+    calls = []
+
+    def popen(args, **kwargs):
+        calls.append(args)
+        return real_popen([sys.executable, "-c", script], **kwargs)
+    return popen, calls
+
+
+class TestStatementPdfExtraction:
+    """Tests for piping uploaded PDFs through pdftotext's stdin."""
+
+    def test_pages_stream_from_stdin(self):
+        """Bytes go in on stdin; pages come back split on form feeds."""
+        import statement_pdf
+        popen, calls = _fake_pdftotext(
+            "import sys; data = sys.stdin.buffer.read(); "
+            "sys.stdout.write('got %d bytes\\fpágina 2\\f' % len(data))"
+        )
+        with patch('statement_pdf.subprocess.Popen', side_effect=popen):
+            pages = list(statement_pdf.pdftotext_pages("-", b"%PDF-1.4 fake"))
+
+        assert calls == [["pdftotext", "-layout", "-", "-"]]
+        assert pages == ["got 13 bytes", "página 2", ""]
+
+    def test_open_file_streams_to_stdin(self):
+        """An open file is copied to pdftotext from its current position."""
+        import io
+        import statement_pdf
+        popen, _ = _fake_pdftotext(
+            "import sys; data = sys.stdin.buffer.read(); "
+            "sys.stdout.write('Itaú Emissão: 10/01/2024 %d\\f' % len(data))"
+        )
+        pdf_file = io.BytesIO(b"%PDF-1.4 " + b"x" * 200000)
+        with patch('statement_pdf.subprocess.Popen', side_effect=popen), \
+                patch('statement_pdf.PDFTOTEXT_READ_SIZE', 4096):
+            statement = statement_pdf.extract_statement_from_file(pdf_file, "fatura.pdf")
+
+        assert statement["emissao"] == "2024-01-10"
+        with pytest.raises(statement_pdf.StatementPdfError, match="not a PDF"):
+            statement_pdf.extract_statement_from_file(io.BytesIO(b"hello"), "fatura.pdf")
+
+    def test_statement_keeps_upload_basename(self):
+        """arquivo is still the uploaded file's base name."""
+        import statement_pdf
+        popen, _ = _fake_pdftotext(
+            "import sys; sys.stdin.buffer.read(); "
+            "sys.stdout.buffer.write('Itaú\\nEmissão: 10/01/2024\\f'.encode())"
+        )
+        with patch('statement_pdf.subprocess.Popen', side_effect=popen):
+            statement = statement_pdf.extract_statement_from_bytes(b"%PDF-1.4", "dir/fatura.pdf")
+
+        assert statement["arquivo"] == "fatura.pdf"
+        assert statement["emissao"] == "2024-01-10"
+
+    def test_failed_extraction_raises_statement_error(self):
+        """A non-zero exit surfaces as StatementPdfError."""
+        import statement_pdf
+        popen, _ = _fake_pdftotext("import sys; sys.stdout.write('Itaú\\f'); sys.exit(1)")
+        with patch('statement_pdf.subprocess.Popen', side_effect=popen):
+            with pytest.raises(statement_pdf.StatementPdfError, match="Could not read"):
+                statement_pdf.extract_statement_from_bytes(b"%PDF-1.4", "dir/fatura.pdf")
+
+    def test_timeout_raises_statement_error(self):
+        """pdftotext is killed once it overruns its time limit."""
+        import statement_pdf
+        popen, _ = _fake_pdftotext("import time; time.sleep(5)")
+        with patch('statement_pdf.subprocess.Popen', side_effect=popen), \
+                patch('statement_pdf.PDFTOTEXT_TIMEOUT_SECONDS', 0.1):
+            with pytest.raises(statement_pdf.StatementPdfError, match="Timed out"):
+                list(statement_pdf.pdftotext_pages("-", b"%PDF-1.4"))
+
+
+class TestStatementParserRegistry:
+    """Tests for sniffing a statement's bank and dispatching to its parser."""
+
+    def test_itau_statement_is_recognized(self):
+        import statement_pdf
+        popen, _ = _fake_pdftotext(
+            "import sys; sys.stdin.buffer.read(); "
+            "sys.stdout.buffer.write('Itaú Unibanco\\nEmissão: 10/01/2024\\f'.encode())"
+        )
+        with patch('statement_pdf.subprocess.Popen', side_effect=popen):
+            statement = statement_pdf.extract_statement_from_bytes(b"%PDF-1.4", "fatura.pdf")
+
+        assert statement["banco"] == "itau"
+        assert statement["emissao"] == "2024-01-10"
+        assert "itau:" in statement_pdf.parsers_version()
+
+    def test_unknown_bank_is_rejected_after_the_first_page(self):
+        """pdftotext is stopped as soon as no parser claims the first page."""
+        import time as time_module
+        import statement_pdf
+        popen, _ = _fake_pdftotext(
+            "import sys, time; sys.stdin.buffer.read(); "
+            "sys.stdout.write('Banco Desconhecido\\f'); sys.stdout.flush(); time.sleep(5)"
+        )
+        started = time_module.monotonic()
+        with patch('statement_pdf.subprocess.Popen', side_effect=popen):
+            with pytest.raises(statement_pdf.UnsupportedStatementError, match="Itaú"):
+                statement_pdf.extract_statement_from_bytes(b"%PDF-1.4", "fatura.pdf")
+        assert time_module.monotonic() - started < 2
+
+    def test_registered_parser_handles_its_statements(self):
+        import statement_pdf
+        parse = MagicMock(return_value={"emissao": "2024-01-10", "transacoes": []})
+        to_entries = MagicMock(return_value=([], []))
+        statement_pdf.register_parser(statement_pdf.StatementParser(
+            name="outro", label="Outro", version="1",
+            sniff=lambda page: "Banco Outro" in page,
+            parse=parse, to_finance_entries=to_entries,
+        ))
+        popen, _ = _fake_pdftotext(
+            "import sys; sys.stdin.buffer.read(); sys.stdout.write('Banco Outro\\fpage 2')"
+        )
+        try:
+            with patch('statement_pdf.subprocess.Popen', side_effect=popen):
+                statement = statement_pdf.extract_statement_from_bytes(b"%PDF-1.4", "x/y.pdf")
+            statement_pdf.statement_to_finance_entries(statement)
+            assert "outro:1" in statement_pdf.parsers_version()
+        finally:
+            statement_pdf._parsers.pop("outro")
+
+        assert statement["banco"] == "outro"
+        parse.assert_called_once_with(["Banco Outro", "page 2"], "y.pdf")
+        to_entries.assert_called_once_with(statement)
+
+
+def _two_table_page(left, right, right_col):
+    """A page laid out like `pdftotext -layout` output, with the right card
+    table starting at column right_col."""
+    rows = []
+    for i in range(max(len(left), len(right))):
+        lhs = left[i] if i < len(left) else ""
+        rhs = right[i] if i < len(right) else ""
+        rows.append(f"{lhs:<{right_col}}{rhs}".rstrip() if rhs else lhs)
+    return "\n".join(rows)
+
+
+class TestStatementReconciliation:
+    """Tests for per-card reconciliation diagnostics and partial reparse."""
+
+    LEFT = [
+        "Emissão: 05/03/2024",
+        "Lançamentos: compras e saques",
+        "FULANO (final 1234)",
+        "02/03   MERCADO        10,00",
+        "        ALIMENTAÇÃO .SP",
+        "Lançamentos no cartão (final 1234)  10,00",
+    ]
+    RIGHT = [
+        "CICLANA (final 5678)",
+        "03/03   FARMACIA LONGA DESCRICAO   25,50",
+        "        SAÚDE .SP",
+        "Lançamentos no cartão (final 5678)  25,50",
+    ]
+
+    def test_split_column_is_detected_per_page(self):
+        """A right table starting left of SPLIT_COL is split at its real
+        column on the first pass."""
+        import itau_pdf
+        pages = [
+            _two_table_page(self.LEFT, self.RIGHT, 70),
+            "Total dos lançamentos atuais 35,50",
+        ]
+        statement = itau_pdf._statement_from_pages(pages, "fatura.pdf")
+
+        assert statement["resumo"]["conferido"] is True
+        assert statement["reconciliacao"]["paginas"][0]["coluna"] == 70
+        assert statement["reconciliacao"]["paginas_reprocessadas"] == []
+        assert [t["estabelecimento"] for t in statement["transacoes"]] == [
+            "MERCADO", "FARMACIA LONGA DESCRICAO"
+        ]
+
+    def test_split_column_is_cached_by_layout(self):
+        import itau_pdf
+        itau_pdf._split_cache.clear()
+        page = _two_table_page(self.LEFT, self.RIGHT, 70)
+        with patch('itau_pdf.detect_split_cols', wraps=itau_pdf.detect_split_cols) as detect:
+            assert itau_pdf.split_col_for_page(page) == 70
+            assert itau_pdf.split_col_for_page(page.replace("MERCADO", "PADARIA")) == 70
+        assert detect.call_count == 1
+
+    def test_misaligned_page_is_reparsed(self):
+        """When the first pass splits a page wrong, only that page is
+        re-read, at the column that reconciles it."""
+        import itau_pdf
+        pages = [
+            _two_table_page(self.LEFT, self.RIGHT, 70),
+            "Total dos lançamentos atuais 35,50",
+        ]
+        with patch('itau_pdf.split_col_for_page', return_value=itau_pdf.SPLIT_COL):
+            statement = itau_pdf._statement_from_pages(pages, "fatura.pdf")
+
+        assert statement["resumo"]["conferido"] is True
+        assert statement["reconciliacao"]["paginas_reprocessadas"] == [
+            {"pagina": 1, "coluna": 70}
+        ]
+        assert statement["reconciliacao"]["paginas"][0]["coluna"] == 70
+
+    def test_reparse_falls_back_to_the_fixed_split(self):
+        """A single-table page split wrong on the first pass is re-read at
+        SPLIT_COL even when no gutter is detected on it."""
+        import itau_pdf
+        pages = ["\n".join(self.LEFT), "Total dos lançamentos atuais 10,00"]
+        assert itau_pdf.detect_split_cols(pages[0]) == []
+        with patch('itau_pdf.split_col_for_page', return_value=20):
+            statement = itau_pdf._statement_from_pages(pages, "fatura.pdf")
+
+        assert statement["resumo"]["conferido"] is True
+        assert statement["reconciliacao"]["paginas_reprocessadas"] == [
+            {"pagina": 1, "coluna": itau_pdf.SPLIT_COL}
+        ]
+
+    def test_divergence_names_card_and_pages(self):
+        import itau_pdf
+        left = self.LEFT[:-1] + ["Lançamentos no cartão (final 1234)  12,00"]
+        statement = itau_pdf._statement_from_pages(
+            [_two_table_page(left, self.RIGHT, 95)], "fatura.pdf"
+        )
+
+        assert statement["resumo"]["conferido"] is False
+        assert statement["reconciliacao"]["paginas_reprocessadas"] == []
+        assert statement["reconciliacao"]["divergencias"] == [{
+            "cartao_final": "1234",
+            "total_calculado": 10.0,
+            "total_declarado": 12.0,
+            "diferenca": -2.0,
+            "paginas": [1],
+        }]
+        assert statement["reconciliacao"]["paginas"] == [{
+            "pagina": 1,
+            "coluna": 95,
+            "transacoes": 2,
+            "total_por_cartao": {"1234": 10.0, "5678": 25.5},
+        }]
+
+
+class TestTokenRefresh:
+    """Tests for JWT token refresh mechanism."""
+
+    def test_token_refresh_expiring_token(self, client, sample_jwt_token):
+        """Should refresh expiring tokens."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.get("/protected", headers=headers)
+        # Should either return 200 or set new cookie
+        assert response.status_code in [200, 401]
+
+
+def _time_entry_row(entry_id, hour=10):
+    return {
+        "id": entry_id,
+        "category_id": 1,
+        "start_time": datetime(2024, 1, 1, hour, 0),
+        "end_time": datetime(2024, 1, 1, hour + 1, 0),
+    }
+
+
+class TestCurrentUserId:
+    """Tests for resolving the caller's users.id from the JWT."""
+
+    @patch('app.get_cursor')
+    def test_uid_claim_is_checked_once_then_cached(self, mock_cursor_context, client, app_context):
+        """A token carrying uid is checked against the users table on a cache
+        miss, then goes straight to the index-only ownership check."""
+        from flask_jwt_extended import create_access_token
+        with app_context.app_context():
+            token = create_access_token(identity="testuser", additional_claims={"uid": 7})
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.side_effect = [{"id": 7}, _time_entry_row(3), _time_entry_row(4)]
+
+        for entry_id in (3, 4):
+            response = client.delete(
+                "/entry/delete",
+                json={"entry_id": entry_id},
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            assert response.status_code == 200
+        queries = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        assert sum("FROM users" in q for q in queries) == 1
+        assert "JOIN" not in queries[1]
+        assert mock_cursor.execute.call_args_list[1][0][1] == (3, 7)
+
+    @patch('app.get_cursor')
+    def test_stale_uid_claim_is_refused(self, mock_cursor_context, client, app_context):
+        """A uid that no longer belongs to the token's username (the user was
+        deleted and the name registered again) resolves to no user."""
+        from flask_jwt_extended import create_access_token
+        with app_context.app_context():
+            token = create_access_token(identity="testuser", additional_claims={"uid": 7})
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.return_value = {"id": 8}
+
+        response = client.get("/todo", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 404
+
+    @patch('app.get_cursor')
+    def test_uid_not_in_the_cache_is_revalidated(self, mock_cursor_context, client, app_context):
+        """A token for a re-registered username carries a uid the cache does
+        not hold; it is checked again rather than refused."""
+        from flask_jwt_extended import create_access_token
+        with app_context.app_context():
+            old = create_access_token(identity="testuser", additional_claims={"uid": 7})
+            new = create_access_token(identity="testuser", additional_claims={"uid": 8})
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.side_effect = [{"id": 7}, _time_entry_row(3), {"id": 8}, {"id": 8}]
+        mock_cursor.fetchall.return_value = []
+
+        response = client.delete(
+            "/entry/delete", json={"entry_id": 3}, headers={"Authorization": f"Bearer {old}"}
+        )
+        assert response.status_code == 200
+        response = client.get("/todo", headers={"Authorization": f"Bearer {new}"})
+        assert response.status_code == 200
+        response = client.get("/todo", headers={"Authorization": f"Bearer {old}"})
+        assert response.status_code == 404
+
+    @patch('app.USER_ID_CACHE_TTL_SECONDS', 0)
+    @patch('app.get_cursor')
+    def test_expired_lookup_is_repeated(self, mock_cursor_context, client, sample_jwt_token):
+        """Once an entry expires the user is looked up again, so a deleted
+        user's token stops working."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.side_effect = [{"id": 1}, _time_entry_row(3), None]
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.delete("/entry/delete", json={"entry_id": 3}, headers=headers)
+        assert response.status_code == 200
+        response = client.get("/todo", headers=headers)
+        assert response.status_code == 404
+
+    @patch('app.get_cursor')
+    def test_fallback_lookup_is_cached(self, mock_cursor_context, client, sample_jwt_token):
+        """Tokens without uid should hit the users table once, then the cache."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.side_effect = [{"id": 1}, _time_entry_row(3), _time_entry_row(4)]
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        for entry_id in (3, 4):
+            response = client.delete(
+                "/entry/delete", json={"entry_id": entry_id}, headers=headers
+            )
+            assert response.status_code == 200
+
+        queries = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        assert sum("FROM users" in q for q in queries) == 1
+
+    @patch('app.get_cursor')
+    def test_unknown_user_is_not_cached(self, mock_cursor_context, client, sample_jwt_token):
+        """A miss should be retried rather than remembered."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.return_value = None
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        for _ in range(2):
+            response = client.get("/todo", headers=headers)
+            assert response.status_code == 404
+
+        queries = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        assert sum("FROM users" in q for q in queries) == 2
+
+
+def _mock_cursor(mock_cursor_context):
+    """Helper to wire up a MagicMock cursor context manager and return it."""
+    mock_cursor = MagicMock()
+    mock_cursor.__enter__ = MagicMock(return_value=mock_cursor)
+    mock_cursor.__exit__ = MagicMock(return_value=False)
+    mock_cursor_context.return_value = mock_cursor
+    return mock_cursor
+
+
+def _todo_item_row(**overrides):
+    """A DB row shape matching the todo_items lookup joined for update/bulk-update."""
+    row = {
+        "id": 1,
+        "user_id": 1,
+        "category_id": 1,
+        "title": "Task",
+        "description": "",
+        "priority": "medium",
+        "status": "completed",
+        "due_date": None,
+        "recurrence_rule": "none",
+    }
+    row.update(overrides)
+    return row
+
+
+class TestListTodoCategories:
+    """Tests for the TODO categories listing endpoint."""
+
+    @patch('app.get_cursor')
+    def test_list_todo_categories_success(self, mock_cursor_context, client):
+        """Should return list of TODO categories."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchall.return_value = [
+            {"id": 1, "name": "Work"},
+            {"id": 2, "name": "Personal"},
+        ]
+
+        response = client.get("/todo/categories")
+        assert response.status_code == 200
+        data = response.get_json()
+        assert len(data["categories"]) == 2
+
+
+class TestCreateTodoCategory:
+    """Tests for the TODO category creation endpoint."""
+
+    def test_create_todo_category_missing_name(self, client, sample_jwt_token):
+        """Should fail without a name."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post("/todo/category", json={}, headers=headers)
+        assert response.status_code == 400
+
+    def test_create_todo_category_name_too_long(self, client, sample_jwt_token):
+        """Should fail with a name over 100 characters."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post(
+            "/todo/category", json={"name": "a" * 101}, headers=headers
+        )
+        assert response.status_code == 400
+
+    def test_create_todo_category_blank_name(self, client, sample_jwt_token):
+        """Should fail with a whitespace-only name."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post(
+            "/todo/category", json={"name": "   "}, headers=headers
+        )
+        assert response.status_code == 400
+
+    @patch('app.get_cursor')
+    def test_create_todo_category_already_exists(self, mock_cursor_context, client, sample_jwt_token):
+        """Should return 200 if the category already exists."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.return_value = {"id": 1, "name": "Work"}
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post(
+            "/todo/category", json={"name": "Work"}, headers=headers
+        )
+        assert response.status_code == 200
+
+    @patch('app.get_cursor')
+    def test_create_todo_category_success(self, mock_cursor_context, client, sample_jwt_token):
+        """Should create a new TODO category."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.return_value = None
+        mock_cursor.lastrowid = 5
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post(
+            "/todo/category", json={"name": "Errands"}, headers=headers
+        )
+        assert response.status_code == 201
+        data = response.get_json()
+        assert data["category"] == {"id": 5, "name": "Errands"}
+
+
+class TestCreateTodoItem:
+    """Tests for TODO item creation."""
+
+    def test_create_todo_item_missing_fields(self, client, sample_jwt_token):
+        """Should fail without title and category."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post("/todo/create", json={}, headers=headers)
+        assert response.status_code == 400
+
+    def test_create_todo_item_blank_title(self, client, sample_jwt_token):
+        """Should fail with a whitespace-only title."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post(
+            "/todo/create",
+            json={"title": "   ", "category": "Work"},
+            headers=headers,
+        )
+        assert response.status_code == 400
+
+    def test_create_todo_item_title_too_long(self, client, sample_jwt_token):
+        """Should fail with a title over 255 characters."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post(
+            "/todo/create",
+            json={"title": "a" * 256, "category": "Work"},
+            headers=headers,
+        )
+        assert response.status_code == 400
+
+    def test_create_todo_item_invalid_priority(self, client, sample_jwt_token):
+        """Should fail with an invalid priority."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post(
+            "/todo/create",
+            json={"title": "Task", "category": "Work", "priority": "urgent"},
+            headers=headers,
+        )
+        assert response.status_code == 400
+
+    def test_create_todo_item_due_date_without_timezone(self, client, sample_jwt_token):
+        """Should fail when due_date has no timezone offset."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post(
+            "/todo/create",
+            json={
+                "title": "Task",
+                "category": "Work",
+                "due_date": "2024-01-01T10:00:00",
+            },
+            headers=headers,
+        )
+        assert response.status_code == 400
+
+    def test_create_todo_item_invalid_due_date_format(self, client, sample_jwt_token):
+        """Should fail when due_date cannot be parsed."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post(
+            "/todo/create",
+            json={"title": "Task", "category": "Work", "due_date": "not-a-date"},
+            headers=headers,
+        )
+        assert response.status_code == 400
+
+    @patch('app.get_cursor')
+    def test_create_todo_item_user_not_found(self, mock_cursor_context, client, sample_jwt_token):
+        """Should fail with 404 if the JWT identity resolves to no DB user."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.return_value = None
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post(
+            "/todo/create",
+            json={"title": "Task", "category": "Work"},
+            headers=headers,
+        )
+        assert response.status_code == 404
+
+    @patch('app.get_cursor')
+    def test_create_todo_item_category_not_found(self, mock_cursor_context, client, sample_jwt_token):
+        """Should fail with 404 if the category does not exist."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.side_effect = [{"id": 1}, None]
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post(
+            "/todo/create",
+            json={"title": "Task", "category": "Nonexistent"},
+            headers=headers,
+        )
+        assert response.status_code == 404
+
+    @patch('app.get_cursor')
+    def test_create_todo_item_success(self, mock_cursor_context, client, sample_jwt_token):
+        """Should create a TODO item successfully."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.side_effect = [{"id": 1}, {"id": 2}]
+        mock_cursor.lastrowid = 10
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post(
+            "/todo/create",
+            json={"title": "Task", "category": "Work", "priority": "high"},
+            headers=headers,
+        )
+        assert response.status_code == 201
+        data = response.get_json()
+        assert data["item"]["id"] == 10
+        assert data["item"]["priority"] == "high"
+
+    @patch('app.get_cursor')
+    def test_create_todo_item_resolves_tags_as_a_set(self, mock_cursor_context, client, sample_jwt_token):
+        """Tags are found with one SELECT, the new ones created with one INSERT
+        IGNORE, and attached with one INSERT; repeats collapse case-insensitively."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.side_effect = [{"id": 1}, {"id": 2}]
+        mock_cursor.lastrowid = 10
+        mock_cursor.fetchall.side_effect = [
+            [{"id": 3, "name": "Work"}],                            # existing tags
+            [{"id": 7, "name": "Urgent"}],                          # created tags
+            [{"id": 7, "name": "Urgent"}, {"id": 3, "name": "Work"}],
+        ]
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post(
+            "/todo/create",
+            json={"title": "Task", "category": "Work", "tags": ["work", "Urgent", "WORK", " "]},
+            headers=headers,
+        )
+        assert response.status_code == 201
+        assert [t["name"] for t in response.get_json()["item"]["tags"]] == ["Urgent", "Work"]
+
+        statements = [c[0] for c in mock_cursor.execute.call_args_list]
+        created = [s for s in statements if s[0].startswith("INSERT INTO todo_tags")]
+        assert [s[1] for s in created] == [["Urgent"]]
+        attached = [s for s in statements if "todo_item_tags" in s[0]]
+        assert len(attached) == 1
+        assert attached[0][1] == [10, 3, 10, 7]
+
+
+class TestUpdateTodoItem:
+    """Tests for TODO item updates."""
+
+    def test_update_todo_item_no_body(self, client, sample_jwt_token):
+        """Should fail without a request body."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.put("/todo/1", json={}, headers=headers)
+        assert response.status_code == 400
+
+    def test_update_todo_item_invalid_priority(self, client, sample_jwt_token):
+        """Should fail with an invalid priority."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.put(
+            "/todo/1", json={"priority": "urgent"}, headers=headers
+        )
+        assert response.status_code == 400
+
+    def test_update_todo_item_invalid_status(self, client, sample_jwt_token):
+        """Should fail with an invalid status."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.put(
+            "/todo/1", json={"status": "done"}, headers=headers
+        )
+        assert response.status_code == 400
+
+    @patch('app.get_cursor')
+    def test_update_todo_item_not_found(self, mock_cursor_context, client, sample_jwt_token):
+        """Should fail with 404 if the item does not belong to the user."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.return_value = None
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.put(
             "/todo/1", json={"title": "New title"}, headers=headers
         )
         assert response.status_code == 404
@@ -627,6 +1949,27 @@ class TestUpdateTodoItem:
         data = response.get_json()
         assert data["id"] == 1
 
+    @patch('app.get_cursor')
+    def test_update_todo_item_writes_only_the_tag_diff(self, mock_cursor_context, client, sample_jwt_token):
+        """Replacing the tag set deletes the dropped tags and inserts the new ones only."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.side_effect = [{"id": 1}, _todo_item_row(status="pending")]
+        mock_cursor.fetchall.side_effect = [
+            [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}],  # both tags exist
+            [{"tag_id": 2}, {"tag_id": 5}],                    # current tags
+        ]
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.put("/todo/1", json={"tags": ["a", "b"]}, headers=headers)
+        assert response.status_code == 200
+
+        statements = [c[0] for c in mock_cursor.execute.call_args_list]
+        assert not any(s[0].startswith("INSERT INTO todo_tags") for s in statements)
+        deleted = [s for s in statements if s[0].startswith("DELETE FROM todo_item_tags")]
+        assert [s[1] for s in deleted] == [[1, 5]]
+        added = [s for s in statements if s[0].startswith("INSERT IGNORE INTO todo_item_tags")]
+        assert [s[1] for s in added] == [[1, 1]]
+
 
 class TestDeleteTodoItem:
     """Tests for TODO item deletion."""
@@ -683,8 +2026,10 @@ class TestBulkUpdateTodoItems:
     def test_bulk_update_mixed_results(self, mock_cursor_context, client, sample_jwt_token):
         """Should report per-item success/failure without aborting the batch."""
         mock_cursor = _mock_cursor(mock_cursor_context)
-        # item 1: found -> success; item 2: not found -> failure; item 3: bad status -> failure
-        mock_cursor.fetchone.side_effect = [_todo_item_row(), None]
+        # item 1: found -> success; item 2: not found -> failure;
+        # item 3: bad status -> failure
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.fetchall.return_value = [_todo_item_row()]
 
         headers = {"Authorization": f"Bearer {sample_jwt_token}"}
         response = client.post(
@@ -699,10 +2044,126 @@ class TestBulkUpdateTodoItems:
             headers=headers,
         )
         assert response.status_code == 200
-        data = response.get_json()
-        assert data["success"] == 1
-        assert data["failed"] == 2
-        assert len(data["errors"]) == 2
+        data = response.get_json()
+        assert data["success"] == 1
+        assert data["failed"] == 2
+        assert len(data["errors"]) == 2
+        assert [e["index"] for e in data["errors"]] == [1, 2]
+
+    @patch('app.get_cursor')
+    def test_bulk_update_coerces_numeric_item_ids(self, mock_cursor_context, client, sample_jwt_token):
+        """A numeric string item_id is read as the integer; anything else is
+        reported as a validation error, not as a missing item."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.fetchall.return_value = [_todo_item_row(id=5, status="pending")]
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post(
+            "/todo/bulk-update",
+            json={"updates": [
+                {"item_id": "5", "status": "in_progress"},
+                {"item_id": "abc", "status": "in_progress"},
+                {"item_id": 1.5, "status": "in_progress"},
+            ]},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data["success"] == 1
+        assert data["errors"] == [
+            {"index": 1, "error": "item_id must be an integer"},
+            {"index": 2, "error": "item_id must be an integer"},
+        ]
+        ownership_query, ownership_params = [
+            c[0] for c in mock_cursor.execute.call_args_list if "FROM todo_items" in c[0][0]
+        ][0]
+        assert ownership_params[1:] == [5]
+
+    @patch('app._spawn_next_recurrences')
+    @patch('app.get_cursor')
+    def test_bulk_update_spawns_only_on_final_completion(self, mock_cursor_context, mock_spawn, client, sample_jwt_token):
+        """An item completed and then set back to pending in the same batch
+        does not spawn its next occurrence; one whose last status completes
+        it does."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.fetchall.return_value = [
+            _todo_item_row(id=1, status="pending", recurrence_rule="daily"),
+            _todo_item_row(id=2, status="pending", recurrence_rule="daily"),
+        ]
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post(
+            "/todo/bulk-update",
+            json={"updates": [
+                {"item_id": 1, "status": "completed"},
+                {"item_id": 1, "status": "pending"},
+                {"item_id": 2, "status": "pending"},
+                {"item_id": 2, "status": "completed"},
+            ]},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        assert response.get_json()["success"] == 4
+        spawned = mock_spawn.call_args[0][1]
+        assert [item["id"] for item in spawned] == [2]
+
+    @patch('app.get_cursor')
+    def test_bulk_update_is_set_based(self, mock_cursor_context, client, sample_jwt_token):
+        """200 completions take one ownership query, one UPDATE and one batched
+        spawn of the recurring items' next occurrences, tags and series
+        included; the user's series are extended once."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        due = datetime(2024, 1, 1, 9, 0)
+        items = [
+            _todo_item_row(id=n, status="pending", due_date=due,
+                           recurrence_rule="weekly" if n <= 3 else "none")
+            for n in range(1, 201)
+        ]
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.fetchall.side_effect = [
+            items,                                          # ownership check
+            [{"recurrence_parent_id": 3}],                  # item 3 spawned before
+            [{"head_item_id": 1, "dtstart": due - timedelta(weeks=4)}],  # item 1's series
+            [{"id": 501, "recurrence_parent_id": 1},        # the new occurrences
+             {"id": 502, "recurrence_parent_id": 2}],
+            [{"todo_id": 1, "tag_id": 7}, {"todo_id": 2, "tag_id": 7},
+             {"todo_id": 2, "tag_id": 8}],                  # their parents' tags
+            [],                                             # series to extend
+        ]
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post(
+            "/todo/bulk-update",
+            json={"updates": [{"item_id": n, "status": "completed"} for n in range(1, 201)]},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        assert response.get_json() == {"success": 200, "failed": 0, "errors": []}
+        assert mock_cursor_context.call_count == 2  # user lookup, then the batch
+
+        statements = [c[0] for c in mock_cursor.execute.call_args_list]
+        updates = [s for s in statements if s[0].lstrip().startswith("UPDATE todo_items")]
+        assert len(updates) == 1
+        assert updates[0][1][0] == "completed"
+        assert updates[0][1][2:] == list(range(1, 201))
+
+        spawned = [s for s in statements if s[0].lstrip().startswith("INSERT INTO todo_items")]
+        assert len(spawned) == 1
+        assert spawned[0][1][5] == due + timedelta(weeks=1)
+        assert spawned[0][1][7::8] == [1, 2]
+
+        reheaded = [s for s in statements if s[0].lstrip().startswith("UPDATE todo_series")]
+        assert [s[1] for s in reheaded] == [[1, 501, 1]]
+
+        tagged = [s for s in statements if s[0].startswith("INSERT IGNORE INTO todo_item_tags")]
+        assert [s[1] for s in tagged] == [[501, 7, 502, 7, 502, 8]]
+
+        # Item 2 had no series; its successor starts one.
+        synced = [s for s in statements if s[0].lstrip().startswith("INSERT INTO todo_series")]
+        assert [s[1] for s in synced] == [[1]]
+        assert len(statements) == 12
 
 
 class TestMyTodoItems:
@@ -750,6 +2211,112 @@ class TestMyTodoItems:
         assert data["items"][0]["completed_at"] is None
         assert data["items"][0]["tags"] == []
 
+    def test_my_todo_items_invalid_status(self, client, sample_jwt_token):
+        """Should reject a status filter that is not a TODO status."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.get("/todo?status=done", headers=headers)
+        assert response.status_code == 400
+
+    def test_my_todo_items_due_window_inverted(self, client, sample_jwt_token):
+        """Should reject an empty or inverted due window."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.get(
+            "/todo?due_from=2024-01-08T00:00:00Z&due_to=2024-01-01T00:00:00Z",
+            headers=headers,
+        )
+        assert response.status_code == 400
+
+    def test_my_todo_items_invalid_cursor(self, client, sample_jwt_token):
+        """Should reject a cursor it did not hand out."""
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.get("/todo?cursor=not-a-cursor", headers=headers)
+        assert response.status_code == 400
+
+    @patch('app.get_cursor')
+    def test_my_todo_items_filters(self, mock_cursor_context, client, sample_jwt_token):
+        """Filters become SQL predicates; with no limit the list is unpaginated."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.fetchall.return_value = []
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.get(
+            "/todo?status=pending&status=in_progress&category=Work&tag=home&tag=urgent"
+            "&due_to=2024-02-01T00:00:00Z&q=50%25_off",
+            headers=headers,
+        )
+        assert response.status_code == 200
+        assert "next_cursor" not in response.get_json()
+
+        query, params = mock_cursor.execute.call_args[0]
+        assert "ti.status IN (%s, %s)" in query
+        assert query.count("EXISTS") == 2
+        assert "LIMIT" not in query
+        assert "ORDER BY ti.priority_rank ASC, ti.due_date ASC, ti.id DESC" in query
+        assert params == [
+            1, "in_progress", "pending", "Work", "home", "urgent",
+            datetime(2024, 2, 1), "%50\\%\\_off%", "%50\\%\\_off%",
+        ]
+
+    @patch('app.get_cursor')
+    def test_paged_status_filter_reads_one_index_range_per_status(self, mock_cursor_context, client, sample_jwt_token):
+        """A page over several statuses takes a page per status in index
+        order and merges them, rather than sorting every match."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.fetchall.return_value = []
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.get("/todo?status=pending&status=in_progress&limit=5", headers=headers)
+        assert response.status_code == 200
+
+        query, params = mock_cursor.execute.call_args[0]
+        assert "IN (" not in query
+        assert query.count("ti.status = %s") == 2
+        assert query.count("UNION ALL") == 1
+        assert params == [1, "in_progress", 6, 1, "pending", 6, 6]
+
+    @patch('app.get_cursor')
+    def test_my_todo_items_keyset_pages(self, mock_cursor_context, client, sample_jwt_token):
+        """A full page hands back a cursor, and the cursor resumes after its last row."""
+        from app import _decode_todo_cursor
+
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        now = datetime(2024, 1, 1, 9, 0)
+        rows = [
+            {
+                "id": item_id, "category": "Work", "title": "Task", "description": "",
+                "priority": "high", "status": "pending", "due_date": due,
+                "recurrence_rule": "none", "recurrence_parent_id": None,
+                "completed_at": None, "created_at": now, "updated_at": now,
+            }
+            for item_id, due in ((9, None), (4, now), (3, now))
+        ]
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.fetchall.side_effect = [rows, []]
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.get("/todo?limit=2", headers=headers)
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [item["id"] for item in data["items"]] == [9, 4]
+        assert _decode_todo_cursor(data["next_cursor"]) == (1, now, 4)
+
+        # After the user lookup: the page, with one row to spare, then its tags
+        list_query, list_params = mock_cursor.execute.call_args_list[1][0]
+        assert list_params[-1] == 3
+        tag_query, tag_params = mock_cursor.execute.call_args_list[2][0]
+        assert tag_params == [9, 4]  # tags are fetched for the page only
+
+        mock_cursor.execute.reset_mock()
+        mock_cursor.fetchall.side_effect = [[]]
+        response = client.get(f"/todo?limit=2&cursor={data['next_cursor']}", headers=headers)
+        assert response.status_code == 200
+        assert response.get_json()["next_cursor"] is None
+        query, params = mock_cursor.execute.call_args[0]
+        assert "ti.due_date = %s AND ti.id < %s" in query
+        assert params[1:] == [1, 1, now, now, 4, 3]
+
 
 class TestPomodoroStart:
     """Tests for starting a Pomodoro session."""
@@ -789,6 +2356,14 @@ class TestPomodoroStart:
         data = response.get_json()
         assert data["session_id"] == 7
 
+        # Abandoned sessions are the reaper's job: starting inserts the
+        # session and points the user's active slot at it, nothing more.
+        statements = [c[0] for c in mock_cursor.execute.call_args_list[1:]]
+        assert len(statements) == 2
+        assert statements[0][0].lstrip().startswith("INSERT INTO pomodoro_sessions")
+        assert statements[1][0].lstrip().startswith("INSERT INTO active_pomodoro")
+        assert statements[1][1][:2] == (1, 7)
+
     @patch('app.get_cursor')
     def test_start_pomodoro_success_with_todo(self, mock_cursor_context, client, sample_jwt_token):
         """Should start a session linked to a valid TODO item."""
@@ -803,6 +2378,47 @@ class TestPomodoroStart:
         assert response.status_code == 201
 
 
+class TestPomodoroReaper:
+    """Tests for the abandoned-session reaper and its leader election."""
+
+    @patch('app.get_cursor')
+    def test_reaper_cancels_in_batches(self, mock_cursor_context):
+        from app import reap_stale_pomodoro_sessions
+
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchall.side_effect = [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+
+        assert reap_stale_pomodoro_sessions(stale_after_minutes=60, batch_size=2) == 3
+        assert mock_cursor_context.call_count == 2
+
+        updates = [c[0] for c in mock_cursor.execute.call_args_list if c[0][0].startswith("UPDATE")]
+        assert [params for _, params in updates] == [[1, 2], [3]]
+        released = [c[0] for c in mock_cursor.execute.call_args_list if "active_pomodoro" in c[0][0]]
+        assert [params for _, params in released] == [[1, 2], [3]]
+        cutoff = mock_cursor.execute.call_args_list[0][0][1][0]
+        assert cutoff < datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(minutes=59)
+
+    @patch('app.reap_stale_pomodoro_sessions')
+    @patch('app.mysql.connector.connect')
+    def test_only_the_lock_holder_reaps(self, mock_connect, mock_reap):
+        """Workers that do not get the advisory lock keep trying, without reaping."""
+        from app import _run_pomodoro_reaper
+
+        lock_cursor = MagicMock()
+        lock_cursor.fetchone.side_effect = [(0,), (1,)]
+        mock_connect.return_value.cursor.return_value = lock_cursor
+        mock_connect.return_value.is_connected.return_value = True
+        mock_reap.return_value = 0
+
+        stop = MagicMock()
+        stop.wait.side_effect = [False, False, False, True]
+        _run_pomodoro_reaper(stop)
+
+        assert lock_cursor.execute.call_count == 2  # once refused, once taken and kept
+        assert "GET_LOCK" in lock_cursor.execute.call_args[0][0]
+        assert mock_reap.call_count == 2
+        assert mock_connect.call_count == 1
+
 class TestPomodoroComplete:
     """Tests for completing a Pomodoro session."""
 
@@ -844,7 +2460,8 @@ class TestPomodoroComplete:
     def test_complete_pomodoro_not_found(self, mock_cursor_context, client, sample_jwt_token):
         """Should fail with 404 if the session is not owned by the user."""
         mock_cursor = _mock_cursor(mock_cursor_context)
-        mock_cursor.fetchone.return_value = None
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.rowcount = 0
 
         headers = {"Authorization": f"Bearer {sample_jwt_token}"}
         response = client.post(
@@ -859,6 +2476,7 @@ class TestPomodoroComplete:
         """Should complete the session successfully."""
         mock_cursor = _mock_cursor(mock_cursor_context)
         mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.rowcount = 1
 
         headers = {"Authorization": f"Bearer {sample_jwt_token}"}
         response = client.post(
@@ -868,6 +2486,29 @@ class TestPomodoroComplete:
         )
         assert response.status_code == 200
 
+    @patch('app.get_cursor')
+    def test_complete_pomodoro_is_compare_and_swap(self, mock_cursor_context, client, sample_jwt_token):
+        """Completing takes no lookup: the UPDATE only matches an in-progress
+        session of the user's, and the active slot is freed only if it still
+        holds that session."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.rowcount = 1
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post(
+            "/pomodoro/complete",
+            json={"session_id": 5, "duration_seconds": 1500},
+            headers=headers,
+        )
+        assert response.status_code == 200
+
+        update, release = [c[0] for c in mock_cursor.execute.call_args_list[1:]]
+        assert "status = 'in_progress'" in update[0] and update[1] == (1500, 5, 1)
+        assert release == (
+            "DELETE FROM active_pomodoro WHERE user_id = %s AND session_id = %s", (1, 5),
+        )
+
 
 class TestPomodoroCancel:
     """Tests for cancelling a Pomodoro session."""
@@ -882,7 +2523,8 @@ class TestPomodoroCancel:
     def test_cancel_pomodoro_not_found(self, mock_cursor_context, client, sample_jwt_token):
         """Should fail with 404 if the session doesn't exist or is already completed."""
         mock_cursor = _mock_cursor(mock_cursor_context)
-        mock_cursor.fetchone.return_value = None
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.rowcount = 0
 
         headers = {"Authorization": f"Bearer {sample_jwt_token}"}
         response = client.post(
@@ -895,6 +2537,7 @@ class TestPomodoroCancel:
         """Should cancel the session successfully."""
         mock_cursor = _mock_cursor(mock_cursor_context)
         mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.rowcount = 1
 
         headers = {"Authorization": f"Bearer {sample_jwt_token}"}
         response = client.post(
@@ -903,6 +2546,39 @@ class TestPomodoroCancel:
         assert response.status_code == 200
 
 
+class TestActivePomodoro:
+    """Tests for the active-session slot."""
+
+    @patch('app.get_cursor')
+    def test_active_session(self, mock_cursor_context, client, sample_jwt_token):
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        started = datetime(2024, 1, 1, 9, 0)
+        mock_cursor.fetchone.side_effect = [
+            {"id": 1},
+            {"session_id": 7, "session_type": "pomodoro", "todo_id": 5,
+             "todo_title": "Write report", "started_at": started},
+        ]
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.get("/pomodoro/active", headers=headers)
+        assert response.status_code == 200
+        active = response.get_json()["active"]
+        assert active["session_id"] == 7
+        assert active["started_at"] == started.isoformat()
+
+        query, params = mock_cursor.execute.call_args[0]
+        assert "FROM active_pomodoro ap" in query and params == (1,)
+
+    @patch('app.get_cursor')
+    def test_no_active_session(self, mock_cursor_context, client, sample_jwt_token):
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.side_effect = [{"id": 1}, None]
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.get("/pomodoro/active", headers=headers)
+        assert response.status_code == 200
+        assert response.get_json() == {"active": None}
+
 class TestMyPomodoroSessions:
     """Tests for the current user's Pomodoro session listing."""
 
@@ -941,6 +2617,139 @@ class TestMyPomodoroSessions:
         assert data["sessions"][0]["session_date"] == now.isoformat()
 
 
+def _mock_streaming_pool(mock_get_pool, batches):
+    """Wire get_pool() to hand out a connection whose cursor returns
+    `batches` from successive fetchmany() calls, then nothing."""
+    stream_cursor = MagicMock()
+    stream_cursor.fetchmany.side_effect = list(batches) + [[]]
+    connection = MagicMock()
+    connection.cursor.return_value = stream_cursor
+    mock_get_pool.return_value.get_connection.return_value = connection
+    return connection, stream_cursor
+
+
+class TestNdjsonStreaming:
+    """Tests for the Accept: application/x-ndjson mode of the list endpoints."""
+
+    NDJSON = {"Accept": "application/x-ndjson"}
+
+    @patch('db.get_pool')
+    @patch('app.get_cursor')
+    def test_entries_stream_one_line_per_row(self, mock_cursor_context, mock_get_pool, client, sample_jwt_token):
+        """Each row should arrive as its own JSON line, read batch by batch."""
+        import json
+
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.return_value = {"id": 1}
+        connection, stream_cursor = _mock_streaming_pool(mock_get_pool, [
+            [{"id": 1, "category": "Work", "duration_seconds": 60}],
+            [{"id": 2, "category": "Study", "duration_seconds": 120}],
+        ])
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}", **self.NDJSON}
+        response = client.get("/entry", headers=headers)
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [line["id"] for line in lines] == [1, 2]
+
+        # Streamed off an unbuffered cursor, and the connection goes back
+        connection.cursor.assert_called_once_with(dictionary=True, buffered=False)
+        mock_cursor.fetchall.assert_not_called()
+        connection.close.assert_called_once()
+
+    @patch('db.get_pool')
+    @patch('app.get_cursor')
+    def test_finance_stream_converts_prices(self, mock_cursor_context, mock_get_pool, client, sample_jwt_token):
+        """Streamed finance rows should carry float prices like the JSON list."""
+        import json
+        from decimal import Decimal
+
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.return_value = {"id": 1}
+        _mock_streaming_pool(mock_get_pool, [[{"id": 1, "price": Decimal("9.90")}]])
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}", **self.NDJSON}
+        response = client.get("/finance", headers=headers)
+        assert json.loads(response.get_data(as_text=True)) == {"id": 1, "price": 9.9}
+
+    @patch('db.get_pool')
+    @patch('app.get_cursor')
+    def test_stream_reports_error_in_band(self, mock_cursor_context, mock_get_pool, client, sample_jwt_token):
+        """A failure after the headers went out should end the stream with an error line."""
+        import json
+        from mysql.connector import Error
+
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.return_value = {"id": 1}
+        _, stream_cursor = _mock_streaming_pool(mock_get_pool, [])
+        stream_cursor.fetchmany.side_effect = Error("lost connection")
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}", **self.NDJSON}
+        response = client.get("/pomodoro/sessions", headers=headers)
+        assert response.status_code == 200
+        assert "error" in json.loads(response.get_data(as_text=True))
+
+    @patch('app.STREAM_BATCH_SIZE', 2)
+    @patch('db.get_pool')
+    @patch('app.get_cursor')
+    def test_todo_stream_pages_on_one_connection(self, mock_cursor_context, mock_get_pool, client, sample_jwt_token):
+        """TODO items stream a keyset page at a time, each page's tags looked
+        up on the connection that read it rather than a second one."""
+        import json
+
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        now = datetime(2024, 1, 1, 9, 0)
+        rows = [
+            {
+                "id": item_id, "category": "Work", "title": "Task", "description": "",
+                "priority": "high", "status": "pending", "due_date": now,
+                "recurrence_rule": "none", "recurrence_parent_id": None,
+                "completed_at": None, "created_at": now, "updated_at": now,
+            }
+            for item_id in (9, 4, 3)
+        ]
+        mock_cursor.fetchone.return_value = {"id": 1}
+        # Page one (with the row to spare), its tags, page two, its tags
+        mock_cursor.fetchall.side_effect = [rows, [], rows[2:], []]
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}", **self.NDJSON}
+        response = client.get("/todo", headers=headers)
+        assert response.status_code == 200
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [line["id"] for line in lines] == [9, 4, 3]
+
+        pages = [
+            call[0] for call in mock_cursor.execute.call_args_list
+            if "ti.title" in call[0][0]
+        ]
+        assert len(pages) == 2
+        assert pages[0][1][-1] == 3
+        assert pages[1][1][-3:] == [now, 4, 3]  # resumes after item 4
+        mock_get_pool.return_value.get_connection.assert_not_called()
+
+    @patch('app.get_cursor')
+    def test_stream_user_not_found(self, mock_cursor_context, client, sample_jwt_token):
+        """The user lookup happens before streaming, so a 404 is still possible."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.return_value = None
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}", **self.NDJSON}
+        response = client.get("/todo", headers=headers)
+        assert response.status_code == 404
+
+
+def _pomodoro_stats_row(**overrides):
+    row = {
+        "total_count": 10, "total_seconds": 15000,
+        "today_count": 2, "today_seconds": 3000,
+        "week_count": 5, "week_seconds": 7500,
+        "break_count": 1, "break_seconds": 300,
+    }
+    row.update(overrides)
+    return row
+
+
 class TestPomodoroStats:
     """Tests for Pomodoro statistics."""
 
@@ -960,10 +2769,7 @@ class TestPomodoroStats:
         mock_cursor = _mock_cursor(mock_cursor_context)
         mock_cursor.fetchone.side_effect = [
             {"id": 1},  # user lookup
-            {"count": 10, "total_seconds": 15000},  # total (focus)
-            {"count": 2, "total_seconds": 3000},  # today (focus)
-            {"count": 5, "total_seconds": 7500},  # week (focus)
-            {"count": 1, "total_seconds": 300},  # today's breaks
+            _pomodoro_stats_row(),
         ]
 
         headers = {"Authorization": f"Bearer {sample_jwt_token}"}
@@ -975,6 +2781,333 @@ class TestPomodoroStats:
         assert data["stats"]["week"]["sessions"] == 5
         assert data["stats"]["today_breaks"]["total_seconds"] == 300
 
+        # One aggregate query, with range predicates rather than DATE().
+        stats_queries = [c[0][0] for c in mock_cursor.execute.call_args_list
+                         if "pomodoro_sessions" in c[0][0]]
+        assert len(stats_queries) == 1
+        assert "DATE(" not in stats_queries[0]
+
+    @patch('app.get_cursor')
+    def test_pomodoro_stats_cached_until_complete(self, mock_cursor_context, client, app_context):
+        """Repeated polls are served from cache; completing a session refreshes it."""
+        from flask_jwt_extended import create_access_token
+        with app_context.app_context():
+            token = create_access_token(identity="testuser", additional_claims={"uid": 1})
+        headers = {"Authorization": f"Bearer {token}"}
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.side_effect = [
+            {"id": 1},  # the uid claim checked against the user, once
+            _pomodoro_stats_row(),
+            _pomodoro_stats_row(total_count=11),
+        ]
+        mock_cursor.rowcount = 1  # the session being completed
+
+        assert client.get("/pomodoro/stats", headers=headers).status_code == 200
+        assert client.get("/pomodoro/stats", headers=headers).status_code == 200
+        assert mock_cursor.fetchone.call_count == 2
+
+        response = client.post(
+            "/pomodoro/complete",
+            json={"session_id": 5, "duration_seconds": 1500},
+            headers=headers,
+        )
+        assert response.status_code == 200
+
+        data = client.get("/pomodoro/stats", headers=headers).get_json()
+        assert data["stats"]["total"]["sessions"] == 11
+
+
+
+class TestArchiveHistory:
+    """Tests for the archive tier and the history reads over it."""
+
+    @patch('archive.get_cursor')
+    def test_archive_moves_batches_sessions_first(self, mock_cursor_context):
+        """Sessions are archived before items, one transaction per batch, until
+        a short batch shows nothing is left."""
+        from archive import archive_history
+
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchall.side_effect = [
+            [{"id": 1}, {"id": 2}],  # a full batch of sessions
+            [],                      # no more sessions
+            [{"id": 7}],             # a short batch of items
+        ]
+
+        assert archive_history(days=30, batch_size=2) == {
+            "pomodoro_sessions": 2, "todo_items": 1,
+        }
+        assert mock_cursor_context.call_count == 3
+
+        statements = [" ".join(c[0][0].split()) for c in mock_cursor.execute.call_args_list]
+        moves = [s.split(" (")[0] for s in statements if not s.startswith("SELECT")]
+        assert moves == [
+            "INSERT INTO pomodoro_sessions_archive",
+            "INSERT INTO pomodoro_archived_totals",
+            "DELETE FROM pomodoro_sessions WHERE id IN",
+            "INSERT INTO todo_items_archive",
+            "INSERT INTO todo_item_tags_archive",
+            "DELETE FROM todo_items WHERE id IN",
+        ]
+        assert mock_cursor.execute.call_args_list[-1][0][1] == [7]
+        assert "NOT EXISTS (SELECT 1 FROM pomodoro_sessions" in statements[-4]
+
+    def test_archive_keeps_the_last_week(self):
+        """Stats read the last week from the hot table, so it is never archived."""
+        from archive import archive_history
+        from archive_history import main
+
+        with pytest.raises(ValueError):
+            archive_history(days=3)
+        with pytest.raises(SystemExit):
+            main(["--days", "3"])
+
+    @patch('app.get_cursor')
+    def test_todo_history_reads_the_archive(self, mock_cursor_context, client, sample_jwt_token):
+        """history=true merges archived items and their tags into the page."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        now = datetime(2024, 1, 1, 9, 0)
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.fetchall.side_effect = [
+            [{
+                "id": 3, "category": "Work", "title": "Old", "description": "",
+                "priority": "low", "status": "completed", "due_date": None,
+                "recurrence_rule": "none", "recurrence_parent_id": None,
+                "completed_at": now, "created_at": now, "updated_at": now,
+            }],
+            [{"todo_id": 3, "id": 4, "name": "home"}],
+        ]
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.get("/todo?history=true&limit=2", headers=headers)
+        assert response.status_code == 200
+        assert response.get_json()["items"][0]["tags"] == [{"id": 4, "name": "home"}]
+
+        query, params = mock_cursor.execute.call_args_list[1][0]
+        assert "UNION ALL" in query and "FROM todo_items_archive ti" in query
+        assert params.count(3) == 3  # one spare row per table, and overall
+        tag_query, _ = mock_cursor.execute.call_args_list[2][0]
+        assert "todo_item_tags_archive" in tag_query
+
+    @patch('app.get_cursor')
+    def test_pomodoro_history_reads_the_archive(self, mock_cursor_context, client, sample_jwt_token):
+        """Only history=true reads archived sessions."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.fetchall.return_value = []
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        assert client.get("/pomodoro/sessions", headers=headers).status_code == 200
+        query, _ = mock_cursor.execute.call_args[0]
+        assert "pomodoro_sessions_archive" not in query
+
+        assert client.get("/pomodoro/sessions?history=true", headers=headers).status_code == 200
+        query, params = mock_cursor.execute.call_args[0]
+        assert "FROM pomodoro_sessions_archive" in query
+        # Each branch is cut to a page in its own index order before the merge
+        assert " ".join(query.split()).count("ORDER BY session_date DESC LIMIT %s") == 1
+        assert " ".join(query.split()).count("ORDER BY ps.session_date DESC LIMIT %s") == 2
+        assert params == [1, 100, 1, 100, 100]
+
+
+
+class TestRecurrence:
+    """Tests for the recurrence engine and the materialized occurrences."""
+
+    def test_monthly_occurrences_keep_the_start_day(self):
+        """Short months clamp one occurrence, not every one after it."""
+        from recurrence import next_occurrence, occurrences
+        start = datetime(2024, 1, 31, 9, 0)
+        assert occurrences("monthly", start, start, datetime(2024, 6, 1)) == [
+            datetime(2024, 1, 31, 9, 0), datetime(2024, 2, 29, 9, 0),
+            datetime(2024, 3, 31, 9, 0), datetime(2024, 4, 30, 9, 0),
+            datetime(2024, 5, 31, 9, 0),
+        ]
+        assert next_occurrence("monthly", start, datetime(2024, 2, 29, 9, 0)) == datetime(2024, 3, 31, 9, 0)
+
+    def test_window_is_expanded_without_walking_the_series(self):
+        from recurrence import occurrences
+        start = datetime(2020, 1, 6, 8, 0)
+        window = occurrences("FREQ=WEEKLY;INTERVAL=2", start, datetime(2024, 1, 1), datetime(2024, 2, 1))
+        assert window == [
+            datetime(2024, 1, 1, 8, 0), datetime(2024, 1, 15, 8, 0), datetime(2024, 1, 29, 8, 0),
+        ]
+
+    def test_invalid_rules_are_rejected(self):
+        from recurrence import parse_rule
+        assert parse_rule("daily") == ("DAILY", 1)
+        assert parse_rule("FREQ=YEARLY;INTERVAL=2") == ("YEARLY", 2)
+        for rule in ("hourly", "FREQ=HOURLY", "FREQ=DAILY;INTERVAL=0", "FREQ=DAILY;COUNT=3"):
+            with pytest.raises(ValueError):
+                parse_rule(rule)
+
+    @patch('app.get_cursor')
+    def test_completion_spawns_from_the_series_start(self, mock_cursor_context, client, sample_jwt_token):
+        """The next occurrence is counted from the series' start and the series
+        moves on to it."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.side_effect = [
+            {"id": 1},
+            _todo_item_row(status="pending", recurrence_rule="monthly",
+                           due_date=datetime(2024, 2, 29, 9, 0)),
+        ]
+        mock_cursor.fetchall.side_effect = [
+            [],                                                    # no earlier spawn
+            [{"head_item_id": 1, "dtstart": datetime(2024, 1, 31, 9, 0)}],
+            [{"id": 9, "recurrence_parent_id": 1}],
+            [],                                                    # no tags
+        ]
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.put("/todo/1", json={"status": "completed"}, headers=headers)
+        assert response.status_code == 200
+
+        statements = [c[0] for c in mock_cursor.execute.call_args_list]
+        spawned = [s for s in statements if s[0].lstrip().startswith("INSERT INTO todo_items")]
+        assert spawned[0][1][5] == datetime(2024, 3, 31, 9, 0)
+        reheaded = [s for s in statements if s[0].lstrip().startswith("UPDATE todo_series")]
+        assert [s[1] for s in reheaded] == [[1, 9, 1]]
+
+    @patch('app.get_cursor')
+    def test_new_due_date_restarts_the_series(self, mock_cursor_context, client, sample_jwt_token):
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.side_effect = [{"id": 1}, _todo_item_row(status="pending")]
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.put(
+            "/todo/1", json={"due_date": "2024-05-01T09:00:00Z"}, headers=headers
+        )
+        assert response.status_code == 200
+        statements = [c[0] for c in mock_cursor.execute.call_args_list]
+        assert ("DELETE FROM todo_series WHERE head_item_id = %s", (1,)) in statements
+
+    def test_occurrences_window_is_validated(self, client, sample_jwt_token):
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.get("/todo/occurrences?from=2024-01-01T00:00:00Z", headers=headers)
+        assert response.status_code == 400
+        far = (datetime.now(timezone.utc) + timedelta(days=1000)).isoformat()
+        response = client.get(
+            "/todo/occurrences", query_string={"from": "2024-01-01T00:00:00Z", "to": far},
+            headers=headers,
+        )
+        assert response.status_code == 400
+
+    @patch('app.get_cursor')
+    def test_occurrences_only_read(self, mock_cursor_context, client, sample_jwt_token):
+        """The GET reads the stored occurrences and writes nothing."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+        mock_cursor.fetchone.return_value = {"id": 1}
+        mock_cursor.fetchall.return_value = [
+            {"series_id": 5, "item_id": 2, "title": "Water plants", "category": "Home",
+             "priority": "low", "due_date": now + timedelta(days=1)},
+        ]
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.get(
+            "/todo/occurrences",
+            query_string={"from": now.isoformat() + "Z",
+                          "to": (now + timedelta(days=10)).isoformat() + "Z"},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        assert response.get_json()["occurrences"][0]["item_id"] == 2
+
+        statements = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        assert all(s.lstrip().startswith("SELECT") for s in statements)
+        mock_cursor.executemany.assert_not_called()
+
+    def test_user_series_extend_from_the_high_water_mark(self):
+        """Only the part of the horizon past a series' mark is expanded."""
+        from todo_series import extend_user_series
+
+        cursor = MagicMock()
+        now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+        mark = now + timedelta(days=7)
+        dtstart = now - timedelta(days=30, hours=12)
+        cursor.fetchall.return_value = [
+            {"id": 5, "user_id": 1, "rule": "daily", "dtstart": dtstart, "materialized_until": mark},
+        ]
+
+        assert extend_user_series(cursor, 1, days=10) == 3
+        rows = cursor.executemany.call_args[0][1]
+        assert [due for _, due, _ in rows] == [
+            mark + timedelta(hours=12) + timedelta(days=n) for n in range(3)
+        ]
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        assert "INSERT INTO todo_series" in statements[0]
+
+    @patch('app.get_cursor')
+    def test_interval_rule_end_to_end(self, mock_cursor_context, client, sample_jwt_token):
+        """An every-other-year rule is stored normalized, starts its series on
+        create, and its completion spawns two years on."""
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        mock_cursor.fetchone.side_effect = [{"id": 1}, {"id": 2}]
+        mock_cursor.fetchall.return_value = []
+        mock_cursor.lastrowid = 10
+
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        response = client.post(
+            "/todo/create",
+            json={"title": "Renew passport", "category": "Home",
+                  "due_date": "2024-02-29T09:00:00Z",
+                  "recurrence_rule": "freq=yearly; interval=2"},
+            headers=headers,
+        )
+        assert response.status_code == 201
+        assert response.get_json()["item"]["recurrence_rule"] == "FREQ=YEARLY;INTERVAL=2"
+        statements = [c[0] for c in mock_cursor.execute.call_args_list]
+        created = [s for s in statements if s[0].lstrip().startswith("INSERT INTO todo_items")]
+        assert created[0][1][6] == "FREQ=YEARLY;INTERVAL=2"
+        assert any(s[0].lstrip().startswith("INSERT INTO todo_series") for s in statements)
+
+        mock_cursor.reset_mock()
+        mock_cursor.fetchone.side_effect = [
+            _todo_item_row(id=10, status="pending", recurrence_rule="FREQ=YEARLY;INTERVAL=2",
+                           due_date=datetime(2024, 2, 29, 9, 0)),
+        ]
+        mock_cursor.fetchall.side_effect = [
+            [],                                                    # no earlier spawn
+            [{"head_item_id": 10, "dtstart": datetime(2024, 2, 29, 9, 0)}],
+            [{"id": 11, "recurrence_parent_id": 10}],
+            [],                                                    # no tags
+        ]
+        response = client.put("/todo/10", json={"status": "completed"}, headers=headers)
+        assert response.status_code == 200
+        statements = [c[0] for c in mock_cursor.execute.call_args_list]
+        spawned = [s for s in statements if s[0].lstrip().startswith("INSERT INTO todo_items")]
+        assert spawned[0][1][5] == datetime(2026, 2, 28, 9, 0)
+        assert spawned[0][1][6] == "FREQ=YEARLY;INTERVAL=2"
+
+    def test_invalid_recurrence_rules_are_refused(self, client, sample_jwt_token):
+        headers = {"Authorization": f"Bearer {sample_jwt_token}"}
+        for rule in ("hourly", "FREQ=DAILY;INTERVAL=1000", "FREQ=WEEKLY;BYDAY=MO", 7):
+            response = client.post(
+                "/todo/create",
+                json={"title": "Task", "category": "Work", "recurrence_rule": rule},
+                headers=headers,
+            )
+            assert response.status_code == 400
+            assert "recurrence_rule" in response.get_json()["error"]
+
+    @patch('todo_series.get_cursor')
+    def test_horizon_job_extends_in_batches(self, mock_cursor_context):
+        from todo_series import extend_recurrence_horizon
+        from extend_recurrences import main
+
+        mock_cursor = _mock_cursor(mock_cursor_context)
+        start = datetime(2024, 1, 1, 9, 0)
+        series = [{"id": n, "user_id": 1, "rule": "weekly", "dtstart": start,
+                   "materialized_until": start} for n in (1, 2)]
+        mock_cursor.fetchall.side_effect = [series, []]
+
+        extended = extend_recurrence_horizon(days=14, batch_size=2)
+        assert extended["series"] == 2
+        assert extended["occurrences"] == len(mock_cursor.executemany.call_args[0][1])
+        assert mock_cursor_context.call_count == 3  # series sync, then two batches
+
+        with pytest.raises(SystemExit):
+            main(["--days", "1000"])
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
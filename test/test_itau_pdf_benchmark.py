@@ -0,0 +1,186 @@
+"""
+Throughput of the Itau statement line scanner on bulk historical imports.
+
+Runs the current scanner and the original one it replaced (kept below as
+`_legacy_parse_transactions`) over synthetic 50-page statements laid out
+like `pdftotext -layout` output. The two must agree line for line; the
+benchmarks (grouped as "itau-scanner") show the difference.
+
+    pytest test/test_itau_pdf_benchmark.py --benchmark-only
+"""
+import importlib.util
+import os
+import random
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "flask-server"))
+
+from itau_pdf import (  # noqa: E402
+    AMOUNT_RE,
+    CARD_HEADER_RE,
+    DATE_RE,
+    SPLIT_COL,
+    START_MARKER,
+    STOP_MARKERS,
+    _parse_transactions,
+    brl_to_float,
+    guess_year,
+)
+
+HAS_BENCHMARK = importlib.util.find_spec("pytest_benchmark") is not None
+needs_benchmark = pytest.mark.skipif(not HAS_BENCHMARK, reason="pytest-benchmark not installed")
+
+EMISSAO = date(2024, 3, 5)
+PAGES = 50
+RIGHT_COL = 95
+MERCHANTS = ("IFOOD *RESTAURANTE", "UBER TRIP", "MERCADO LIVRE", "DROGASIL 123", "POSTO SHELL")
+CATEGORIES = ("ALIMENTAÇÃO .SAO PAULO", "TRANSPORTE .SAO PAULO", "DIVERSOS.OSASCO", "SAÚDE .CAMPINAS")
+
+
+def _legacy_ordered_lines_for_page(page_text):
+    raw_lines = page_text.split("\n")
+    left_lines = [ln[:SPLIT_COL].rstrip() for ln in raw_lines if ln[:SPLIT_COL].strip()]
+    right_lines = [ln[SPLIT_COL:].rstrip() for ln in raw_lines if ln[SPLIT_COL:].strip()]
+    return left_lines + right_lines
+
+
+def _legacy_parse_transactions(pages, emissao):
+    transactions = []
+    titulares = {}
+    current_card = None
+    active = False
+    pending = None
+
+    for page_text in pages:
+        for line in _legacy_ordered_lines_for_page(page_text):
+            stripped = line.strip()
+            if not stripped:
+                continue
+            if START_MARKER in stripped:
+                active = True
+                pending = None
+                continue
+            if any(marker in stripped for marker in STOP_MARKERS):
+                active = False
+                pending = None
+                continue
+            if not active:
+                continue
+            if stripped.startswith("Lançamentos no cartão"):
+                pending = None
+                continue
+            header_match = CARD_HEADER_RE.match(stripped)
+            if header_match and not AMOUNT_RE.match(stripped.split()[-1]):
+                current_card = header_match.group(2)
+                titulares[current_card] = header_match.group(1).strip()
+                pending = None
+                continue
+            tokens = stripped.split()
+            if len(tokens) < 2:
+                continue
+            date_match = DATE_RE.match(tokens[0])
+            if date_match and AMOUNT_RE.match(tokens[-1]):
+                amount_tokens = 2 if tokens[-2] == "-" else 1
+                day, month = int(date_match.group(1)), int(date_match.group(2))
+                pending = {
+                    "cartao_final": current_card or "",
+                    "data": guess_year(day, month, emissao).isoformat(),
+                    "estabelecimento": " ".join(tokens[1:-amount_tokens]),
+                    "categoria_local": "",
+                    "valor": (-1 if amount_tokens == 2 else 1) * brl_to_float(tokens[-1]),
+                }
+                transactions.append(pending)
+                continue
+            if tokens[0] in ("DATA", "Titular"):
+                continue
+            if pending is not None and not AMOUNT_RE.match(tokens[-1]):
+                pending["categoria_local"] = stripped
+                pending = None
+
+    return transactions, titulares
+
+
+def _column_lines(rng, card, holder):
+    lines = [f"{holder} (final {card})", "DATA       ESTABELECIMENTO                 VALOR EM R$"]
+    for _ in range(rng.randint(12, 18)):
+        amount = f"{rng.randint(1, 2500)},{rng.randint(0, 99):02d}"
+        if rng.random() < 0.05:
+            amount = f"- {amount}"
+        day, month = rng.randint(1, 28), rng.randint(1, 12)
+        lines.append(f"{day:02d}/{month:02d}      {rng.choice(MERCHANTS):<30}{amount:>12}")
+        if rng.random() < 0.9:
+            lines.append(f"           {rng.choice(CATEGORIES)}")
+    lines.append(f"Lançamentos no cartão (final {card})        {rng.randint(1000, 9000)},00")
+    return lines
+
+
+def synthetic_statement_pages(pages=PAGES, seed=0):
+    """`pages` pages of two side-by-side card tables, bracketed by the start
+    and stop markers the way a real statement is."""
+    rng = random.Random(seed)
+    result = []
+    for page in range(pages):
+        left = _column_lines(rng, "1234", "FULANO DE TAL")
+        right = _column_lines(rng, "5678", "CICLANA DE TAL")
+        if page == 0:
+            left = [f"Emissão: {EMISSAO:%d/%m/%Y}", START_MARKER] + left
+        if page == pages - 1:
+            right = right + ["Total dos lançamentos atuais        99.999,99", "Limites de crédito"]
+        rows = []
+        for i in range(max(len(left), len(right))):
+            lhs = left[i] if i < len(left) else ""
+            rhs = right[i] if i < len(right) else ""
+            rows.append(f"{lhs:<{RIGHT_COL}}{rhs}".rstrip() if rhs else lhs)
+        result.append("\n".join(rows))
+    return result
+
+
+def synthetic_single_table_page(seed=0):
+    """One card table across the page, amounts right-aligned to column 81:
+    the blank run before them is no gutter between two tables."""
+    rng = random.Random(seed)
+    lines = [f"Emissão: {EMISSAO:%d/%m/%Y}", START_MARKER, "FULANO DE TAL (final 1234)"]
+    for _ in range(40):
+        amount = f"{rng.randint(1, 2500)},{rng.randint(0, 99):02d}"
+        day, month = rng.randint(1, 28), rng.randint(1, 12)
+        lines.append(f"{day:02d}/{month:02d}      {rng.choice(MERCHANTS):<30}{amount:>40}")
+        lines.append(f"           {rng.choice(CATEGORIES)}")
+    lines.append(f"Lançamentos no cartão (final 1234)        {rng.randint(1000, 9000)},00")
+    return "\n".join(lines)
+
+
+@pytest.fixture(scope="module")
+def statement_pages():
+    return synthetic_statement_pages()
+
+
+def test_scanner_matches_legacy_scanner(statement_pages):
+    transactions, titulares = _parse_transactions(statement_pages, EMISSAO)
+    assert (transactions, titulares) == _legacy_parse_transactions(statement_pages, EMISSAO)
+    assert len(transactions) > 50 * PAGES // 2
+    assert titulares == {"1234": "FULANO DE TAL", "5678": "CICLANA DE TAL"}
+    assert any(t["valor"] < 0 for t in transactions)
+
+
+def test_single_table_page_matches_legacy_scanner():
+    page = synthetic_single_table_page()
+    transactions, titulares = _parse_transactions([page], EMISSAO)
+    assert (transactions, titulares) == _legacy_parse_transactions([page], EMISSAO)
+    assert len(transactions) == 40
+
+
+@needs_benchmark
+def test_benchmark_scanner(benchmark, statement_pages):
+    benchmark.group = "itau-scanner"
+    transactions, _ = benchmark(_parse_transactions, statement_pages, EMISSAO)
+    assert transactions
+
+
+@needs_benchmark
+def test_benchmark_legacy_scanner(benchmark, statement_pages):
+    benchmark.group = "itau-scanner"
+    transactions, _ = benchmark(_legacy_parse_transactions, statement_pages, EMISSAO)
+    assert transactions
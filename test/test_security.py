@@ -1369,28 +1369,40 @@ class TestInputValidation:
         assert row is not None and row["status"] == "completed"
 
     @pytest.mark.integration
-    def test_pomodoro_start_self_heals_dangling_session(self, client, user_a):
+    def test_pomodoro_reaper_cancels_abandoned_session(self, client, user_a):
         """
-        Starting a new Pomodoro session while a previous one is still
-        'in_progress' (e.g. left dangling by a refresh/crash) should
-        auto-cancel the old one, since there's no scheduler to sweep it.
+        A session left 'in_progress' (e.g. dangling after a refresh/crash)
+        is cancelled by the reaper once it is stale; a fresh one is left
+        alone, and starting another session no longer touches either.
         """
-        first = _start_pomodoro_session(client, user_a["token"])
-        if first.status_code != 201:
-            pytest.skip("Could not start first pomodoro session")
-        first_session_id = first.get_json()["session_id"]
+        from app import POMODORO_STALE_AFTER_MINUTES, reap_stale_pomodoro_sessions
 
-        second = _start_pomodoro_session(client, user_a["token"])
-        assert second.status_code == 201
+        stale = _start_pomodoro_session(client, user_a["token"])
+        fresh = _start_pomodoro_session(client, user_a["token"])
+        if stale.status_code != 201 or fresh.status_code != 201:
+            pytest.skip("Could not start pomodoro sessions")
+        stale_id = stale.get_json()["session_id"]
+        fresh_id = fresh.get_json()["session_id"]
 
         with get_cursor() as cursor:
             cursor.execute(
-                "SELECT status FROM pomodoro_sessions WHERE id = %s", (first_session_id,)
+                "UPDATE pomodoro_sessions SET session_date = %s WHERE id = %s",
+                (
+                    datetime.now(timezone.utc)
+                    - timedelta(minutes=POMODORO_STALE_AFTER_MINUTES + 1),
+                    stale_id,
+                ),
             )
-            row = cursor.fetchone()
-        assert row is not None and row["status"] == "cancelled", (
-            "Starting a new session should self-heal (cancel) a dangling in_progress one"
-        )
+
+        assert reap_stale_pomodoro_sessions() >= 1
+
+        with get_cursor() as cursor:
+            cursor.execute(
+                "SELECT id, status FROM pomodoro_sessions WHERE id IN (%s, %s)",
+                (stale_id, fresh_id),
+            )
+            statuses = {row["id"]: row["status"] for row in cursor.fetchall()}
+        assert statuses == {stale_id: "cancelled", fresh_id: "in_progress"}
 
     @pytest.mark.integration
     def test_pomodoro_session_type_short_break_tracked(self, client, user_a):